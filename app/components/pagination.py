@@ -0,0 +1,74 @@
+"""
+Pagination controls for IP Address Tracker
+Keeps per-view cursors or page numbers in session state and renders next/prev navigation
+"""
+
+import streamlit as st
+from utils.search_engine import PAGE_SIZE_OPTIONS, DEFAULT_PAGE_SIZE
+
+def render_page_size_selector(key):
+    """Render the rows-per-page selector for a paginated view"""
+    return st.selectbox(
+        "Rows per page",
+        PAGE_SIZE_OPTIONS,
+        index=PAGE_SIZE_OPTIONS.index(DEFAULT_PAGE_SIZE),
+        key=f"{key}_page_size"
+    )
+
+def get_page_cursor(key, filter_signature):
+    """Return the current cursor for a view, resetting to page 1 when its filters change"""
+    if st.session_state.get(f"{key}_signature") != filter_signature:
+        st.session_state[f"{key}_signature"] = filter_signature
+        st.session_state[f"{key}_cursor"] = None
+        st.session_state[f"{key}_page_number"] = 1
+    return st.session_state.get(f"{key}_cursor")
+
+def render_pagination_controls(key, page, row_count, approx_total=None):
+    """Render next/prev buttons and the page position for a fetched page"""
+    page_number = st.session_state.get(f"{key}_page_number", 1)
+
+    col1, col2, col3 = st.columns([1, 2, 1])
+
+    with col1:
+        if st.button("⬅️ Previous", key=f"{key}_prev", disabled=not page['has_prev']):
+            st.session_state[f"{key}_cursor"] = {'direction': 'before', 'key': page['first_key']}
+            st.session_state[f"{key}_page_number"] = max(1, page_number - 1)
+            st.rerun()
+
+    with col2:
+        if approx_total is not None:
+            st.caption(f"Page {page_number} · {row_count} rows shown · ~{approx_total:,} total")
+        else:
+            st.caption(f"Page {page_number} · {row_count} rows shown")
+
+    with col3:
+        if st.button("Next ➡️", key=f"{key}_next", disabled=not page['has_next']):
+            st.session_state[f"{key}_cursor"] = {'direction': 'after', 'key': page['last_key']}
+            st.session_state[f"{key}_page_number"] = page_number + 1
+            st.rerun()
+
+def get_page_number(key, filter_signature, page_count):
+    """Return the current 1-based page of an offset-paginated view, resetting on filter changes"""
+    if st.session_state.get(f"{key}_signature") != filter_signature:
+        st.session_state[f"{key}_signature"] = filter_signature
+        st.session_state[f"{key}_page_number"] = 1
+    page_number = min(st.session_state.get(f"{key}_page_number", 1), max(page_count, 1))
+    st.session_state[f"{key}_page_number"] = page_number
+    return page_number
+
+def render_page_number_controls(key, page_number, page_count, total):
+    """Render next/prev buttons for an offset-paginated view over an in-memory list"""
+    col1, col2, col3 = st.columns([1, 2, 1])
+
+    with col1:
+        if st.button("⬅️ Previous", key=f"{key}_prev", disabled=page_number <= 1):
+            st.session_state[f"{key}_page_number"] = page_number - 1
+            st.rerun()
+
+    with col2:
+        st.caption(f"Page {page_number} of {max(page_count, 1)} · {total:,} rows")
+
+    with col3:
+        if st.button("Next ➡️", key=f"{key}_next", disabled=page_number >= page_count):
+            st.session_state[f"{key}_page_number"] = page_number + 1
+            st.rerun()
@@ -12,7 +12,9 @@ from typing import List, Dict, Any
 # Import custom modules
 from models.database import init_database, get_db_session, Site, IPAddress, Subnet
 from utils.import_export import import_export_manager
-from pages import dashboard, search, settings, import_export
+from utils.statistics import get_global_statistics
+from utils.snapshots import start_snapshot_sampler
+from pages import dashboard, search, analytics, settings, import_export
 from components.enhanced_styles import get_enhanced_css
 
 # Page configuration
@@ -29,6 +31,7 @@ def initialize_app():
     """Initialize the application and database"""
     try:
         init_database()
+        start_snapshot_sampler()
         return True
     except Exception as e:
         st.error(f"Failed to initialize database: {str(e)}")
@@ -94,17 +97,14 @@ def render_sidebar_stats():
     
     session = get_db_session()
     try:
-        # Get statistics
-        total_ips = session.query(IPAddress).count()
-        total_sites = session.query(Site).count()
-        total_subnets = session.query(Subnet).count()
-        active_ips = session.query(IPAddress).filter_by(status='active').count()
+        # Get statistics (one counter-cache row, no table scans)
+        stats = get_global_statistics(session)
         
         # Display metrics
-        st.sidebar.metric("Total IP Addresses", total_ips)
-        st.sidebar.metric("Active IP Addresses", active_ips)
-        st.sidebar.metric("Total Sites", total_sites)
-        st.sidebar.metric("Total Subnets", total_subnets)
+        st.sidebar.metric("Total IP Addresses", stats['ip_total'])
+        st.sidebar.metric("Active IP Addresses", stats['ip_active'])
+        st.sidebar.metric("Total Sites", stats['site_total'])
+        st.sidebar.metric("Total Subnets", stats['subnet_total'])
         
     except Exception as e:
         st.sidebar.error(f"Error loading statistics: {str(e)}")
@@ -155,7 +155,7 @@ def main():
     elif selected_page == "search":
         search.render_search_page()
     elif selected_page == "analytics":
-        render_analytics_page()
+        analytics.render_analytics_page()
     elif selected_page == "settings":
         settings.render_settings_page()
     elif selected_page == "import_export":
@@ -163,11 +163,6 @@ def main():
     elif selected_page == "help":
         render_help_page()
 
-def render_analytics_page():
-    """Render analytics page placeholder"""
-    st.header("📊 Analytics")
-    st.info("Analytics page coming soon! This will include network utilization charts, IP allocation graphs, and site comparison metrics.")
-
 def render_help_page():
     """Render help page"""
     st.header("📚 Help & Documentation")
@@ -181,6 +176,7 @@ def render_help_page():
     
     - **🏠 Dashboard**: Overview of your network infrastructure
     - **🔍 Search & Browse**: Find IP addresses and hostnames quickly
+    - **📊 Analytics**: Growth and utilization trends over time
     - **⚙️ Settings**: Manage sites, subnets, and IP assignments
     - **📥 Import/Export**: Bulk operations with CSV files
     
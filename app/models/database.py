@@ -3,7 +3,7 @@ Database models for IP Tracker application
 Using SQLAlchemy ORM with PostgreSQL CIDR support
 """
 
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, ForeignKey, CheckConstraint, UniqueConstraint
+from sqlalchemy import create_engine, text, Column, Integer, BigInteger, Numeric, String, Text, DateTime, ForeignKey, CheckConstraint, UniqueConstraint, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from sqlalchemy.dialects.postgresql import CIDR, INET
@@ -11,6 +11,8 @@ from sqlalchemy.sql import func
 from datetime import datetime
 import os
 
+from models.migrations import apply_migrations, sync_subnet_overlap_constraint
+
 Base = declarative_base()
 
 class Site(Base):
@@ -27,6 +29,7 @@ class Site(Base):
     # Relationships
     ip_addresses = relationship("IPAddress", back_populates="site", cascade="all, delete-orphan")
     subnets = relationship("Subnet", back_populates="site", cascade="all, delete-orphan")
+    ip_ranges = relationship("IPRange", back_populates="site", cascade="all, delete-orphan")
     
     def __repr__(self):
         return f"<Site(id={self.id}, name='{self.name}', location='{self.location}')>"
@@ -44,15 +47,37 @@ class IPAddress(Base):
     system_owner = Column(String(100))
     description = Column(Text)
     status = Column(String(20), default='active')
+    # Most specific subnet at the same site containing ip_cidr; set by triggers
+    subnet_id = Column(Integer, ForeignKey('subnets.id', ondelete='SET NULL'))
     created_at = Column(DateTime, default=func.current_timestamp())
     updated_at = Column(DateTime, default=func.current_timestamp(), onupdate=func.current_timestamp())
     
     # Constraints
     __table_args__ = (
         CheckConstraint("status IN ('active', 'inactive', 'reserved')", name='check_status'),
+        # B-tree serving per-subnet GROUP BY counts and reassignment
+        Index('idx_ip_addresses_subnet_id', 'subnet_id'),
         # Unique constraint: same IP cannot exist twice at the same site
         # but can exist at different sites (global duplicates allowed)
         UniqueConstraint('ip_cidr', 'site_id', name='unique_ip_per_site'),
+        # GiST index serving containment lookups (>>=, <<=)
+        Index('idx_ip_addresses_ip_cidr', 'ip_cidr',
+              postgresql_using='gist', postgresql_ops={'ip_cidr': 'inet_ops'}),
+        # B-tree on the keyset pagination order
+        Index('idx_ip_addresses_ip_cidr_id', 'ip_cidr', 'id'),
+        # Partial index driving the batched inactive-IP purge
+        Index('idx_ip_addresses_inactive_id', 'id', postgresql_where=text("status = 'inactive'")),
+        # B-tree behind the inventory snapshot's updated_at watermark refresh
+        Index('idx_ip_addresses_updated_at', 'updated_at'),
+        # Trigram indexes so ILIKE '%term%' searches can use an index
+        Index('idx_ip_addresses_hostname_trgm', 'hostname',
+              postgresql_using='gin', postgresql_ops={'hostname': 'gin_trgm_ops'}),
+        Index('idx_ip_addresses_description_trgm', 'description',
+              postgresql_using='gin', postgresql_ops={'description': 'gin_trgm_ops'}),
+        Index('idx_ip_addresses_role_trgm', 'role',
+              postgresql_using='gin', postgresql_ops={'role': 'gin_trgm_ops'}),
+        Index('idx_ip_addresses_system_owner_trgm', 'system_owner',
+              postgresql_using='gin', postgresql_ops={'system_owner': 'gin_trgm_ops'}),
     )
     
     # Relationships
@@ -74,12 +99,147 @@ class Subnet(Base):
     created_at = Column(DateTime, default=func.current_timestamp())
     updated_at = Column(DateTime, default=func.current_timestamp(), onupdate=func.current_timestamp())
     
+    # Constraints
+    __table_args__ = (
+        Index('idx_subnets_subnet_cidr', 'subnet_cidr',
+              postgresql_using='gist', postgresql_ops={'subnet_cidr': 'inet_ops'}),
+    )
+    
     # Relationships
     site = relationship("Site", back_populates="subnets")
     
     def __repr__(self):
         return f"<Subnet(id={self.id}, subnet_cidr='{self.subnet_cidr}', name='{self.name}')>"
 
+class IPRange(Base):
+    """Address ranges (DHCP pools, reservations) stored as one row covering start..end"""
+    __tablename__ = 'ip_ranges'
+    
+    id = Column(Integer, primary_key=True)
+    site_id = Column(Integer, ForeignKey('sites.id', ondelete='CASCADE'))
+    start_address = Column(INET, nullable=False)
+    end_address = Column(INET, nullable=False)
+    name = Column(String(100), nullable=False)
+    role = Column(String(100))
+    system_owner = Column(String(100))
+    description = Column(Text)
+    status = Column(String(20), default='reserved')
+    created_at = Column(DateTime, default=func.current_timestamp())
+    updated_at = Column(DateTime, default=func.current_timestamp(), onupdate=func.current_timestamp())
+    
+    # Constraints
+    __table_args__ = (
+        CheckConstraint("status IN ('active', 'inactive', 'reserved')", name='check_range_status'),
+        CheckConstraint("family(start_address) = family(end_address) AND start_address <= end_address",
+                        name='check_range_bounds'),
+        Index('idx_ip_ranges_site_start', 'site_id', 'start_address'),
+    )
+    
+    # Relationships
+    site = relationship("Site", back_populates="ip_ranges")
+    
+    def __repr__(self):
+        return f"<IPRange(id={self.id}, start='{self.start_address}', end='{self.end_address}', name='{self.name}')>"
+
+class IPAddressArchive(Base):
+    """Archived IP addresses removed by the inactive-IP purge job"""
+    __tablename__ = 'ip_address_archive'
+    
+    # Keeps the original ip_addresses id
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    site_id = Column(Integer)
+    ip_cidr = Column(CIDR, nullable=False)
+    hostname = Column(String(255))
+    gateway = Column(INET)
+    role = Column(String(100))
+    system_owner = Column(String(100))
+    description = Column(Text)
+    status = Column(String(20))
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    archived_at = Column(DateTime, default=func.current_timestamp())
+    
+    def __repr__(self):
+        return f"<IPAddressArchive(id={self.id}, ip_cidr='{self.ip_cidr}', archived_at='{self.archived_at}')>"
+
+class GlobalStatistics(Base):
+    """Single-row counter cache of inventory totals, maintained by triggers"""
+    __tablename__ = 'global_statistics'
+    
+    id = Column(Integer, primary_key=True, default=1)
+    site_total = Column(Integer, nullable=False, default=0)
+    subnet_total = Column(Integer, nullable=False, default=0)
+    ip_total = Column(Integer, nullable=False, default=0)
+    ip_active = Column(Integer, nullable=False, default=0)
+    ip_inactive = Column(Integer, nullable=False, default=0)
+    ip_reserved = Column(Integer, nullable=False, default=0)
+    
+    # Constraints
+    __table_args__ = (
+        CheckConstraint("id = 1", name='check_single_row'),
+    )
+    
+    def __repr__(self):
+        return f"<GlobalStatistics(ip_total={self.ip_total}, subnet_total={self.subnet_total})>"
+
+class SiteStatistics(Base):
+    """Per-site counter cache of IP and subnet counts, maintained by triggers"""
+    __tablename__ = 'site_statistics'
+    
+    site_id = Column(Integer, primary_key=True)
+    subnet_total = Column(Integer, nullable=False, default=0)
+    ip_total = Column(Integer, nullable=False, default=0)
+    ip_active = Column(Integer, nullable=False, default=0)
+    ip_inactive = Column(Integer, nullable=False, default=0)
+    ip_reserved = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<SiteStatistics(site_id={self.site_id}, ip_total={self.ip_total})>"
+
+class SubnetStatistics(Base):
+    """Per-subnet counter cache of used addresses, maintained by triggers"""
+    __tablename__ = 'subnet_statistics'
+    
+    subnet_id = Column(Integer, ForeignKey('subnets.id', ondelete='CASCADE'), primary_key=True)
+    used_count = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<SubnetStatistics(subnet_id={self.subnet_id}, used_count={self.used_count})>"
+
+class UtilizationSnapshot(Base):
+    """Periodic sample of global, per-site and per-subnet utilization counters"""
+    __tablename__ = 'utilization_snapshots'
+    
+    id = Column(BigInteger, primary_key=True)
+    captured_at = Column(DateTime, nullable=False)
+    scope = Column(String(10), nullable=False)
+    site_id = Column(Integer)
+    subnet_id = Column(Integer)
+    ip_total = Column(Integer)
+    ip_active = Column(Integer)
+    ip_inactive = Column(Integer)
+    ip_reserved = Column(Integer)
+    subnet_total = Column(Integer)
+    used = Column(Integer)
+    capacity = Column(Numeric(40, 0))
+    
+    # Constraints
+    __table_args__ = (
+        CheckConstraint("scope IN ('global', 'site', 'subnet')", name='check_snapshot_scope'),
+        Index('idx_utilization_snapshots_scope_time', 'scope', 'captured_at'),
+        Index('idx_utilization_snapshots_site_time', 'site_id', 'captured_at'),
+        Index('idx_utilization_snapshots_subnet_time', 'subnet_id', 'captured_at'),
+    )
+    
+    def __repr__(self):
+        return f"<UtilizationSnapshot(scope='{self.scope}', captured_at='{self.captured_at}')>"
+
+# PostgreSQL extensions the models depend on (must exist before create_all)
+REQUIRED_EXTENSIONS = ['pg_trgm', 'btree_gist']
+
+# Where overlapping subnets are rejected: 'site' (within a site), 'global' or 'off'
+SUBNET_OVERLAP_SCOPE = os.getenv('SUBNET_OVERLAP_SCOPE', 'site').lower()
+
 class DatabaseManager:
     """Database connection and session management"""
     
@@ -93,11 +253,23 @@ class DatabaseManager:
         
         self.engine = create_engine(database_url, echo=False)
         self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.overlap_constraint_warning = None
     
     def create_tables(self):
         """Create all tables"""
+        with self.engine.begin() as conn:
+            for extension in REQUIRED_EXTENSIONS:
+                conn.execute(text(f"CREATE EXTENSION IF NOT EXISTS {extension}"))
         Base.metadata.create_all(bind=self.engine)
     
+    def run_migrations(self):
+        """Apply pending schema migrations"""
+        return apply_migrations(self.engine)
+    
+    def sync_constraints(self):
+        """Match configurable constraints to the environment settings"""
+        self.overlap_constraint_warning = sync_subnet_overlap_constraint(self.engine, SUBNET_OVERLAP_SCOPE)
+    
     def get_session(self):
         """Get database session"""
         return self.SessionLocal()
@@ -116,4 +288,6 @@ def get_db_session():
 def init_database():
     """Initialize database tables"""
     db_manager.create_tables()
+    db_manager.run_migrations()
+    db_manager.sync_constraints()
 
@@ -0,0 +1,509 @@
+"""
+Schema migrations for IP Tracker application
+Ordered, idempotent DDL for changes that create_all() cannot apply to existing tables
+"""
+
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+# Counter-cache maintenance for global/site/subnet statistics (see schema.sql)
+STATISTICS_FUNCTIONS = [
+    """
+    CREATE OR REPLACE FUNCTION apply_ip_statistics_delta(p_site_id INTEGER, p_status VARCHAR, p_ip_cidr CIDR, p_delta INTEGER)
+    RETURNS VOID AS $$
+    DECLARE
+        d_active INTEGER := CASE WHEN p_status = 'active' THEN p_delta ELSE 0 END;
+        d_inactive INTEGER := CASE WHEN p_status = 'inactive' THEN p_delta ELSE 0 END;
+        d_reserved INTEGER := CASE WHEN p_status = 'reserved' THEN p_delta ELSE 0 END;
+    BEGIN
+        UPDATE global_statistics
+           SET ip_total = ip_total + p_delta,
+               ip_active = ip_active + d_active,
+               ip_inactive = ip_inactive + d_inactive,
+               ip_reserved = ip_reserved + d_reserved
+         WHERE id = 1;
+
+        IF p_site_id IS NOT NULL THEN
+            INSERT INTO site_statistics (site_id, ip_total, ip_active, ip_inactive, ip_reserved)
+            VALUES (p_site_id, p_delta, d_active, d_inactive, d_reserved)
+            ON CONFLICT (site_id) DO UPDATE
+               SET ip_total = site_statistics.ip_total + EXCLUDED.ip_total,
+                   ip_active = site_statistics.ip_active + EXCLUDED.ip_active,
+                   ip_inactive = site_statistics.ip_inactive + EXCLUDED.ip_inactive,
+                   ip_reserved = site_statistics.ip_reserved + EXCLUDED.ip_reserved;
+
+            UPDATE subnet_statistics ss
+               SET used_count = ss.used_count + p_delta
+              FROM subnets s
+             WHERE s.id = ss.subnet_id
+               AND s.site_id = p_site_id
+               AND p_ip_cidr <<= s.subnet_cidr;
+        END IF;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE OR REPLACE FUNCTION maintain_ip_statistics()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        IF TG_OP = 'UPDATE'
+           AND NEW.site_id IS NOT DISTINCT FROM OLD.site_id
+           AND NEW.status IS NOT DISTINCT FROM OLD.status
+           AND NEW.ip_cidr = OLD.ip_cidr THEN
+            RETURN NULL;
+        END IF;
+
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            PERFORM apply_ip_statistics_delta(OLD.site_id, OLD.status, OLD.ip_cidr, -1);
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            PERFORM apply_ip_statistics_delta(NEW.site_id, NEW.status, NEW.ip_cidr, 1);
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE OR REPLACE FUNCTION maintain_subnet_statistics()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            UPDATE global_statistics SET subnet_total = subnet_total - 1 WHERE id = 1;
+            UPDATE site_statistics SET subnet_total = subnet_total - 1 WHERE site_id = OLD.site_id;
+        END IF;
+
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            UPDATE global_statistics SET subnet_total = subnet_total + 1 WHERE id = 1;
+            IF NEW.site_id IS NOT NULL THEN
+                INSERT INTO site_statistics (site_id, subnet_total) VALUES (NEW.site_id, 1)
+                ON CONFLICT (site_id) DO UPDATE SET subnet_total = site_statistics.subnet_total + 1;
+            END IF;
+
+            INSERT INTO subnet_statistics (subnet_id, used_count)
+            SELECT NEW.id, COUNT(*) FROM ip_addresses
+             WHERE site_id = NEW.site_id AND ip_cidr <<= NEW.subnet_cidr
+            ON CONFLICT (subnet_id) DO UPDATE SET used_count = EXCLUDED.used_count;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE OR REPLACE FUNCTION maintain_site_statistics()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            UPDATE global_statistics SET site_total = site_total + 1 WHERE id = 1;
+            INSERT INTO site_statistics (site_id) VALUES (NEW.id) ON CONFLICT (site_id) DO NOTHING;
+        ELSE
+            UPDATE global_statistics SET site_total = site_total - 1 WHERE id = 1;
+            DELETE FROM site_statistics WHERE site_id = OLD.id;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE OR REPLACE FUNCTION rebuild_inventory_statistics()
+    RETURNS VOID AS $$
+    BEGIN
+        -- Block writers so the recount is consistent with the trigger-maintained deltas
+        LOCK TABLE sites, subnets, ip_addresses IN SHARE MODE;
+
+        INSERT INTO global_statistics (id) VALUES (1) ON CONFLICT (id) DO NOTHING;
+        UPDATE global_statistics g
+           SET site_total = (SELECT COUNT(*) FROM sites),
+               subnet_total = (SELECT COUNT(*) FROM subnets),
+               ip_total = ip.total,
+               ip_active = ip.active,
+               ip_inactive = ip.inactive,
+               ip_reserved = ip.reserved
+          FROM (SELECT COUNT(*) AS total,
+                       COUNT(*) FILTER (WHERE status = 'active') AS active,
+                       COUNT(*) FILTER (WHERE status = 'inactive') AS inactive,
+                       COUNT(*) FILTER (WHERE status = 'reserved') AS reserved
+                  FROM ip_addresses) ip
+         WHERE g.id = 1;
+
+        DELETE FROM site_statistics;
+        INSERT INTO site_statistics (site_id, subnet_total, ip_total, ip_active, ip_inactive, ip_reserved)
+        SELECT s.id,
+               COALESCE(sn.total, 0),
+               COALESCE(ip.total, 0),
+               COALESCE(ip.active, 0),
+               COALESCE(ip.inactive, 0),
+               COALESCE(ip.reserved, 0)
+          FROM sites s
+          LEFT JOIN (SELECT site_id, COUNT(*) AS total FROM subnets GROUP BY site_id) sn
+            ON sn.site_id = s.id
+          LEFT JOIN (SELECT site_id,
+                            COUNT(*) AS total,
+                            COUNT(*) FILTER (WHERE status = 'active') AS active,
+                            COUNT(*) FILTER (WHERE status = 'inactive') AS inactive,
+                            COUNT(*) FILTER (WHERE status = 'reserved') AS reserved
+                       FROM ip_addresses GROUP BY site_id) ip
+            ON ip.site_id = s.id;
+
+        DELETE FROM subnet_statistics;
+        INSERT INTO subnet_statistics (subnet_id, used_count)
+        SELECT s.id, COUNT(ip.id)
+          FROM subnets s
+          LEFT JOIN ip_addresses ip
+            ON ip.site_id = s.site_id AND ip.ip_cidr <<= s.subnet_cidr
+         GROUP BY s.id;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+]
+
+STATISTICS_TRIGGERS = [
+    "DROP TRIGGER IF EXISTS maintain_ip_statistics ON ip_addresses",
+    "CREATE TRIGGER maintain_ip_statistics AFTER INSERT OR UPDATE OR DELETE ON ip_addresses "
+    "FOR EACH ROW EXECUTE FUNCTION maintain_ip_statistics()",
+    "DROP TRIGGER IF EXISTS maintain_subnet_statistics ON subnets",
+    "CREATE TRIGGER maintain_subnet_statistics AFTER INSERT OR DELETE OR UPDATE OF site_id, subnet_cidr ON subnets "
+    "FOR EACH ROW EXECUTE FUNCTION maintain_subnet_statistics()",
+    "DROP TRIGGER IF EXISTS maintain_site_statistics ON sites",
+    "CREATE TRIGGER maintain_site_statistics AFTER INSERT OR DELETE ON sites "
+    "FOR EACH ROW EXECUTE FUNCTION maintain_site_statistics()",
+]
+
+# Longest-prefix subnet assignment (ip_addresses.subnet_id). Per-subnet used
+# counts follow the assignment, replacing the containment-based versions of
+# the statistics functions installed by 0004.
+SUBNET_ASSIGNMENT_FUNCTIONS = [
+    """
+    CREATE OR REPLACE FUNCTION longest_prefix_subnet(p_site_id INTEGER, p_ip_cidr CIDR)
+    RETURNS INTEGER AS $$
+        SELECT id FROM subnets
+         WHERE site_id = p_site_id AND p_ip_cidr <<= subnet_cidr
+         ORDER BY masklen(subnet_cidr) DESC, id
+         LIMIT 1
+    $$ LANGUAGE sql STABLE;
+    """,
+    """
+    CREATE OR REPLACE FUNCTION assign_ip_subnet()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        NEW.subnet_id := longest_prefix_subnet(NEW.site_id, NEW.ip_cidr);
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE OR REPLACE FUNCTION reassign_subnet_addresses()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        -- OLD is NULL on INSERT and NEW on DELETE, so each branch only matches
+        -- where it applies: addresses that were assigned to (or left
+        -- unassigned inside) the old subnet, and addresses inside the new one.
+        UPDATE ip_addresses ip
+           SET subnet_id = m.subnet_id
+          FROM (SELECT id, longest_prefix_subnet(site_id, ip_cidr) AS subnet_id
+                  FROM ip_addresses
+                 WHERE subnet_id = OLD.id
+                    OR (subnet_id IS NULL AND site_id = OLD.site_id AND ip_cidr <<= OLD.subnet_cidr)
+                    OR (site_id = NEW.site_id AND ip_cidr <<= NEW.subnet_cidr)) m
+         WHERE ip.id = m.id
+           AND ip.subnet_id IS DISTINCT FROM m.subnet_id;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE OR REPLACE FUNCTION apply_ip_statistics_delta(p_site_id INTEGER, p_status VARCHAR, p_delta INTEGER)
+    RETURNS VOID AS $$
+    DECLARE
+        d_active INTEGER := CASE WHEN p_status = 'active' THEN p_delta ELSE 0 END;
+        d_inactive INTEGER := CASE WHEN p_status = 'inactive' THEN p_delta ELSE 0 END;
+        d_reserved INTEGER := CASE WHEN p_status = 'reserved' THEN p_delta ELSE 0 END;
+    BEGIN
+        UPDATE global_statistics
+           SET ip_total = ip_total + p_delta,
+               ip_active = ip_active + d_active,
+               ip_inactive = ip_inactive + d_inactive,
+               ip_reserved = ip_reserved + d_reserved
+         WHERE id = 1;
+
+        IF p_site_id IS NOT NULL THEN
+            INSERT INTO site_statistics (site_id, ip_total, ip_active, ip_inactive, ip_reserved)
+            VALUES (p_site_id, p_delta, d_active, d_inactive, d_reserved)
+            ON CONFLICT (site_id) DO UPDATE
+               SET ip_total = site_statistics.ip_total + EXCLUDED.ip_total,
+                   ip_active = site_statistics.ip_active + EXCLUDED.ip_active,
+                   ip_inactive = site_statistics.ip_inactive + EXCLUDED.ip_inactive,
+                   ip_reserved = site_statistics.ip_reserved + EXCLUDED.ip_reserved;
+        END IF;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE OR REPLACE FUNCTION maintain_ip_statistics()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        IF TG_OP = 'DELETE'
+           OR (TG_OP = 'UPDATE' AND (NEW.site_id IS DISTINCT FROM OLD.site_id
+                                     OR NEW.status IS DISTINCT FROM OLD.status)) THEN
+            PERFORM apply_ip_statistics_delta(OLD.site_id, OLD.status, -1);
+        END IF;
+        IF TG_OP = 'INSERT'
+           OR (TG_OP = 'UPDATE' AND (NEW.site_id IS DISTINCT FROM OLD.site_id
+                                     OR NEW.status IS DISTINCT FROM OLD.status)) THEN
+            PERFORM apply_ip_statistics_delta(NEW.site_id, NEW.status, 1);
+        END IF;
+
+        -- A subnet's statistics row may already be gone when it is being deleted
+        IF TG_OP <> 'UPDATE' OR NEW.subnet_id IS DISTINCT FROM OLD.subnet_id THEN
+            UPDATE subnet_statistics SET used_count = used_count - 1 WHERE subnet_id = OLD.subnet_id;
+            UPDATE subnet_statistics SET used_count = used_count + 1 WHERE subnet_id = NEW.subnet_id;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE OR REPLACE FUNCTION maintain_subnet_statistics()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            UPDATE global_statistics SET subnet_total = subnet_total - 1 WHERE id = 1;
+            UPDATE site_statistics SET subnet_total = subnet_total - 1 WHERE site_id = OLD.site_id;
+        END IF;
+
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            UPDATE global_statistics SET subnet_total = subnet_total + 1 WHERE id = 1;
+            IF NEW.site_id IS NOT NULL THEN
+                INSERT INTO site_statistics (site_id, subnet_total) VALUES (NEW.site_id, 1)
+                ON CONFLICT (site_id) DO UPDATE SET subnet_total = site_statistics.subnet_total + 1;
+            END IF;
+
+            -- Counts addresses assigned so far; reassignment then applies per-row deltas
+            INSERT INTO subnet_statistics (subnet_id, used_count)
+            SELECT NEW.id, COUNT(*) FROM ip_addresses WHERE subnet_id = NEW.id
+            ON CONFLICT (subnet_id) DO UPDATE SET used_count = EXCLUDED.used_count;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE OR REPLACE FUNCTION rebuild_inventory_statistics()
+    RETURNS VOID AS $$
+    BEGIN
+        -- Block writers so the recount is consistent with the trigger-maintained deltas
+        LOCK TABLE sites, subnets, ip_addresses IN SHARE MODE;
+
+        INSERT INTO global_statistics (id) VALUES (1) ON CONFLICT (id) DO NOTHING;
+        UPDATE global_statistics g
+           SET site_total = (SELECT COUNT(*) FROM sites),
+               subnet_total = (SELECT COUNT(*) FROM subnets),
+               ip_total = ip.total,
+               ip_active = ip.active,
+               ip_inactive = ip.inactive,
+               ip_reserved = ip.reserved
+          FROM (SELECT COUNT(*) AS total,
+                       COUNT(*) FILTER (WHERE status = 'active') AS active,
+                       COUNT(*) FILTER (WHERE status = 'inactive') AS inactive,
+                       COUNT(*) FILTER (WHERE status = 'reserved') AS reserved
+                  FROM ip_addresses) ip
+         WHERE g.id = 1;
+
+        DELETE FROM site_statistics;
+        INSERT INTO site_statistics (site_id, subnet_total, ip_total, ip_active, ip_inactive, ip_reserved)
+        SELECT s.id,
+               COALESCE(sn.total, 0),
+               COALESCE(ip.total, 0),
+               COALESCE(ip.active, 0),
+               COALESCE(ip.inactive, 0),
+               COALESCE(ip.reserved, 0)
+          FROM sites s
+          LEFT JOIN (SELECT site_id, COUNT(*) AS total FROM subnets GROUP BY site_id) sn
+            ON sn.site_id = s.id
+          LEFT JOIN (SELECT site_id,
+                            COUNT(*) AS total,
+                            COUNT(*) FILTER (WHERE status = 'active') AS active,
+                            COUNT(*) FILTER (WHERE status = 'inactive') AS inactive,
+                            COUNT(*) FILTER (WHERE status = 'reserved') AS reserved
+                       FROM ip_addresses GROUP BY site_id) ip
+            ON ip.site_id = s.id;
+
+        DELETE FROM subnet_statistics;
+        INSERT INTO subnet_statistics (subnet_id, used_count)
+        SELECT s.id, COALESCE(ip.used, 0)
+          FROM subnets s
+          LEFT JOIN (SELECT subnet_id, COUNT(*) AS used
+                       FROM ip_addresses GROUP BY subnet_id) ip
+            ON ip.subnet_id = s.id;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+]
+
+SUBNET_ASSIGNMENT_TRIGGERS = [
+    "DROP TRIGGER IF EXISTS assign_ip_subnet ON ip_addresses",
+    "CREATE TRIGGER assign_ip_subnet BEFORE INSERT OR UPDATE OF site_id, ip_cidr ON ip_addresses "
+    "FOR EACH ROW EXECUTE FUNCTION assign_ip_subnet()",
+    "DROP TRIGGER IF EXISTS reassign_subnet_addresses ON subnets",
+    "CREATE TRIGGER reassign_subnet_addresses AFTER INSERT OR DELETE OR UPDATE OF site_id, subnet_cidr ON subnets "
+    "FOR EACH ROW EXECUTE FUNCTION reassign_subnet_addresses()",
+]
+
+# Ids of deleted IP entries, so incremental readers (the inventory snapshot) can
+# drop them; deletes leave nothing behind for an updated_at watermark. Entries
+# older than a week are pruned (mirrored by DELETION_LOG_RETENTION).
+IP_DELETION_LOG = [
+    """
+    CREATE TABLE IF NOT EXISTS ip_address_deletions (
+        ip_id INTEGER NOT NULL,
+        deleted_at TIMESTAMP NOT NULL DEFAULT clock_timestamp()
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_ip_address_deletions_deleted_at ON ip_address_deletions (deleted_at)",
+    """
+    CREATE OR REPLACE FUNCTION record_ip_deletions()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        INSERT INTO ip_address_deletions (ip_id) SELECT id FROM deleted_rows;
+        DELETE FROM ip_address_deletions WHERE deleted_at < clock_timestamp() - INTERVAL '7 days';
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    "DROP TRIGGER IF EXISTS record_ip_deletions ON ip_addresses",
+    "CREATE TRIGGER record_ip_deletions AFTER DELETE ON ip_addresses "
+    "REFERENCING OLD TABLE AS deleted_rows FOR EACH STATEMENT EXECUTE FUNCTION record_ip_deletions()",
+]
+
+# Each migration is (name, [statements]); names are recorded once applied.
+# Statements must be safe to run against a database created from schema.sql.
+MIGRATIONS = [
+    ("0001_trigram_search_indexes", [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE INDEX IF NOT EXISTS idx_ip_addresses_hostname_trgm "
+        "ON ip_addresses USING GIN (hostname gin_trgm_ops)",
+        "CREATE INDEX IF NOT EXISTS idx_ip_addresses_description_trgm "
+        "ON ip_addresses USING GIN (description gin_trgm_ops)",
+        "CREATE INDEX IF NOT EXISTS idx_ip_addresses_role_trgm "
+        "ON ip_addresses USING GIN (role gin_trgm_ops)",
+        "CREATE INDEX IF NOT EXISTS idx_ip_addresses_system_owner_trgm "
+        "ON ip_addresses USING GIN (system_owner gin_trgm_ops)",
+    ]),
+    ("0002_inet_gist_indexes", [
+        # inet has no default GiST operator class; inet_ops must be named explicitly
+        "CREATE INDEX IF NOT EXISTS idx_ip_addresses_ip_cidr "
+        "ON ip_addresses USING GIST (ip_cidr inet_ops)",
+        "CREATE INDEX IF NOT EXISTS idx_subnets_subnet_cidr "
+        "ON subnets USING GIST (subnet_cidr inet_ops)",
+    ]),
+    ("0003_keyset_pagination_index", [
+        "CREATE INDEX IF NOT EXISTS idx_ip_addresses_ip_cidr_id ON ip_addresses (ip_cidr, id)",
+    ]),
+    ("0004_statistics_counter_cache",
+        STATISTICS_FUNCTIONS + STATISTICS_TRIGGERS + [
+            # Backfill counters for existing data
+            "SELECT rebuild_inventory_statistics()",
+        ]),
+    ("0005_inactive_purge_index", [
+        "CREATE INDEX IF NOT EXISTS idx_ip_addresses_inactive_id "
+        "ON ip_addresses (id) WHERE status = 'inactive'",
+    ]),
+    ("0006_btree_gist_extension", [
+        # Lets the per-site subnet exclusion constraint combine site_id = with inet &&
+        "CREATE EXTENSION IF NOT EXISTS btree_gist",
+    ]),
+    ("0007_ip_subnet_assignment", [
+        "ALTER TABLE ip_addresses ADD COLUMN IF NOT EXISTS subnet_id INTEGER "
+        "REFERENCES subnets(id) ON DELETE SET NULL",
+        "CREATE INDEX IF NOT EXISTS idx_ip_addresses_subnet_id ON ip_addresses (subnet_id)",
+    ] + SUBNET_ASSIGNMENT_FUNCTIONS + [
+        # Subnet counts no longer depend on the address, so the old signature goes
+        "DROP FUNCTION IF EXISTS apply_ip_statistics_delta(INTEGER, VARCHAR, CIDR, INTEGER)",
+    ] + SUBNET_ASSIGNMENT_TRIGGERS + [
+        # Backfill assignments, then recount per subnet from them
+        """
+        UPDATE ip_addresses ip
+           SET subnet_id = m.subnet_id
+          FROM (SELECT id, longest_prefix_subnet(site_id, ip_cidr) AS subnet_id FROM ip_addresses) m
+         WHERE ip.id = m.id
+           AND ip.subnet_id IS DISTINCT FROM m.subnet_id
+        """,
+        "SELECT rebuild_inventory_statistics()",
+    ]),
+    ("0008_ip_updated_at_index", [
+        "CREATE INDEX IF NOT EXISTS idx_ip_addresses_updated_at ON ip_addresses (updated_at)",
+    ]),
+    ("0009_ip_deletion_log", IP_DELETION_LOG),
+]
+
+# Exclusion constraint rejecting overlapping subnets, one definition per scope.
+# It is not part of MIGRATIONS because the scope comes from SUBNET_OVERLAP_SCOPE.
+SUBNET_OVERLAP_CONSTRAINT = "exclude_overlapping_subnets"
+SUBNET_OVERLAP_DEFINITIONS = {
+    'site': "EXCLUDE USING gist (site_id WITH =, subnet_cidr inet_ops WITH &&)",
+    'global': "EXCLUDE USING gist (subnet_cidr inet_ops WITH &&)",
+}
+
+def apply_migrations(engine):
+    """Apply all pending migrations, returning the names that were applied"""
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                name VARCHAR(100) PRIMARY KEY,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """))
+        applied = {row[0] for row in conn.execute(text("SELECT name FROM schema_migrations"))}
+    
+    newly_applied = []
+    for name, statements in MIGRATIONS:
+        if name in applied:
+            continue
+        
+        # One transaction per migration so a failure leaves earlier ones recorded
+        with engine.begin() as conn:
+            for statement in statements:
+                conn.execute(text(statement))
+            conn.execute(
+                text("INSERT INTO schema_migrations (name) VALUES (:name)"),
+                {"name": name}
+            )
+        newly_applied.append(name)
+    
+    return newly_applied
+
+def get_subnet_overlap_scope(conn) -> str:
+    """Scope of the installed subnet exclusion constraint: 'site', 'global' or 'off'"""
+    definition = conn.execute(text("""
+        SELECT pg_get_constraintdef(oid) FROM pg_constraint
+         WHERE conname = :name AND conrelid = 'subnets'::regclass
+    """), {"name": SUBNET_OVERLAP_CONSTRAINT}).scalar()
+    if definition is None:
+        return 'off'
+    return 'site' if 'site_id WITH =' in definition else 'global'
+
+def sync_subnet_overlap_constraint(engine, scope: str) -> Optional[str]:
+    """Install, replace or drop the subnet exclusion constraint to match scope
+
+    Returns a warning when existing overlapping subnets prevent the requested
+    constraint; the previous constraint (if any) is then left in place.
+    """
+    if scope not in SUBNET_OVERLAP_DEFINITIONS and scope != 'off':
+        return f"Unknown SUBNET_OVERLAP_SCOPE '{scope}'; expected site, global or off"
+
+    with engine.connect() as conn:
+        if get_subnet_overlap_scope(conn) == scope:
+            return None
+
+    try:
+        with engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE subnets DROP CONSTRAINT IF EXISTS {SUBNET_OVERLAP_CONSTRAINT}"))
+            if scope != 'off':
+                conn.execute(text(
+                    f"ALTER TABLE subnets ADD CONSTRAINT {SUBNET_OVERLAP_CONSTRAINT} "
+                    f"{SUBNET_OVERLAP_DEFINITIONS[scope]}"
+                ))
+    except IntegrityError:
+        return (f"Existing overlapping subnets prevent the {scope} overlap constraint; "
+                "resolve them using the overlap report")
+    return None
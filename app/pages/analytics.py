@@ -0,0 +1,339 @@
+"""
+Analytics page for IP Address Tracker
+Growth and utilization trends served from periodic utilization snapshots
+"""
+
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+from datetime import datetime, timedelta
+from models.database import get_db_session, Site, Subnet
+from utils.snapshots import load_utilization_history, take_snapshot, SNAPSHOT_INTERVAL_MINUTES
+from utils.free_space import compute_free_space
+from utils.heatmap import DRILL_PREFIXES, load_block_counts, build_heatmap_grid, populated_blocks
+
+TIME_RANGES = {
+    "Last 24 hours": timedelta(days=1),
+    "Last 7 days": timedelta(days=7),
+    "Last 30 days": timedelta(days=30),
+    "Last 90 days": timedelta(days=90),
+    "Last year": timedelta(days=365)
+}
+
+STATUS_SERIES = {
+    'ip_active': 'Active',
+    'ip_inactive': 'Inactive',
+    'ip_reserved': 'Reserved'
+}
+
+def render_analytics_page():
+    """Render the analytics page"""
+    st.header("📊 Analytics")
+
+    view = st.radio("View", ["📈 Trends", "🧩 Free Space", "🗺️ Address Map"], horizontal=True,
+                    label_visibility="collapsed")
+
+    if view == "📈 Trends":
+        render_trends()
+    elif view == "🧩 Free Space":
+        render_free_space()
+    else:
+        render_address_map()
+
+def render_trends():
+    """Render growth and utilization trends from the snapshot table"""
+    col1, col2, col3 = st.columns([2, 2, 1])
+
+    with col1:
+        time_range = st.selectbox("Time range", list(TIME_RANGES.keys()), index=1)
+
+    with col2:
+        scope = st.radio("Scope", ["Global", "Site", "Subnet"], horizontal=True)
+
+    with col3:
+        st.write("")
+        if st.button("📸 Capture now", help="Record a utilization snapshot immediately"):
+            try:
+                take_snapshot()
+                st.success("Snapshot captured")
+            except Exception as e:
+                st.error(f"Error capturing snapshot: {str(e)}")
+
+    if SNAPSHOT_INTERVAL_MINUTES > 0:
+        st.caption(f"Snapshots are sampled every {SNAPSHOT_INTERVAL_MINUTES} minutes")
+    else:
+        st.caption("Background sampling is disabled; run `python -m utils.snapshots` to record snapshots")
+
+    start = datetime.now() - TIME_RANGES[time_range]
+
+    if scope == "Global":
+        render_inventory_trend(start, "global")
+    elif scope == "Site":
+        render_site_trend(start)
+    else:
+        render_subnet_trend(start)
+
+def load_history(scope, start, site_id=None, subnet_id=None):
+    """Load downsampled snapshot history for one scope"""
+    session = get_db_session()
+    try:
+        return load_utilization_history(session, scope, start, site_id=site_id, subnet_id=subnet_id)
+    except Exception as e:
+        st.error(f"Error loading utilization history: {str(e)}")
+        return pd.DataFrame()
+    finally:
+        session.close()
+
+def get_site_options():
+    """Get site id -> name mapping for the selectors"""
+    session = get_db_session()
+    try:
+        return {site.id: site.name for site in session.query(Site).order_by(Site.name).all()}
+    finally:
+        session.close()
+
+def render_site_trend(start):
+    """Render inventory trend for one site"""
+    sites = get_site_options()
+    if not sites:
+        st.info("No sites available")
+        return
+
+    site_id = st.selectbox("Site", list(sites.keys()), format_func=lambda site_id: sites[site_id])
+    render_inventory_trend(start, "site", site_id=site_id)
+
+def render_subnet_trend(start):
+    """Render utilization trend for one subnet"""
+    session = get_db_session()
+    try:
+        subnets = {
+            subnet.id: f"{subnet.subnet_cidr} ({subnet.name})"
+            for subnet in session.query(Subnet).order_by(Subnet.subnet_cidr).all()
+        }
+    finally:
+        session.close()
+
+    if not subnets:
+        st.info("No subnets available")
+        return
+
+    subnet_id = st.selectbox("Subnet", list(subnets.keys()), format_func=lambda subnet_id: subnets[subnet_id])
+    df = load_history("subnet", start, subnet_id=subnet_id)
+    if df.empty:
+        st.info("No snapshots recorded for this range yet")
+        return
+
+    st.subheader("📈 Subnet Utilization")
+    fig = px.line(df, x='bucket', y='utilization', title="Utilization (%)", markers=len(df) < 50,
+                  color_discrete_sequence=['#FF6B35'])
+    fig.update_yaxes(range=[0, 100])
+    st.plotly_chart(style_figure(fig), use_container_width=True)
+
+    fig = px.line(df, x='bucket', y='used', title="Used Addresses", markers=len(df) < 50,
+                  color_discrete_sequence=['#FF6B35'])
+    st.plotly_chart(style_figure(fig), use_container_width=True)
+
+def render_inventory_trend(start, scope, site_id=None):
+    """Render IP totals and status trend charts for the global or site scope"""
+    df = load_history(scope, start, site_id=site_id)
+    if df.empty:
+        st.info("No snapshots recorded for this range yet")
+        return
+
+    latest = df.iloc[-1]
+    first = df.iloc[0]
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("IP Addresses", f"{latest['ip_total']:,.0f}", f"{latest['ip_total'] - first['ip_total']:+,.0f}")
+    with col2:
+        st.metric("Active", f"{latest['ip_active']:,.0f}", f"{latest['ip_active'] - first['ip_active']:+,.0f}")
+    with col3:
+        st.metric("Subnets", f"{latest['subnet_total']:,.0f}", f"{latest['subnet_total'] - first['subnet_total']:+,.0f}")
+
+    st.subheader("📈 IP Address Growth")
+    fig = px.line(df, x='bucket', y='ip_total', title="Total IP Addresses", markers=len(df) < 50,
+                  color_discrete_sequence=['#FF6B35'])
+    st.plotly_chart(style_figure(fig), use_container_width=True)
+
+    st.subheader("📊 Status Over Time")
+    status_df = df.melt(
+        id_vars='bucket', value_vars=list(STATUS_SERIES.keys()), var_name='status', value_name='count'
+    )
+    status_df['status'] = status_df['status'].map(STATUS_SERIES)
+    fig = px.area(
+        status_df,
+        x='bucket',
+        y='count',
+        color='status',
+        title="IP Addresses by Status",
+        color_discrete_map={'Active': '#00ff00', 'Inactive': '#ff0000', 'Reserved': '#FFA500'}
+    )
+    st.plotly_chart(style_figure(fig), use_container_width=True)
+
+def render_free_space():
+    """Render free-space and fragmentation analysis for every subnet"""
+    sites = get_site_options()
+    site_id = st.selectbox(
+        "Site", [None] + list(sites.keys()),
+        format_func=lambda site_id: "All Sites" if site_id is None else sites[site_id],
+        key="free_space_site"
+    )
+
+    session = get_db_session()
+    try:
+        result = compute_free_space(session, site_id)
+    except Exception as e:
+        st.error(f"Error analyzing free space: {str(e)}")
+        return
+    finally:
+        session.close()
+
+    summary = result['summary']
+    if summary.empty:
+        st.info("No subnets available")
+        return
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Subnets", f"{len(summary):,}")
+    with col2:
+        st.metric("Fragmented (>50%)", f"{int((summary['fragmentation'] > 0.5).sum()):,}")
+    with col3:
+        st.metric("Full", f"{int((summary['free'] == 0).sum()):,}")
+
+    st.subheader("🧩 Fragmentation vs Utilization")
+    fig = px.scatter(
+        summary,
+        x='utilization',
+        y='fragmentation',
+        hover_name='subnet',
+        hover_data=['site', 'free_blocks', 'largest_free'],
+        title="Subnets by Utilization (%) and Fragmentation",
+        color_discrete_sequence=['#FF6B35']
+    )
+    st.plotly_chart(style_figure(fig), use_container_width=True)
+
+    st.subheader("📋 Free Space by Subnet")
+    table = summary.sort_values('fragmentation', ascending=False)
+    columns = ['subnet', 'site', 'name', 'capacity', 'used', 'free', 'free_blocks', 'largest_free', 'fragmentation']
+    st.dataframe(
+        table[columns].astype({'capacity': str, 'used': str, 'free': str, 'largest_free': str}),
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            "subnet": "Subnet CIDR",
+            "site": "Site",
+            "name": "Name",
+            "capacity": "Capacity",
+            "used": "Used",
+            "free": "Free",
+            "free_blocks": "Free Blocks",
+            "largest_free": "Largest Free Block",
+            "fragmentation": st.column_config.ProgressColumn(
+                "Fragmentation",
+                help="Share of free space outside the largest free block",
+                format="%.2f",
+                min_value=0,
+                max_value=1,
+            )
+        }
+    )
+    st.download_button(
+        "📥 Download Summary CSV",
+        table[columns + ['utilization']].to_csv(index=False),
+        file_name=f"free_space_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+        mime="text/csv"
+    )
+
+    st.subheader("🔍 Free Ranges")
+    subnet_id = st.selectbox(
+        "Subnet", table['subnet_id'].tolist(),
+        format_func=lambda subnet_id: summary.loc[summary['subnet_id'] == subnet_id, 'subnet'].iat[0],
+        key="free_space_subnet"
+    )
+    ranges = result['free_ranges']
+    ranges = ranges[ranges['subnet_id'] == subnet_id].drop(columns=['subnet_id'])
+    if ranges.empty:
+        st.info("This subnet has no free addresses")
+        return
+
+    st.dataframe(ranges.astype({'size': str}), use_container_width=True, hide_index=True)
+    st.download_button(
+        "📥 Download Free Ranges CSV",
+        ranges.to_csv(index=False),
+        file_name=f"free_ranges_{subnet_id}.csv",
+        mime="text/csv"
+    )
+
+def render_address_map():
+    """Render the IPv4 occupancy heatmap with /16 -> /24 -> address drill-down"""
+    sites = get_site_options()
+    site_id = st.selectbox(
+        "Site", [None] + list(sites.keys()),
+        format_func=lambda site_id: "All Sites" if site_id is None else sites[site_id],
+        key="address_map_site"
+    )
+
+    parent = "0.0.0.0/0"
+    session = get_db_session()
+    try:
+        while parent is not None:
+            parent = render_heatmap_level(session, parent, site_id)
+    except Exception as e:
+        st.error(f"Error loading address map: {str(e)}")
+    finally:
+        session.close()
+
+def render_heatmap_level(session, parent, site_id):
+    """Render one heatmap level and return the block chosen for drill-down"""
+    parent_prefix = int(parent.split('/')[1])
+    prefix = DRILL_PREFIXES[parent_prefix]
+    counts = load_block_counts(session, parent, prefix, site_id)
+
+    if not counts.any():
+        st.info(f"No IPv4 addresses in {parent}")
+        return None
+
+    grid = build_heatmap_grid(parent, prefix, counts, compact_rows=parent_prefix == 0)
+    title = "IPv4 Space by /16" if parent_prefix == 0 else f"{parent} by /{prefix}"
+    st.subheader(f"🗺️ {title}")
+
+    fig = go.Figure(go.Heatmap(
+        z=grid['z'],
+        x=grid['columns'],
+        y=[str(row) for row in grid['rows']],
+        customdata=grid['labels'],
+        zmin=0,
+        zmax=grid['block_size'] if prefix < 32 else 1,
+        colorscale=[[0, '#1e1e1e'], [0.5, '#FFA500'], [1, '#FF6B35']],
+        hovertemplate="%{customdata}<br>%{z:,} addresses<extra></extra>",
+        showscale=prefix < 32
+    ))
+    fig.update_yaxes(autorange='reversed', type='category')
+    fig.update_layout(height=max(300, min(900, 18 * len(grid['rows']) + 120)))
+    st.plotly_chart(style_figure(fig), use_container_width=True)
+
+    if prefix == 32:
+        return None
+
+    blocks = dict(populated_blocks(parent, prefix, counts))
+    choice = st.selectbox(
+        f"Drill into a /{prefix}",
+        [None] + list(blocks.keys()),
+        format_func=lambda cidr: "Select a block..." if cidr is None else f"{cidr} ({blocks[cidr]:,} addresses)",
+        key=f"address_map_{parent_prefix}"
+    )
+    return choice
+
+def style_figure(fig):
+    """Apply the app's dark chart styling"""
+    fig.update_layout(
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font_color='white',
+        title_font_color='white',
+        xaxis=dict(gridcolor='rgba(255,255,255,0.1)', title=None),
+        yaxis=dict(gridcolor='rgba(255,255,255,0.1)')
+    )
+    return fig
@@ -10,6 +10,18 @@ import plotly.graph_objects as go
 from datetime import datetime, timedelta
 from sqlalchemy import func
 from models.database import get_db_session, Site, IPAddress, Subnet
+from utils.cache import SnapshotCache
+from utils.utilization import compute_subnet_utilization
+from utils.statistics import get_global_statistics, get_site_statistics
+from utils.charts import top_n_with_other, filter_threshold
+from components.pagination import render_page_size_selector, get_page_number, render_page_number_controls
+
+# Largest categories drawn individually; the rest are folded into "Other"
+SITE_CHART_TOP_N = 10
+SUBNET_CHART_TOP_N = 25
+
+# Utilization thresholds (%) offered for the subnet chart and table
+UTILIZATION_THRESHOLDS = [0, 50, 80, 90]
 
 def render_dashboard():
     """Render the main dashboard page"""
@@ -22,6 +34,8 @@ def render_dashboard():
         st.error("Unable to load dashboard data")
         return
     
+    st.caption(f"Data as of {dashboard_data['computed_at'].strftime('%Y-%m-%d %H:%M:%S')}")
+    
     # Render overview metrics
     render_overview_metrics(dashboard_data)
     
@@ -37,80 +51,85 @@ def render_dashboard():
         render_subnet_utilization(dashboard_data)
 
 def get_dashboard_data():
-    """Get all data needed for dashboard"""
+    """Get all data needed for dashboard from the shared snapshot"""
+    try:
+        return dashboard_snapshot.get()
+    except Exception as e:
+        st.error(f"Error loading dashboard data: {str(e)}")
+        return None
+
+def compute_dashboard_snapshot():
+    """Compute dashboard data plus its prebuilt Plotly figures"""
+    data = compute_dashboard_data()
+    data['figures'] = build_dashboard_figures(data)
+    data['computed_at'] = datetime.now()
+    return data
+
+def compute_dashboard_data():
+    """Query all data needed for dashboard
+    
+    Uses a fixed number of queries regardless of how many sites, subnets or
+    IP addresses exist, reading counters rather than counting rows.
+    """
     session = get_db_session()
     
     try:
         data = {}
         
-        # Basic counts
-        data['total_ips'] = session.query(IPAddress).count()
-        data['total_sites'] = session.query(Site).count()
-        data['total_subnets'] = session.query(Subnet).count()
-        data['active_ips'] = session.query(IPAddress).filter_by(status='active').count()
-        data['inactive_ips'] = session.query(IPAddress).filter_by(status='inactive').count()
-        data['reserved_ips'] = session.query(IPAddress).filter_by(status='reserved').count()
+        # Basic counts from the trigger-maintained counter cache
+        stats = get_global_statistics(session)
+        data['total_ips'] = stats['ip_total']
+        data['total_sites'] = stats['site_total']
+        data['total_subnets'] = stats['subnet_total']
+        data['active_ips'] = stats['ip_active']
+        data['inactive_ips'] = stats['ip_inactive']
+        data['reserved_ips'] = stats['ip_reserved']
         
-        # Site distribution
-        site_counts = session.query(
-            Site.name,
-            func.count(IPAddress.id).label('ip_count')
-        ).outerjoin(IPAddress).group_by(Site.name).all()
-        
-        data['site_distribution'] = [
-            {'site': site, 'count': count} for site, count in site_counts
-        ]
+        # Site distribution, largest sites plus one "Other" slice
+        data['site_distribution'] = top_n_with_other(
+            [{'site': site['site'], 'count': site['ip_total']} for site in get_site_statistics(session)],
+            'site', 'count', SITE_CHART_TOP_N, other_label="Other sites"
+        )
         
-        # Recent activity (last 7 days)
+        # Recent activity (last 7 days), site names joined in
         week_ago = datetime.now() - timedelta(days=7)
-        recent_ips = session.query(IPAddress).filter(
+        recent_ips = session.query(
+            IPAddress.ip_cidr,
+            IPAddress.hostname,
+            IPAddress.created_at,
+            Site.name.label('site_name')
+        ).outerjoin(Site, Site.id == IPAddress.site_id).filter(
             IPAddress.created_at >= week_ago
         ).order_by(IPAddress.created_at.desc()).limit(10).all()
         
         data['recent_activity'] = []
         for ip in recent_ips:
-            site_name = session.query(Site.name).filter_by(id=ip.site_id).scalar()
             data['recent_activity'].append({
                 'ip': str(ip.ip_cidr),
                 'hostname': ip.hostname or 'N/A',
-                'site': site_name,
+                'site': ip.site_name,
                 'created': ip.created_at.strftime('%Y-%m-%d %H:%M')
             })
         
-        # Subnet utilization
-        subnets = session.query(Subnet).all()
-        data['subnet_utilization'] = []
-        
-        for subnet in subnets:
-            site_name = session.query(Site.name).filter_by(id=subnet.site_id).scalar()
-            ip_count = session.query(IPAddress).filter(
-                IPAddress.site_id == subnet.site_id,
-                IPAddress.ip_cidr.op('<<')(subnet.subnet_cidr)
-            ).count()
-            
-            # Calculate subnet capacity (simplified)
-            import ipaddress
-            network = ipaddress.ip_network(str(subnet.subnet_cidr))
-            capacity = network.num_addresses - 2  # Exclude network and broadcast
-            utilization = (ip_count / capacity * 100) if capacity > 0 else 0
-            
-            data['subnet_utilization'].append({
-                'subnet': str(subnet.subnet_cidr),
-                'name': subnet.name,
-                'site': site_name,
-                'used': ip_count,
-                'capacity': capacity,
-                'utilization': round(utilization, 1)
-            })
+        # Subnet utilization from the per-subnet used-address counters
+        data['subnet_utilization'] = compute_subnet_utilization(session, use_counters=True)
         
         return data
         
-    except Exception as e:
-        st.error(f"Error loading dashboard data: {str(e)}")
-        return None
     finally:
         session.close()
 
+def build_dashboard_figures(data):
+    """Build every dashboard figure once per snapshot"""
+    return {
+        'site_distribution': build_site_distribution_figure(data) if data['site_distribution'] else None,
+        'ip_status': build_ip_status_figure(data),
+        'subnet_utilization': {
+            threshold: build_subnet_utilization_figure(data, threshold)
+            for threshold in UTILIZATION_THRESHOLDS
+        } if data['subnet_utilization'] else None
+    }
+
 def render_overview_metrics(data):
     """Render overview metrics cards"""
     st.subheader("📊 Overview")
@@ -161,6 +180,10 @@ def render_site_distribution_chart(data):
         st.info("No data available for site distribution")
         return
     
+    st.plotly_chart(data['figures']['site_distribution'], use_container_width=True)
+
+def build_site_distribution_figure(data):
+    """Build site distribution pie chart"""
     df = pd.DataFrame(data['site_distribution'])
     
     fig = px.pie(
@@ -178,12 +201,16 @@ def render_site_distribution_chart(data):
         title_font_color='white'
     )
     
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
 
 def render_ip_status_chart(data):
     """Render IP status distribution chart"""
     st.subheader("📊 IP Status Distribution")
     
+    st.plotly_chart(data['figures']['ip_status'], use_container_width=True)
+
+def build_ip_status_figure(data):
+    """Build IP status distribution chart"""
     status_data = [
         {'status': 'Active', 'count': data['active_ips']},
         {'status': 'Inactive', 'count': data['inactive_ips']},
@@ -214,7 +241,7 @@ def render_ip_status_chart(data):
         yaxis=dict(gridcolor='rgba(255,255,255,0.1)')
     )
     
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
 
 def render_recent_activity(data):
     """Render recent activity table"""
@@ -247,33 +274,28 @@ def render_subnet_utilization(data):
         st.info("No subnet data available")
         return
     
-    df = pd.DataFrame(data['subnet_utilization'])
-    
-    # Create horizontal bar chart
-    fig = px.bar(
-        df,
-        x='utilization',
-        y='name',
-        orientation='h',
-        title="Subnet Utilization (%)",
-        color='utilization',
-        color_continuous_scale=['#00ff00', '#FFA500', '#ff0000'],
-        range_color=[0, 100]
-    )
-    
-    fig.update_layout(
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        font_color='white',
-        title_font_color='white',
-        xaxis=dict(gridcolor='rgba(255,255,255,0.1)'),
-        yaxis=dict(gridcolor='rgba(255,255,255,0.1)')
+    threshold = st.selectbox(
+        "Show subnets",
+        UTILIZATION_THRESHOLDS,
+        format_func=lambda value: "All subnets" if value == 0 else f"≥ {value}% utilized",
+        key="dashboard_utilization_threshold"
     )
     
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(data['figures']['subnet_utilization'][threshold], use_container_width=True)
     
-    # Show detailed table
+    # Show detailed table, one page at a time
     with st.expander("📋 Detailed Subnet Information"):
+        subnets = filter_threshold(data['subnet_utilization'], 'utilization', threshold)
+        if not subnets:
+            st.info("No subnets at this utilization")
+            return
+        
+        page_size = render_page_size_selector("dashboard_subnets")
+        page_count = -(-len(subnets) // page_size)
+        page_number = get_page_number("dashboard_subnets", (threshold, page_size), page_count)
+        start = (page_number - 1) * page_size
+        df = pd.DataFrame(subnets[start:start + page_size])
+        
         st.dataframe(
             df[['subnet', 'site', 'used', 'capacity', 'utilization']],
             use_container_width=True,
@@ -292,4 +314,41 @@ def render_subnet_utilization(data):
                 )
             }
         )
+        
+        render_page_number_controls("dashboard_subnets", page_number, page_count, len(subnets))
+
+def build_subnet_utilization_figure(data, threshold=0):
+    """Build subnet utilization horizontal bar chart for the most utilized subnets"""
+    subnets = filter_threshold(data['subnet_utilization'], 'utilization', threshold)
+    top = subnets[:SUBNET_CHART_TOP_N]
+    df = pd.DataFrame(top, columns=['name', 'subnet', 'utilization'])
+    df['label'] = df['name'] + " (" + df['subnet'] + ")"
+    
+    title = "Subnet Utilization (%)"
+    if len(subnets) > len(top):
+        title = f"Top {len(top)} of {len(subnets):,} Subnets by Utilization (%)"
+    
+    fig = px.bar(
+        df,
+        x='utilization',
+        y='label',
+        orientation='h',
+        title=title,
+        color='utilization',
+        color_continuous_scale=['#00ff00', '#FFA500', '#ff0000'],
+        range_color=[0, 100]
+    )
+    
+    fig.update_layout(
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font_color='white',
+        title_font_color='white',
+        xaxis=dict(gridcolor='rgba(255,255,255,0.1)'),
+        yaxis=dict(gridcolor='rgba(255,255,255,0.1)', autorange='reversed', title=None)
+    )
+    
+    return fig
 
+# One dashboard computation shared by every session, refreshed in the background
+dashboard_snapshot = SnapshotCache(compute_dashboard_snapshot, max_age=60, name="dashboard")
@@ -143,17 +143,18 @@ def render_export_section():
     # Export type selection
     export_type = st.selectbox(
         "Select Data Type to Export",
-        ["ip_addresses", "sites", "subnets"],
+        ["ip_addresses", "sites", "subnets", "ip_ranges"],
         format_func=lambda x: {
             "ip_addresses": "🌐 IP Addresses",
             "sites": "🏢 Sites", 
-            "subnets": "🔗 Subnets"
+            "subnets": "🔗 Subnets",
+            "ip_ranges": "📦 Address Ranges"
         }[x]
     )
     
     # Site filter for IP addresses and subnets
     site_filter = None
-    if export_type in ["ip_addresses", "subnets"]:
+    if export_type in ["ip_addresses", "subnets", "ip_ranges"]:
         sites = get_sites_for_filter()
         site_filter = st.selectbox(
             "Filter by Site",
@@ -6,13 +6,32 @@ Handles IP address and hostname search functionality
 import streamlit as st
 import pandas as pd
 import ipaddress
-from sqlalchemy import or_, and_
+from sqlalchemy import func
 from models.database import get_db_session, Site, IPAddress, Subnet
+from utils.search_engine import (
+    build_search_query, normalize_search_filters, normalize_ip_query, fetch_keyset_page, estimate_query_count,
+    DEFAULT_PAGE_SIZE
+)
+from utils.cache import get_data_version, search_results_cache, browse_cache
+from utils.ranges import build_range_search_query, range_to_dict
+from utils.prefix_trie import get_prefix_index
+from utils.inventory_snapshot import get_inventory_snapshot
+from utils.bulk_lookup import parse_address_list, bulk_lookup, MAX_BULK_ADDRESSES
+from components.pagination import render_page_size_selector, get_page_cursor, render_pagination_controls
+
+# Most matching address ranges listed above the IP results
+RANGE_RESULT_LIMIT = 100
 
 def render_search_page():
     """Render the search and browse page"""
     st.header("🔍 Search & Browse")
     
+    mode = st.radio("Mode", ["🔍 Search", "📋 Bulk Lookup"], horizontal=True,
+                    label_visibility="collapsed", key="search_mode")
+    if mode == "📋 Bulk Lookup":
+        render_bulk_lookup()
+        return
+    
     # Get available sites for the dropdown
     session = get_db_session()
     try:
@@ -76,6 +95,14 @@ def render_search_page():
                 placeholder="e.g., IT Team, John Doe",
                 key="owner_filter"
             )
+        
+        in_memory = st.checkbox(
+            "⚡ In-memory filtering",
+            key="search_in_memory",
+            help="Filter a columnar snapshot of all IP entries held by the app instead of querying "
+                 "the database on every change. The snapshot refreshes after writes and "
+                 "periodically; address ranges are only listed for search terms."
+        )
     
     # Display active filters
     active_filters = []
@@ -100,107 +127,108 @@ def render_search_page():
             st.session_state['owner_filter'] = ''
             st.rerun()
     
-    # Perform search
-    search_results = perform_search(
-        search_query=search_query,
-        site_filter=site_filter,
-        status_filter=status_filter,
-        role_filter=role_filter,
-        owner_filter=owner_filter
-    )
+    # Perform search (one keyset page per rerun)
+    search_filters = {
+        'search_query': search_query,
+        'site_filter': site_filter,
+        'status_filter': status_filter,
+        'role_filter': role_filter,
+        'owner_filter': owner_filter
+    }
+    page_size = st.session_state.get("search_results_page_size", DEFAULT_PAGE_SIZE)
+    cursor = get_page_cursor("search_results", (tuple(search_filters.values()), page_size))
+    
+    search_results = perform_search(**search_filters, page_size=page_size, cursor=cursor, in_memory=in_memory)
     
     # Display results
     if search_results is not None:
-        display_search_results(search_results, search_query)
+        display_search_results(search_results, search_filters)
     
     # Browse all data section
     st.markdown("---")
     render_browse_section(site_filter)
 
-def perform_search(search_query, site_filter, status_filter, role_filter, owner_filter):
-    """Perform search based on provided criteria"""
+def render_bulk_lookup():
+    """Resolve a pasted or uploaded list of addresses in one query"""
+    st.caption(f"Paste addresses separated by spaces, commas or new lines, or upload a file "
+               f"(up to {MAX_BULK_ADDRESSES:,} addresses)")
+    
+    raw_text = st.text_area(
+        "Addresses",
+        height=200,
+        placeholder="10.0.0.5\n10.0.0.6, 192.168.1.20",
+        key="bulk_lookup_text"
+    )
+    uploaded_file = st.file_uploader("Or upload a file", type=['txt', 'csv', 'log'], key="bulk_lookup_file")
+    if uploaded_file is not None:
+        raw_text = f"{raw_text}\n{uploaded_file.getvalue().decode('utf-8', errors='ignore')}"
+    
+    addresses, invalid = parse_address_list(raw_text)
+    if invalid:
+        sample = ', '.join(invalid[:10]) + (' ...' if len(invalid) > 10 else '')
+        st.warning(f"Ignoring {len(invalid):,} entries that are not IP addresses: {sample}")
+    
+    if st.button("🔎 Resolve", type="primary", disabled=not addresses):
+        session = get_db_session()
+        try:
+            st.session_state['bulk_lookup_result'] = {
+                'addresses': tuple(addresses),
+                'data': bulk_lookup(session, addresses)
+            }
+        except ValueError as e:
+            st.error(str(e))
+        except Exception as e:
+            st.error(f"Bulk lookup error: {str(e)}")
+        finally:
+            session.close()
+    
+    # Keep showing the last result while the input is unchanged (downloads rerun the page)
+    result = st.session_state.get('bulk_lookup_result')
+    if result is None or result['addresses'] != tuple(addresses):
+        return
+    
+    df = result['data']
+    matches = df.groupby('Address')['Match'].agg(set)
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Addresses", f"{len(addresses):,}")
+    col2.metric("Known Records", f"{int(matches.map(lambda kinds: 'record' in kinds).sum()):,}")
+    col3.metric("Subnet Only", f"{int(matches.map(lambda kinds: kinds == {'subnet'}).sum()):,}")
+    col4.metric("Unknown", f"{int(matches.map(lambda kinds: kinds == {'unknown'}).sum()):,}")
+    
+    st.dataframe(df, use_container_width=True, hide_index=True, height=400)
+    st.download_button(
+        "📥 Download CSV",
+        df.to_csv(index=False),
+        file_name=f"bulk_ip_lookup_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.csv",
+        mime="text/csv"
+    )
+
+def perform_search(search_query, site_filter, status_filter, role_filter, owner_filter,
+                   page_size=DEFAULT_PAGE_SIZE, cursor=None, in_memory=False):
+    """Perform search based on provided criteria, returning one page of results"""
+    filters = normalize_search_filters(search_query, site_filter, status_filter, role_filter, owner_filter)
+    
+    # Reruns with unchanged filters are served from memory until data is written
+    cache_key = (filters, page_size, repr(cursor), in_memory, get_data_version())
+    hit, cached_results = search_results_cache.get(cache_key)
+    if hit:
+        return cached_results
+    
     session = get_db_session()
     
     try:
-        # Base query
-        query = session.query(
-            IPAddress.id,
-            IPAddress.ip_cidr,
-            IPAddress.hostname,
-            IPAddress.gateway,
-            IPAddress.role,
-            IPAddress.system_owner,
-            IPAddress.description,
-            IPAddress.status,
-            IPAddress.created_at,
-            IPAddress.updated_at,
-            Site.name.label('site_name')
-        ).join(Site)
-        
-        # Apply filters
-        filters = []
-        
-        # Site filter
-        if site_filter and site_filter != 'ALL':
-            filters.append(Site.name == site_filter)
-        
-        # Status filter
-        if status_filter and status_filter != 'All':
-            filters.append(IPAddress.status == status_filter)
-        
-        # Role filter
-        if role_filter:
-            filters.append(IPAddress.role.ilike(f'%{role_filter}%'))
-        
-        # Owner filter
-        if owner_filter:
-            filters.append(IPAddress.system_owner.ilike(f'%{owner_filter}%'))
-        
-        # Search query filter
-        if search_query:
-            search_filters = []
-            
-            # Try to parse as IP address
-            try:
-                # Handle both single IP and CIDR notation
-                if '/' not in search_query:
-                    search_ip = f"{search_query}/32"
-                else:
-                    search_ip = search_query
-                
-                # Validate IP
-                ipaddress.ip_network(search_ip, strict=False)
-                search_filters.append(IPAddress.ip_cidr.op('>>=')(search_ip))
-                search_filters.append(IPAddress.ip_cidr.op('<<=')(search_ip))
-                search_filters.append(IPAddress.ip_cidr == search_ip)
-            except ValueError:
-                pass
-            
-            # Search in hostname
-            search_filters.append(IPAddress.hostname.ilike(f'%{search_query}%'))
-            
-            # Search in description
-            search_filters.append(IPAddress.description.ilike(f'%{search_query}%'))
-            
-            # Search in role
-            search_filters.append(IPAddress.role.ilike(f'%{search_query}%'))
-            
-            # Search in system owner
-            search_filters.append(IPAddress.system_owner.ilike(f'%{search_query}%'))
-            
-            if search_filters:
-                filters.append(or_(*search_filters))
-        
-        # Apply all filters
-        if filters:
-            query = query.filter(and_(*filters))
-        
-        # Execute query
-        results = query.order_by(IPAddress.ip_cidr).all()
+        if in_memory:
+            # Vectorized masks over the columnar snapshot; same page shape and order as SQL
+            page, approx_total = get_inventory_snapshot().search_page(filters, page_size, cursor)
+        else:
+            # Build the planned query (IP and text predicates as UNION branches)
+            query = build_search_query(session, *filters)
+            page = fetch_keyset_page(query, page_size, cursor)
+            approx_total = estimate_query_count(session, query)
         
         # Convert to DataFrame
         data = []
-        for result in results:
+        for result in page['rows']:
             data.append({
                 'ID': result.id,
                 'Site': result.site_name,
@@ -215,7 +243,22 @@ def perform_search(search_query, site_filter, status_filter, role_filter, owner_
                 'Updated': result.updated_at.strftime('%Y-%m-%d %H:%M') if result.updated_at else 'N/A'
             })
         
-        return pd.DataFrame(data)
+        # Ranges covering the queried address or matching the text (few rows, first page only)
+        ranges = []
+        if cursor is None and (filters[0] or not in_memory):
+            range_rows = build_range_search_query(session, *filters).limit(RANGE_RESULT_LIMIT).all()
+            ranges = [range_to_dict(ip_range, site_name) for ip_range, site_name in range_rows]
+        
+        results = {
+            'data': pd.DataFrame(data),
+            'ranges': pd.DataFrame(ranges),
+            'best_match': find_best_match(filters[0], filters[1]) if cursor is None else pd.DataFrame(),
+            'page': {key: value for key, value in page.items() if key != 'rows'},
+            'row_count': len(data),
+            'approx_total': approx_total
+        }
+        search_results_cache.set(cache_key, results)
+        return results
         
     except Exception as e:
         st.error(f"Search error: {str(e)}")
@@ -223,23 +266,77 @@ def perform_search(search_query, site_filter, status_filter, role_filter, owner_
     finally:
         session.close()
 
-def display_search_results(df, search_query):
-    """Display search results in a formatted table"""
-    if df.empty:
-        if search_query:
+def find_best_match(search_query, site_filter):
+    """Most specific subnet and IP entry per site for a single-address query (in-memory index)"""
+    search_ip = normalize_ip_query(search_query or '')
+    if search_ip is None or ipaddress.ip_network(search_ip).num_addresses != 1:
+        return pd.DataFrame()
+    
+    rows = [
+        row for row in get_prefix_index().lookup(search_ip.split('/')[0])
+        if site_filter is None or row['site'] == site_filter
+    ]
+    return pd.DataFrame([{
+        'Site': row['site'],
+        'Subnet': row['subnet'] or 'N/A',
+        'Subnet Name': row['subnet_name'] or 'N/A',
+        'IP Entry': row['ip_cidr'] or 'N/A',
+        'Hostname': row['hostname'] or 'N/A'
+    } for row in rows])
+
+def export_search_results(search_filters):
+    """Export every row matching the search filters (not just the current page) as CSV"""
+    session = get_db_session()
+    
+    try:
+        query = build_search_query(session, *normalize_search_filters(**search_filters))
+        data = []
+        for result in query.order_by(IPAddress.ip_cidr, IPAddress.id).yield_per(1000):
+            data.append({
+                'Site': result.site_name,
+                'IP Address': str(result.ip_cidr),
+                'Hostname': result.hostname or 'N/A',
+                'Gateway': str(result.gateway) if result.gateway else 'N/A',
+                'Role': result.role or 'N/A',
+                'System Owner': result.system_owner or 'N/A',
+                'Description': result.description or 'N/A',
+                'Status': result.status
+            })
+        return pd.DataFrame(data).to_csv(index=False)
+    finally:
+        session.close()
+
+def display_search_results(results, search_filters):
+    """Display one page of search results in a formatted table"""
+    df = results['data']
+    page = results['page']
+    search_query = search_filters['search_query']
+    
+    if not results['best_match'].empty:
+        st.subheader("🧭 Longest-Prefix Match")
+        st.dataframe(results['best_match'], use_container_width=True, hide_index=True)
+    
+    if not results['ranges'].empty:
+        st.subheader(f"📦 Matching Ranges ({len(results['ranges'])})")
+        st.dataframe(results['ranges'].drop('ID', axis=1), use_container_width=True, hide_index=True)
+    
+    if df.empty and not page['has_prev']:
+        if not results['ranges'].empty:
+            st.info("No individual IP addresses match; see the ranges above")
+        elif search_query:
             st.info(f"No results found for '{search_query}'")
         else:
             st.info("No IP addresses match the current filters")
         return
     
-    st.subheader(f"📋 Search Results ({len(df)} found)")
+    st.subheader(f"📋 Search Results (~{results['approx_total']:,} found)")
     
     # Add action buttons
     col1, col2, col3 = st.columns([1, 1, 2])
     
     with col1:
         if st.button("📥 Export Results", key="export_search"):
-            csv_data = df.to_csv(index=False)
+            csv_data = export_search_results(search_filters)
             st.download_button(
                 label="Download CSV",
                 data=csv_data,
@@ -251,6 +348,9 @@ def display_search_results(df, search_query):
         if st.button("🔄 Refresh", key="refresh_search"):
             st.rerun()
     
+    with col3:
+        render_page_size_selector("search_results")
+    
     # Display results table
     display_df = df.drop('ID', axis=1)  # Hide ID column
     
@@ -277,6 +377,8 @@ def display_search_results(df, search_query):
         height=400
     )
     
+    render_pagination_controls("search_results", page, results['row_count'], results['approx_total'])
+    
     # Show detailed view for selected row
     if not df.empty:
         with st.expander("🔍 View Details"):
@@ -318,26 +420,46 @@ def render_ip_details(ip_data):
         st.text(f"Updated: {ip_data['Updated']}")
 
 def render_browse_section(selected_site):
-    """Render browse all data section"""
+    """Render browse all data section, loading only the tab the user opens"""
     st.subheader("📚 Browse All Data")
     
-    tab1, tab2, tab3 = st.tabs(["🌐 IP Addresses", "🏢 Sites", "🔗 Subnets"])
+    # Nothing is fetched until the user asks for it, so search keystrokes stay cheap
+    if not st.toggle("Show inventory browser", key="browse_open"):
+        st.caption("Turn on to browse all IP addresses, sites and subnets")
+        return
     
-    with tab1:
-        render_all_ips_table(selected_site)
+    selected_tab = st.radio(
+        "Browse",
+        ["🌐 IP Addresses", "🏢 Sites", "🔗 Subnets"],
+        horizontal=True,
+        label_visibility="collapsed",
+        key="browse_tab"
+    )
     
-    with tab2:
+    if selected_tab == "🌐 IP Addresses":
+        render_all_ips_table(selected_site)
+    elif selected_tab == "🏢 Sites":
         render_all_sites_table()
-    
-    with tab3:
+    else:
         render_all_subnets_table(selected_site)
 
-def render_all_ips_table(site_filter):
-    """Render table of all IP addresses"""
+def load_browse_tab(tab_key, params, loader):
+    """Load a browse tab's data through the per-tab cache"""
+    cache_key = (tab_key, params, get_data_version())
+    hit, data = browse_cache.get(cache_key)
+    if not hit:
+        data = loader(*params)
+        browse_cache.set(cache_key, data)
+    return data
+
+def load_ips_page(site_filter, page_size, cursor_direction, cursor_key):
+    """Load one keyset page of IP addresses for the browse tab"""
+    cursor = {'direction': cursor_direction, 'key': cursor_key} if cursor_key else None
     session = get_db_session()
     
     try:
         query = session.query(
+            IPAddress.id,
             IPAddress.ip_cidr,
             IPAddress.hostname,
             IPAddress.status,
@@ -348,62 +470,64 @@ def render_all_ips_table(site_filter):
         if site_filter and site_filter != 'ALL':
             query = query.filter(Site.name == site_filter)
         
-        results = query.order_by(IPAddress.ip_cidr).all()
+        page = fetch_keyset_page(query, page_size, cursor)
         
-        if results:
-            data = []
-            for result in results:
-                data.append({
-                    'Site': result.site_name,
-                    'IP Address': str(result.ip_cidr),
-                    'Hostname': result.hostname or 'N/A',
-                    'Role': result.role or 'N/A',
-                    'Status': result.status
-                })
-            
-            df = pd.DataFrame(data)
-            st.dataframe(df, use_container_width=True, hide_index=True)
-        else:
-            st.info("No IP addresses found")
-            
-    except Exception as e:
-        st.error(f"Error loading IP addresses: {str(e)}")
+        data = []
+        for result in page['rows']:
+            data.append({
+                'Site': result.site_name,
+                'IP Address': str(result.ip_cidr),
+                'Hostname': result.hostname or 'N/A',
+                'Role': result.role or 'N/A',
+                'Status': result.status
+            })
+        
+        return {
+            'data': pd.DataFrame(data),
+            'page': {key: value for key, value in page.items() if key != 'rows'},
+            'approx_total': estimate_query_count(session, query)
+        }
     finally:
         session.close()
 
-def render_all_sites_table():
-    """Render table of all sites"""
+def load_sites_table():
+    """Load all sites with IP and subnet counts (grouped, not one query per site)"""
     session = get_db_session()
     
     try:
-        sites = session.query(Site).order_by(Site.name).all()
+        ip_counts = session.query(
+            IPAddress.site_id, func.count(IPAddress.id).label('ip_count')
+        ).group_by(IPAddress.site_id).subquery()
+        subnet_counts = session.query(
+            Subnet.site_id, func.count(Subnet.id).label('subnet_count')
+        ).group_by(Subnet.site_id).subquery()
         
-        if sites:
-            data = []
-            for site in sites:
-                ip_count = session.query(IPAddress).filter_by(site_id=site.id).count()
-                subnet_count = session.query(Subnet).filter_by(site_id=site.id).count()
-                
-                data.append({
-                    'Site Name': site.name,
-                    'Description': site.description or 'N/A',
-                    'Location': site.location or 'N/A',
-                    'IP Count': ip_count,
-                    'Subnet Count': subnet_count
-                })
-            
-            df = pd.DataFrame(data)
-            st.dataframe(df, use_container_width=True, hide_index=True)
-        else:
-            st.info("No sites found")
-            
-    except Exception as e:
-        st.error(f"Error loading sites: {str(e)}")
+        results = session.query(
+            Site.name,
+            Site.description,
+            Site.location,
+            func.coalesce(ip_counts.c.ip_count, 0).label('ip_count'),
+            func.coalesce(subnet_counts.c.subnet_count, 0).label('subnet_count')
+        ).outerjoin(ip_counts, ip_counts.c.site_id == Site.id) \
+         .outerjoin(subnet_counts, subnet_counts.c.site_id == Site.id) \
+         .order_by(Site.name).all()
+        
+        data = []
+        for result in results:
+            data.append({
+                'Site Name': result.name,
+                'Description': result.description or 'N/A',
+                'Location': result.location or 'N/A',
+                'IP Count': result.ip_count,
+                'Subnet Count': result.subnet_count
+            })
+        
+        return pd.DataFrame(data)
     finally:
         session.close()
 
-def render_all_subnets_table(site_filter):
-    """Render table of all subnets"""
+def load_subnets_table(site_filter):
+    """Load all subnets, optionally for a single site"""
     session = get_db_session()
     
     try:
@@ -420,24 +544,63 @@ def render_all_subnets_table(site_filter):
         
         results = query.order_by(Subnet.subnet_cidr).all()
         
-        if results:
-            data = []
-            for result in results:
-                data.append({
-                    'Site': result.site_name,
-                    'Subnet CIDR': str(result.subnet_cidr),
-                    'Name': result.name,
-                    'Description': result.description or 'N/A',
-                    'VLAN ID': result.vlan_id or 'N/A'
-                })
+        data = []
+        for result in results:
+            data.append({
+                'Site': result.site_name,
+                'Subnet CIDR': str(result.subnet_cidr),
+                'Name': result.name,
+                'Description': result.description or 'N/A',
+                'VLAN ID': result.vlan_id or 'N/A'
+            })
+        
+        return pd.DataFrame(data)
+    finally:
+        session.close()
+
+def render_all_ips_table(site_filter):
+    """Render table of all IP addresses, one keyset page at a time"""
+    try:
+        page_size = st.session_state.get("browse_ips_page_size", DEFAULT_PAGE_SIZE)
+        cursor = get_page_cursor("browse_ips", (site_filter, page_size))
+        results = load_browse_tab(
+            'ips',
+            (site_filter, page_size, cursor and cursor['direction'], cursor and tuple(cursor['key'])),
+            load_ips_page
+        )
+        
+        if not results['data'].empty:
+            st.dataframe(results['data'], use_container_width=True, hide_index=True)
+            render_pagination_controls("browse_ips", results['page'], len(results['data']), results['approx_total'])
+            render_page_size_selector("browse_ips")
+        else:
+            st.info("No IP addresses found")
             
-            df = pd.DataFrame(data)
+    except Exception as e:
+        st.error(f"Error loading IP addresses: {str(e)}")
+
+def render_all_sites_table():
+    """Render table of all sites"""
+    try:
+        df = load_browse_tab('sites', (), load_sites_table)
+        
+        if not df.empty:
+            st.dataframe(df, use_container_width=True, hide_index=True)
+        else:
+            st.info("No sites found")
+            
+    except Exception as e:
+        st.error(f"Error loading sites: {str(e)}")
+
+def render_all_subnets_table(site_filter):
+    """Render table of all subnets"""
+    try:
+        df = load_browse_tab('subnets', (site_filter,), load_subnets_table)
+        
+        if not df.empty:
             st.dataframe(df, use_container_width=True, hide_index=True)
         else:
             st.info("No subnets found")
             
     except Exception as e:
         st.error(f"Error loading subnets: {str(e)}")
-    finally:
-        session.close()
-
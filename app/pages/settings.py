@@ -7,7 +7,19 @@ import streamlit as st
 import pandas as pd
 import ipaddress
 from datetime import datetime
-from models.database import get_db_session, Site, IPAddress, Subnet
+from models.database import get_db_session, db_manager, Site, IPAddress, IPRange, Subnet, SUBNET_OVERLAP_SCOPE
+from utils.cache import bump_data_version
+from utils.utilization import compute_subnet_utilization
+from utils.statistics import get_global_statistics
+from utils.maintenance import maintenance_manager, rebuild_statistics_job, purge_inactive_ips_job
+from utils.allocator import find_free_addresses, find_best_fit_block, allocate_addresses, allocate_block
+from utils.ranges import (
+    normalize_range, find_overlapping_ranges, find_covering_range, find_contained_addresses, range_to_dict
+)
+from utils.overlaps import find_overlapping_subnets, build_overlap_report
+from utils.prefix_trie import apply_to_prefix_index
+from utils.search_engine import fetch_keyset_page, estimate_query_count, DEFAULT_PAGE_SIZE
+from components.pagination import render_page_size_selector, get_page_cursor, render_pagination_controls
 
 def render_settings_page():
     """Render the settings and administration page"""
@@ -154,6 +166,10 @@ def render_subnets_management():
                 else:
                     st.error("Site, subnet CIDR, and name are required")
     
+    # Overlap report section
+    with st.expander("🔀 Overlap Report"):
+        render_overlap_report()
+    
     # Display existing subnets
     st.markdown("### 📋 Existing Subnets")
     subnets_df = get_subnets_dataframe()
@@ -195,6 +211,34 @@ def render_subnets_management():
     else:
         st.info("No subnets configured. Add your first subnet above.")
 
+def render_overlap_report():
+    """Render the subnet overlap report and constraint status"""
+    scope_labels = {'site': "within each site", 'global': "across all sites", 'off': "disabled"}
+    st.caption(f"New overlapping subnets are rejected {scope_labels.get(SUBNET_OVERLAP_SCOPE, SUBNET_OVERLAP_SCOPE)} "
+               "(SUBNET_OVERLAP_SCOPE)")
+    if db_manager.overlap_constraint_warning:
+        st.warning(db_manager.overlap_constraint_warning)
+    
+    scope = st.radio(
+        "Report overlaps", ["site", "global"], horizontal=True,
+        format_func=lambda value: scope_labels[value].capitalize(),
+        key="overlap_report_scope"
+    )
+    
+    if st.button("🔍 Find Overlaps", key="find_overlaps"):
+        report = get_overlap_report(scope)
+        if report.empty:
+            st.success("No overlapping subnets found")
+        else:
+            st.warning(f"{len(report):,} overlapping subnet pairs found")
+            st.dataframe(report, use_container_width=True, hide_index=True)
+            st.download_button(
+                "📥 Download Overlap Report",
+                report.to_csv(index=False),
+                file_name=f"subnet_overlaps_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                mime="text/csv"
+            )
+
 def render_ip_management():
     """Render IP address management interface"""
     st.subheader("🌐 IP Address Management")
@@ -238,27 +282,35 @@ def render_ip_management():
                 else:
                     st.error("Site and IP address are required")
     
+    # Allocate next free addresses section
+    with st.expander("🎯 Allocate Next Free IP"):
+        render_ip_allocation()
+    
+    # Address ranges section (DHCP pools, reservations)
+    with st.expander("📦 Address Ranges"):
+        render_range_management()
+    
     # Quick stats
     col1, col2, col3 = st.columns(3)
     
     session = get_db_session()
     try:
-        total_ips = session.query(IPAddress).count()
-        active_ips = session.query(IPAddress).filter_by(status='active').count()
-        reserved_ips = session.query(IPAddress).filter_by(status='reserved').count()
+        stats = get_global_statistics(session)
         
         with col1:
-            st.metric("Total IPs", total_ips)
+            st.metric("Total IPs", stats['ip_total'])
         with col2:
-            st.metric("Active IPs", active_ips)
+            st.metric("Active IPs", stats['ip_active'])
         with col3:
-            st.metric("Reserved IPs", reserved_ips)
+            st.metric("Reserved IPs", stats['ip_reserved'])
     finally:
         session.close()
     
-    # Display existing IP addresses
+    # Display existing IP addresses (one keyset page per rerun)
     st.markdown("### 📋 Existing IP Addresses")
-    ip_addresses_df = get_ip_addresses_dataframe()
+    page_size = st.session_state.get("settings_ips_page_size", DEFAULT_PAGE_SIZE)
+    cursor = get_page_cursor("settings_ips", page_size)
+    ip_addresses_df, page, approx_total = get_ip_addresses_dataframe(page_size, cursor)
     
     if not ip_addresses_df.empty:
         # Display IP addresses with delete buttons
@@ -288,9 +340,138 @@ def render_ip_management():
                         st.error(message)
             
             st.markdown("---")
+        
+        render_pagination_controls("settings_ips", page, len(ip_addresses_df), approx_total)
+        render_page_size_selector("settings_ips")
     else:
         st.info("No IP addresses configured. Add your first IP address above.")
 
+def render_ip_allocation():
+    """Render the next-free-address allocation form"""
+    subnets = get_subnets_list()
+    if not subnets:
+        st.info("No subnets available. Please add a subnet first.")
+        return
+    
+    with st.form("allocate_ip_form"):
+        mode = st.radio(
+            "Allocation",
+            ["Next free addresses", "Contiguous block (best fit)"],
+            horizontal=True,
+            help="A contiguous block uses the smallest free run that fits, keeping large runs intact"
+        )
+        contiguous = mode == "Contiguous block (best fit)"
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            selected_subnet = st.selectbox("Subnet*", subnets, format_func=lambda x: x[1])
+            count = st.number_input("Number of Addresses", min_value=1, max_value=4096, value=1)
+            hostname = st.text_input("Hostname", placeholder="e.g., server (numbered when allocating several)")
+            as_range = st.checkbox(
+                "Store block as one range record",
+                help="Contiguous blocks only: keep the block as a single address range instead of one row per address"
+            )
+        
+        with col2:
+            role = st.text_input("Role", placeholder="e.g., Server, Workstation", key="allocate_role")
+            system_owner = st.text_input("System Owner", placeholder="e.g., IT Team", key="allocate_owner")
+            status = st.selectbox("Status", ["active", "reserved"], key="allocate_status")
+            description = st.text_area("Description", placeholder="Brief description", key="allocate_description")
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            preview = st.form_submit_button("🔍 Show Free Addresses")
+        with col2:
+            allocate = st.form_submit_button("🎯 Allocate")
+    
+    if preview and contiguous:
+        block = get_best_fit_block(selected_subnet[0], int(count))
+        if block:
+            st.info(f"Best-fit block: {block[0]} - {block[1]}")
+        else:
+            st.warning(f"No free block of {int(count)} consecutive addresses in this subnet")
+    elif preview:
+        addresses = get_free_addresses(selected_subnet[0], int(count))
+        if addresses:
+            st.info("Next free: " + ", ".join(addresses))
+        else:
+            st.warning("No free addresses in this subnet")
+    
+    if allocate:
+        if contiguous:
+            success, message = allocate_ip_block(
+                selected_subnet[0], int(count), hostname, role, system_owner, status, description, as_range
+            )
+        else:
+            success, message = allocate_ip_addresses(
+                selected_subnet[0], int(count), hostname, role, system_owner, status, description
+            )
+        if success:
+            st.success(message)
+        else:
+            st.error(message)
+
+def render_range_management():
+    """Render address range creation and listing"""
+    sites = get_sites_list()
+    if not sites:
+        st.info("No sites available. Please add a site first.")
+        return
+    
+    with st.form("add_range_form"):
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            selected_site = st.selectbox("Site*", sites, format_func=lambda x: x[1], key="range_site")
+            start_address = st.text_input("Start Address*", placeholder="e.g., 192.168.1.100")
+            end_address = st.text_input("End Address*", placeholder="e.g., 192.168.1.199")
+            name = st.text_input("Name*", placeholder="e.g., Office DHCP Pool")
+        
+        with col2:
+            role = st.text_input("Role", placeholder="e.g., DHCP Pool", key="range_role")
+            system_owner = st.text_input("System Owner", placeholder="e.g., Network Team", key="range_owner")
+            status = st.selectbox("Status", ["reserved", "active", "inactive"], key="range_status")
+            description = st.text_area("Description", placeholder="Brief description", key="range_description")
+        
+        if st.form_submit_button("Add Range"):
+            if start_address and end_address and name:
+                success, message = add_new_ip_range(
+                    selected_site[0], start_address, end_address, name, role, system_owner, status, description
+                )
+                if success:
+                    st.success(message)
+                    st.rerun()
+                else:
+                    st.error(message)
+            else:
+                st.error("Start address, end address and name are required")
+    
+    ranges_df = get_ranges_dataframe()
+    if ranges_df.empty:
+        st.info("No address ranges configured")
+        return
+    
+    st.dataframe(ranges_df.drop('ID', axis=1), use_container_width=True, hide_index=True)
+    
+    labels = {
+        row['ID']: f"{row['Name']} ({row['Start']} - {row['End']})" for _, row in ranges_df.iterrows()
+    }
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        range_id = st.selectbox(
+            "Range", list(labels.keys()), format_func=lambda range_id: labels[range_id], key="delete_range_select"
+        )
+    with col2:
+        st.write("")
+        if st.button("🗑️ Delete Range", key="delete_range"):
+            success, message = delete_ip_range(range_id)
+            if success:
+                st.success(message)
+                st.rerun()
+            else:
+                st.error(message)
+
 def render_system_settings():
     """Render system settings interface"""
     st.subheader("🔧 System Settings")
@@ -301,12 +482,35 @@ def render_system_settings():
     col1, col2 = st.columns(2)
     
     with col1:
-        if st.button("🧹 Clean Inactive IPs"):
-            st.info("This feature will be implemented in a future version")
+        with st.form("clean_inactive_form"):
+            archive = st.radio(
+                "Action", ["Delete", "Archive"], horizontal=True,
+                help="Archive moves rows to ip_address_archive instead of discarding them"
+            ) == "Archive"
+            older_than_days = st.number_input(
+                "Only if not updated for (days)", min_value=0, value=30,
+                help="0 cleans every inactive IP regardless of age"
+            )
+            batch_size = st.number_input("Batch size", min_value=100, max_value=50000, value=1000, step=100)
+            pause_seconds = st.number_input("Pause between batches (s)", min_value=0.0, value=0.5, step=0.1)
+            dry_run = st.checkbox("Dry run (count only)", value=True)
+            
+            if st.form_submit_button("🧹 Clean Inactive IPs"):
+                maintenance_manager.start(
+                    "clean_inactive_ips", purge_inactive_ips_job,
+                    archive=archive, older_than_days=older_than_days or None,
+                    batch_size=int(batch_size), pause_seconds=pause_seconds, dry_run=dry_run
+                )
+                st.success("Inactive IP cleanup started in the background")
     
     with col2:
+        vacuum = st.checkbox("Also VACUUM tables", value=False, help="Reclaim dead rows as well (slower)")
         if st.button("📊 Rebuild Statistics"):
-            st.info("This feature will be implemented in a future version")
+            maintenance_manager.start("rebuild_statistics", rebuild_statistics_job, vacuum=vacuum)
+            st.success("Statistics rebuild started in the background")
+    
+    render_maintenance_job_status("clean_inactive_ips", "🧹 Clean Inactive IPs")
+    render_maintenance_job_status("rebuild_statistics", "📊 Rebuild Statistics")
     
     # Application settings
     st.markdown("### ⚙️ Application Settings")
@@ -319,6 +523,27 @@ def render_system_settings():
         if st.form_submit_button("Save Settings"):
             st.success("Settings saved successfully!")
 
+def render_maintenance_job_status(job_name, title):
+    """Render progress and per-step results of the latest maintenance job"""
+    job = maintenance_manager.latest(job_name)
+    if job is None:
+        return
+    
+    with st.expander(f"{title}: {job.status}", expanded=job.is_running):
+        st.progress(job.progress, text=job.message or job.status)
+        
+        if job.steps:
+            st.dataframe(pd.DataFrame(job.steps), use_container_width=True, hide_index=True)
+        
+        if job.error:
+            st.error(f"Job failed: {job.error}")
+        elif job.finished_at:
+            duration = (job.finished_at - job.started_at).total_seconds()
+            st.caption(f"Finished {job.finished_at.strftime('%Y-%m-%d %H:%M:%S')} in {duration:.1f}s")
+        
+        if job.is_running and st.button("🔄 Refresh Status", key=f"refresh_{job_name}"):
+            st.rerun()
+
 # Helper functions
 
 def add_new_site(name, description, location):
@@ -339,7 +564,10 @@ def add_new_site(name, description, location):
         )
         
         session.add(new_site)
+        session.flush()
+        new_site_id = new_site.id
         session.commit()
+        apply_to_prefix_index(bump_data_version(), lambda index: index.set_site_name(new_site_id, name))
         
         return True, f"Site '{name}' added successfully"
         
@@ -363,6 +591,8 @@ def update_site(site_id, name, description, location):
         site.location = location
         
         session.commit()
+        apply_to_prefix_index(bump_data_version(), lambda index: index.set_site_name(site_id, name))
+        
         return True, f"Site '{name}' updated successfully"
         
     except Exception as e:
@@ -382,6 +612,7 @@ def delete_site(site_id):
         
         session.delete(site)
         session.commit()
+        bump_data_version()
         
         return True, f"Site '{site.name}' deleted successfully"
         
@@ -400,19 +631,18 @@ def delete_subnet(subnet_id):
         if not subnet:
             return False, "Subnet not found"
         
-        # Check if subnet has any IP addresses
-        ip_count = session.query(IPAddress).filter(
-            IPAddress.site_id == subnet.site_id,
-            IPAddress.ip_cidr.op('<<')(subnet.subnet_cidr)
-        ).count()
+        # Check if subnet has any IP addresses (nested subnets keep their own)
+        ip_count = session.query(IPAddress).filter(IPAddress.subnet_id == subnet.id).count()
         
         if ip_count > 0:
             return False, f"Cannot delete subnet with {ip_count} existing IP addresses"
         
+        subnet_cidr = str(subnet.subnet_cidr)
         session.delete(subnet)
         session.commit()
+        apply_to_prefix_index(bump_data_version(), lambda index: index.remove_subnet(subnet_id, subnet_cidr))
         
-        return True, f"Subnet '{subnet.subnet_cidr}' deleted successfully"
+        return True, f"Subnet '{subnet_cidr}' deleted successfully"
         
     except Exception as e:
         session.rollback()
@@ -432,6 +662,7 @@ def delete_ip_address(ip_id):
         ip_cidr = str(ip_address.ip_cidr)
         session.delete(ip_address)
         session.commit()
+        apply_to_prefix_index(bump_data_version(), lambda index: index.remove_ip(ip_id, ip_cidr))
         
         return True, f"IP address '{ip_cidr}' deleted successfully"
         
@@ -448,7 +679,7 @@ def add_new_subnet(site_id, subnet_cidr, name, description, vlan_id):
     try:
         # Validate CIDR
         try:
-            ipaddress.ip_network(subnet_cidr, strict=False)
+            network = ipaddress.ip_network(subnet_cidr, strict=False)
         except ValueError:
             return False, "Invalid subnet CIDR format"
         
@@ -459,6 +690,11 @@ def add_new_subnet(site_id, subnet_cidr, name, description, vlan_id):
         if existing_subnet:
             return False, f"Subnet '{subnet_cidr}' already exists for this site"
         
+        # Check for overlapping subnets (same rule as the exclusion constraint)
+        overlapping = find_overlapping_subnets(session, subnet_cidr, site_id, SUBNET_OVERLAP_SCOPE)
+        if overlapping:
+            return False, f"Subnet '{subnet_cidr}' overlaps existing subnet '{overlapping[0].subnet_cidr}' ({overlapping[0].name})"
+        
         # Create new subnet
         new_subnet = Subnet(
             site_id=site_id,
@@ -469,7 +705,13 @@ def add_new_subnet(site_id, subnet_cidr, name, description, vlan_id):
         )
         
         session.add(new_subnet)
+        session.flush()
+        new_subnet_id = new_subnet.id
         session.commit()
+        apply_to_prefix_index(
+            bump_data_version(),
+            lambda index: index.add_subnet(new_subnet_id, site_id, str(network), name)
+        )
         
         return True, f"Subnet '{subnet_cidr}' added successfully"
         
@@ -503,6 +745,12 @@ def add_new_ip_address(site_id, ip_address, hostname, gateway, role, system_owne
         if existing_ip:
             return False, f"IP address '{ip_cidr}' already exists for this site"
         
+        # Addresses inside a range are already accounted for by the range
+        covering_range = find_covering_range(session, site_id, ip_cidr)
+        if covering_range:
+            return False, (f"IP address '{ip_cidr}' falls inside range '{covering_range.name}' "
+                           f"({covering_range.start_address} - {covering_range.end_address})")
+        
         # Validate gateway if provided
         if gateway:
             try:
@@ -523,7 +771,15 @@ def add_new_ip_address(site_id, ip_address, hostname, gateway, role, system_owne
         )
         
         session.add(new_ip)
+        session.flush()
+        new_ip_id = new_ip.id
         session.commit()
+        apply_to_prefix_index(
+            bump_data_version(),
+            lambda index: index.add_ip(
+                new_ip_id, site_id, str(network), hostname if hostname else None, role if role else None
+            )
+        )
         
         return True, f"IP address '{ip_cidr}' added successfully"
         
@@ -533,6 +789,168 @@ def add_new_ip_address(site_id, ip_address, hostname, gateway, role, system_owne
     finally:
         session.close()
 
+def add_new_ip_range(site_id, start_address, end_address, name, role, system_owner, status, description):
+    """Add a new address range to the database"""
+    session = get_db_session()
+    
+    try:
+        try:
+            start_address, end_address = normalize_range(start_address, end_address)
+        except ValueError as e:
+            return False, str(e)
+        
+        # Ranges at one site must not overlap each other
+        overlapping = find_overlapping_ranges(session, site_id, start_address, end_address)
+        if overlapping:
+            return False, f"Range overlaps existing range '{overlapping[0].name}'"
+        
+        # Utilization counts a range's addresses once, so entries may not sit inside it
+        contained = find_contained_addresses(session, site_id, start_address, end_address)
+        if contained:
+            listed = ', '.join(str(ip.ip_cidr) for ip in contained)
+            return False, (f"Range contains existing IP addresses ({listed}); "
+                           f"delete them or choose another range")
+        
+        new_range = IPRange(
+            site_id=site_id,
+            start_address=start_address,
+            end_address=end_address,
+            name=name,
+            role=role if role else None,
+            system_owner=system_owner if system_owner else None,
+            status=status,
+            description=description if description else None
+        )
+        
+        session.add(new_range)
+        session.commit()
+        bump_data_version()
+        
+        return True, f"Range '{name}' ({start_address} - {end_address}) added successfully"
+        
+    except Exception as e:
+        session.rollback()
+        return False, f"Error adding range: {str(e)}"
+    finally:
+        session.close()
+
+def delete_ip_range(range_id):
+    """Delete an address range"""
+    session = get_db_session()
+    
+    try:
+        ip_range = session.query(IPRange).filter_by(id=range_id).first()
+        if not ip_range:
+            return False, "Range not found"
+        
+        name = ip_range.name
+        session.delete(ip_range)
+        session.commit()
+        bump_data_version()
+        
+        return True, f"Range '{name}' deleted successfully"
+        
+    except Exception as e:
+        session.rollback()
+        return False, f"Error deleting range: {str(e)}"
+    finally:
+        session.close()
+
+def get_ranges_dataframe():
+    """Get address ranges as DataFrame"""
+    session = get_db_session()
+    
+    try:
+        results = session.query(IPRange, Site.name.label('site_name')) \
+            .outerjoin(Site, Site.id == IPRange.site_id) \
+            .order_by(Site.name, IPRange.start_address).all()
+        return pd.DataFrame([range_to_dict(ip_range, site_name) for ip_range, site_name in results])
+    except Exception as e:
+        st.error(f"Error loading ranges: {str(e)}")
+        return pd.DataFrame()
+    finally:
+        session.close()
+
+def get_free_addresses(subnet_id, count):
+    """Preview the next free addresses in a subnet without allocating them"""
+    session = get_db_session()
+    
+    try:
+        subnet = session.get(Subnet, subnet_id)
+        return find_free_addresses(session, subnet, count) if subnet else []
+    except Exception as e:
+        st.error(f"Error finding free addresses: {str(e)}")
+        return []
+    finally:
+        session.close()
+
+def allocate_ip_addresses(subnet_id, count, hostname, role, system_owner, status, description):
+    """Allocate the next free addresses in a subnet"""
+    try:
+        addresses = allocate_addresses(
+            subnet_id,
+            count,
+            hostname=hostname if hostname else None,
+            status=status,
+            role=role if role else None,
+            system_owner=system_owner if system_owner else None,
+            description=description if description else None
+        )
+        return True, f"Allocated {', '.join(addresses)}"
+    except ValueError as e:
+        return False, str(e)
+    except Exception as e:
+        return False, f"Error allocating IP addresses: {str(e)}"
+
+def get_best_fit_block(subnet_id, size):
+    """Preview the best-fit contiguous block in a subnet as (first, last) addresses"""
+    session = get_db_session()
+    
+    try:
+        subnet = session.get(Subnet, subnet_id)
+        block = find_best_fit_block(session, subnet, size) if subnet else None
+        if block is None:
+            return None
+        network = ipaddress.ip_network(str(subnet.subnet_cidr), strict=False)
+        base = int(network.network_address)
+        return str(ipaddress.ip_address(base + block[0])), str(ipaddress.ip_address(base + block[1]))
+    except Exception as e:
+        st.error(f"Error finding a free block: {str(e)}")
+        return None
+    finally:
+        session.close()
+
+def allocate_ip_block(subnet_id, size, hostname, role, system_owner, status, description, as_range=False):
+    """Allocate a contiguous block of addresses in a subnet"""
+    try:
+        first, last = allocate_block(
+            subnet_id,
+            size,
+            status=status,
+            hostname=hostname if hostname else None,
+            role=role if role else None,
+            system_owner=system_owner if system_owner else None,
+            description=description if description else None,
+            as_range=as_range
+        )
+        return True, f"Allocated {size} addresses {first} - {last}"
+    except ValueError as e:
+        return False, str(e)
+    except Exception as e:
+        return False, f"Error allocating IP block: {str(e)}"
+
+def get_overlap_report(scope):
+    """Get all overlapping subnet pairs as DataFrame"""
+    session = get_db_session()
+    
+    try:
+        return build_overlap_report(session, scope)
+    except Exception as e:
+        st.error(f"Error building overlap report: {str(e)}")
+        return pd.DataFrame()
+    finally:
+        session.close()
+
 def get_sites_dataframe():
     """Get sites data as DataFrame"""
     session = get_db_session()
@@ -566,39 +984,18 @@ def get_subnets_dataframe():
     session = get_db_session()
     
     try:
-        query = session.query(
-            Subnet.id,
-            Subnet.subnet_cidr,
-            Subnet.name,
-            Subnet.description,
-            Subnet.vlan_id,
-            Site.name.label('site_name')
-        ).join(Site)
-        
-        results = query.order_by(Subnet.subnet_cidr).all()
-        
         data = []
-        for result in results:
-            # Calculate utilization
-            ip_count = session.query(IPAddress).filter(
-                IPAddress.site_id == result.id,
-                IPAddress.ip_cidr.op('<<')(result.subnet_cidr)
-            ).count()
-            
-            network = ipaddress.ip_network(str(result.subnet_cidr))
-            capacity = network.num_addresses - 2  # Exclude network and broadcast
-            utilization = (ip_count / capacity * 100) if capacity > 0 else 0
-            
+        for subnet in compute_subnet_utilization(session, use_counters=True):
             data.append({
-                'ID': result.id,
-                'Site': result.site_name,
-                'Subnet CIDR': str(result.subnet_cidr),
-                'Name': result.name,
-                'Description': result.description or 'N/A',
-                'VLAN ID': result.vlan_id or 'N/A',
-                'Used IPs': ip_count,
-                'Capacity': capacity,
-                'Utilization': round(utilization, 1)
+                'ID': subnet['id'],
+                'Site': subnet['site'],
+                'Subnet CIDR': subnet['subnet'],
+                'Name': subnet['name'],
+                'Description': subnet['description'] or 'N/A',
+                'VLAN ID': subnet['vlan_id'] or 'N/A',
+                'Used IPs': subnet['used'],
+                'Capacity': subnet['capacity'],
+                'Utilization': subnet['utilization']
             })
         
         return pd.DataFrame(data)
@@ -609,8 +1006,8 @@ def get_subnets_dataframe():
     finally:
         session.close()
 
-def get_ip_addresses_dataframe():
-    """Get IP addresses data as DataFrame"""
+def get_ip_addresses_dataframe(page_size=DEFAULT_PAGE_SIZE, cursor=None):
+    """Get one keyset page of IP addresses as (DataFrame, page info, approximate total)"""
     session = get_db_session()
     
     try:
@@ -626,10 +1023,11 @@ def get_ip_addresses_dataframe():
             Site.name.label('site_name')
         ).join(Site)
         
-        results = query.order_by(IPAddress.ip_cidr).all()
+        page = fetch_keyset_page(query, page_size, cursor)
+        approx_total = estimate_query_count(session, query)
         
         data = []
-        for result in results:
+        for result in page['rows']:
             data.append({
                 'ID': result.id,
                 'Site': result.site_name,
@@ -642,11 +1040,11 @@ def get_ip_addresses_dataframe():
                 'Status': result.status
             })
         
-        return pd.DataFrame(data)
+        return pd.DataFrame(data), page, approx_total
         
     except Exception as e:
         st.error(f"Error loading IP addresses: {str(e)}")
-        return pd.DataFrame()
+        return pd.DataFrame(), None, 0
     finally:
         session.close()
 
@@ -663,3 +1061,17 @@ def get_sites_list():
     finally:
         session.close()
 
+def get_subnets_list():
+    """Get list of subnets for dropdown, labelled with their site"""
+    session = get_db_session()
+    
+    try:
+        subnets = session.query(Subnet.id, Subnet.subnet_cidr, Subnet.name, Site.name.label('site_name')) \
+            .outerjoin(Site, Site.id == Subnet.site_id) \
+            .order_by(Site.name, Subnet.subnet_cidr).all()
+        return [(subnet.id, f"{subnet.subnet_cidr} - {subnet.name} ({subnet.site_name})") for subnet in subnets]
+    except Exception as e:
+        st.error(f"Error loading subnets: {str(e)}")
+        return []
+    finally:
+        session.close()
@@ -0,0 +1,241 @@
+"""
+Address allocator for IP Tracker application
+Finds free addresses in a subnet from interval gaps and allocates them under a subnet lock
+"""
+
+import ipaddress
+from typing import List, Tuple, Optional
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from models.database import get_db_session, IPAddress, IPRange, Subnet
+from utils.cache import bump_data_version
+
+# First key of the two-key advisory lock taken per subnet while allocating
+ALLOCATOR_LOCK_NAMESPACE = 4101
+
+# Offsets are bigint in SQL; wide IPv6 subnets allocate from their low 2^62 addresses
+MAX_OFFSET = 2 ** 62
+
+# Free gaps between occupied intervals (IP entries and ranges), in offsets from
+# the subnet's network address. Two sentinel rows just outside the assignable range turn the leading
+# and trailing free space into ordinary gaps. covered_to is the running maximum
+# end of everything before a row, so nested or overlapping entries merge.
+FREE_GAPS_CTE = """
+    WITH occupied AS (
+        SELECT network(ip_cidr)::inet - CAST(:network AS inet) AS start_offset,
+               broadcast(ip_cidr)::inet - CAST(:network AS inet) AS end_offset
+          FROM ip_addresses
+         WHERE site_id = :site_id
+           AND ip_cidr <<= CAST(:subnet AS cidr)
+           AND ip_cidr <= CAST(:limit_address AS inet)
+        UNION ALL
+        SELECT GREATEST(start_address, CAST(:network AS inet)) - CAST(:network AS inet),
+               LEAST(end_address, CAST(:limit_address AS inet)) - CAST(:network AS inet)
+          FROM ip_ranges
+         WHERE site_id = :site_id
+           AND start_address <= CAST(:limit_address AS inet)
+           AND end_address >= CAST(:network AS inet)
+        UNION ALL
+        SELECT CAST(:first_offset AS bigint) - 1, CAST(:first_offset AS bigint) - 1
+        UNION ALL
+        SELECT CAST(:last_offset AS bigint) + 1, CAST(:last_offset AS bigint) + 1
+    ), covered AS (
+        SELECT start_offset,
+               MAX(end_offset) OVER (
+                   ORDER BY start_offset ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+               ) AS covered_to
+          FROM occupied
+    ), gaps AS (
+        SELECT GREATEST(covered_to + 1, :first_offset) AS gap_start,
+               LEAST(start_offset - 1, :last_offset) AS gap_end
+          FROM covered
+         WHERE start_offset > covered_to + 1
+           AND covered_to + 1 <= :last_offset
+    )
+"""
+
+# Lowest gaps first; each gap holds at least one address, so count gaps suffice
+FREE_GAPS_SQL = text(FREE_GAPS_CTE + """
+    SELECT gap_start, gap_end FROM gaps ORDER BY gap_start LIMIT :count
+""")
+
+# Best fit: the smallest gap that still holds size addresses, lowest on ties
+BEST_FIT_SQL = text(FREE_GAPS_CTE + """
+    SELECT gap_start, gap_end
+      FROM gaps
+     WHERE gap_end - gap_start + 1 >= :size
+     ORDER BY gap_end - gap_start, gap_start
+     LIMIT 1
+""")
+
+# Insert a whole block of consecutive host addresses in one statement
+INSERT_BLOCK_SQL = text("""
+    INSERT INTO ip_addresses
+        (site_id, ip_cidr, hostname, role, system_owner, description, status, created_at, updated_at)
+    SELECT :site_id,
+           (CAST(:network AS inet) + g)::cidr,
+           CASE WHEN :hostname IS NULL THEN NULL ELSE :hostname || '-' || (g - :first_offset + 1) END,
+           :role, :system_owner, :description, :status,
+           CURRENT_TIMESTAMP, CURRENT_TIMESTAMP
+      FROM generate_series(CAST(:first_offset AS bigint), CAST(:last_offset AS bigint)) AS g
+""")
+
+def assignable_offsets(network) -> Tuple[int, int]:
+    """First and last assignable offsets, skipping IPv4 network/broadcast like subnet_capacity"""
+    if network.version == 4 and network.prefixlen < 31:
+        first, last = 1, network.num_addresses - 2
+    else:
+        first, last = 0, network.num_addresses - 1
+    return first, min(last, MAX_OFFSET - 1)
+
+def expand_gaps(gaps: List[Tuple[int, int]], count: int) -> List[int]:
+    """First count offsets from inclusive (start, end) gaps in ascending order"""
+    offsets = []
+    for start, end in gaps:
+        take = min(end - start + 1, count - len(offsets))
+        offsets.extend(range(start, start + take))
+        if len(offsets) >= count:
+            break
+    return offsets
+
+def find_free_addresses(session: Session, subnet: Subnet, count: int = 1) -> List[str]:
+    """Return up to count free host addresses in a subnet, lowest first
+
+    An address is taken when any IP address row at the subnet's site covers
+    it, whatever its status (so reserved entries are skipped too).
+    """
+    network = ipaddress.ip_network(str(subnet.subnet_cidr), strict=False)
+    first, last = assignable_offsets(network)
+    if count <= 0 or first > last:
+        return []
+
+    base = int(network.network_address)
+    gaps = session.execute(FREE_GAPS_SQL, {**gap_params(subnet, network), "count": count}).all()
+
+    return [str(ipaddress.ip_address(base + offset)) for offset in expand_gaps(gaps, count)]
+
+def find_best_fit_block(session: Session, subnet: Subnet, size: int) -> Optional[Tuple[int, int]]:
+    """Smallest free run of at least size addresses as (first, last) offsets, or None"""
+    network = ipaddress.ip_network(str(subnet.subnet_cidr), strict=False)
+    first, last = assignable_offsets(network)
+    if size <= 0 or first > last:
+        return None
+
+    gap = session.execute(BEST_FIT_SQL, {**gap_params(subnet, network), "size": size}).first()
+    return (gap.gap_start, gap.gap_start + size - 1) if gap else None
+
+def gap_params(subnet: Subnet, network) -> dict:
+    """Bind parameters shared by the gap queries"""
+    first, last = assignable_offsets(network)
+    base = int(network.network_address)
+    return {
+        "network": str(network.network_address),
+        "subnet": str(network),
+        "limit_address": str(ipaddress.ip_address(base + min(network.num_addresses - 1, MAX_OFFSET))),
+        "site_id": subnet.site_id,
+        "first_offset": first,
+        "last_offset": last
+    }
+
+def lock_subnet(session: Session, subnet_id: int):
+    """Serialize allocations in one subnet until the current transaction ends"""
+    session.execute(
+        text("SELECT pg_advisory_xact_lock(:namespace, :subnet_id)"),
+        {"namespace": ALLOCATOR_LOCK_NAMESPACE, "subnet_id": subnet_id}
+    )
+
+def allocate_addresses(subnet_id: int, count: int = 1, hostname: Optional[str] = None,
+                       status: str = 'active', **fields) -> List[str]:
+    """Claim the next count free addresses in a subnet and insert them
+
+    The lookup and inserts run in one transaction holding the subnet's
+    advisory lock, so concurrent allocations never hand out the same address.
+    With several addresses a hostname gets a -1, -2, ... suffix.
+    """
+    session = get_db_session()
+    try:
+        subnet = session.get(Subnet, subnet_id)
+        if subnet is None:
+            raise ValueError("Subnet not found")
+
+        lock_subnet(session, subnet_id)
+        addresses = find_free_addresses(session, subnet, count)
+        if len(addresses) < count:
+            raise ValueError(f"Only {len(addresses)} free addresses left in {subnet.subnet_cidr}")
+
+        suffix = "/32" if ipaddress.ip_network(str(subnet.subnet_cidr)).version == 4 else "/128"
+        for index, address in enumerate(addresses, start=1):
+            session.add(IPAddress(
+                site_id=subnet.site_id,
+                ip_cidr=address + suffix,
+                hostname=f"{hostname}-{index}" if hostname and count > 1 else hostname,
+                status=status,
+                **fields
+            ))
+
+        session.commit()
+        bump_data_version()
+        return addresses
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+def allocate_block(subnet_id: int, size: int, status: str = 'reserved', hostname: Optional[str] = None,
+                   role: Optional[str] = None, system_owner: Optional[str] = None,
+                   description: Optional[str] = None, as_range: bool = False) -> Tuple[str, str]:
+    """Claim the best-fit run of size consecutive free addresses in a subnet
+
+    Finding the block and inserting every address (one INSERT ... SELECT over
+    generate_series) happen in one transaction under the subnet's advisory
+    lock. With as_range the block is stored as a single ip_ranges row named
+    after the hostname instead. Returns the first and last address.
+    """
+    session = get_db_session()
+    try:
+        subnet = session.get(Subnet, subnet_id)
+        if subnet is None:
+            raise ValueError("Subnet not found")
+
+        lock_subnet(session, subnet_id)
+        block = find_best_fit_block(session, subnet, size)
+        if block is None:
+            raise ValueError(f"No free block of {size} consecutive addresses in {subnet.subnet_cidr}")
+
+        network = ipaddress.ip_network(str(subnet.subnet_cidr), strict=False)
+        base = int(network.network_address)
+        first, last = str(ipaddress.ip_address(base + block[0])), str(ipaddress.ip_address(base + block[1]))
+
+        if as_range:
+            session.add(IPRange(
+                site_id=subnet.site_id,
+                start_address=first,
+                end_address=last,
+                name=hostname or f"Block {first}",
+                role=role,
+                system_owner=system_owner,
+                description=description,
+                status=status
+            ))
+        else:
+            session.execute(INSERT_BLOCK_SQL, {
+                "site_id": subnet.site_id,
+                "network": str(network.network_address),
+                "first_offset": block[0],
+                "last_offset": block[1],
+                "hostname": hostname,
+                "role": role,
+                "system_owner": system_owner,
+                "description": description,
+                "status": status
+            })
+
+        session.commit()
+        bump_data_version()
+        return first, last
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
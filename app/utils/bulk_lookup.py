@@ -0,0 +1,99 @@
+"""
+Bulk IP lookup for IP Tracker application
+Resolves thousands of pasted addresses against IP entries and subnets in one set-based query
+"""
+
+import re
+import ipaddress
+from typing import List, Tuple
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# Largest list resolved in one query
+MAX_BULK_ADDRESSES = 50000
+
+# Addresses are separated by whitespace, commas or semicolons (pasted lists, CSV, logs)
+ADDRESS_SEPARATORS = re.compile(r'[\s,;]+')
+
+BULK_LOOKUP_COLUMNS = ['Address', 'Match', 'Site', 'IP Entry', 'Hostname', 'Status', 'Role',
+                       'System Owner', 'Subnet', 'Subnet Name']
+
+# One row per IP entry containing an address; addresses without an entry at a
+# site get that site's most specific containing subnet; anything else is unknown.
+BULK_LOOKUP_SQL = text("""
+    WITH input AS (
+        SELECT address, position
+          FROM unnest(CAST(:addresses AS inet[])) WITH ORDINALITY AS t(address, position)
+    ), records AS (
+        SELECT i.position, i.address, ip.site_id, ip.id AS ip_id, ip.subnet_id
+          FROM input i
+          JOIN ip_addresses ip ON ip.ip_cidr >>= i.address
+    ), subnet_only AS (
+        SELECT DISTINCT ON (i.position, sn.site_id)
+               i.position, i.address, sn.site_id, NULL::integer AS ip_id, sn.id AS subnet_id
+          FROM input i
+          JOIN subnets sn ON sn.subnet_cidr >>= i.address
+         WHERE NOT EXISTS (
+                   SELECT 1 FROM records r WHERE r.position = i.position AND r.site_id = sn.site_id
+               )
+         ORDER BY i.position, sn.site_id, masklen(sn.subnet_cidr) DESC
+    ), matched AS (
+        SELECT *, 'record' AS match FROM records
+        UNION ALL
+        SELECT *, 'subnet' FROM subnet_only
+        UNION ALL
+        SELECT i.position, i.address, NULL, NULL, NULL, 'unknown'
+          FROM input i
+         WHERE NOT EXISTS (SELECT 1 FROM records r WHERE r.position = i.position)
+           AND NOT EXISTS (SELECT 1 FROM subnet_only s WHERE s.position = i.position)
+    )
+    SELECT host(m.address) AS address,
+           m.match,
+           st.name AS site_name,
+           ip.ip_cidr,
+           ip.hostname,
+           ip.status,
+           ip.role,
+           ip.system_owner,
+           sn.subnet_cidr,
+           sn.name AS subnet_name
+      FROM matched m
+      LEFT JOIN sites st ON st.id = m.site_id
+      LEFT JOIN ip_addresses ip ON ip.id = m.ip_id
+      LEFT JOIN subnets sn ON sn.id = m.subnet_id
+     ORDER BY m.position, st.name, ip.ip_cidr
+""")
+
+def parse_address_list(raw_text: str) -> Tuple[List[str], List[str]]:
+    """Split pasted text into unique valid addresses and invalid tokens, keeping input order"""
+    addresses, invalid = {}, {}
+    for token in ADDRESS_SEPARATORS.split(raw_text or ''):
+        if not token:
+            continue
+        try:
+            addresses.setdefault(str(ipaddress.ip_address(token)), None)
+        except ValueError:
+            invalid.setdefault(token, None)
+    return list(addresses), list(invalid)
+
+def bulk_lookup(session: Session, addresses: List[str]) -> pd.DataFrame:
+    """Resolve addresses to matching IP entries, containing subnets or unknowns in one query"""
+    if len(addresses) > MAX_BULK_ADDRESSES:
+        raise ValueError(f"At most {MAX_BULK_ADDRESSES:,} addresses can be looked up at once")
+    if not addresses:
+        return pd.DataFrame(columns=BULK_LOOKUP_COLUMNS)
+
+    rows = session.execute(BULK_LOOKUP_SQL, {"addresses": addresses}).all()
+    return pd.DataFrame([{
+        'Address': row.address,
+        'Match': row.match,
+        'Site': row.site_name,
+        'IP Entry': str(row.ip_cidr) if row.ip_cidr else None,
+        'Hostname': row.hostname,
+        'Status': row.status,
+        'Role': row.role,
+        'System Owner': row.system_owner,
+        'Subnet': str(row.subnet_cidr) if row.subnet_cidr else None,
+        'Subnet Name': row.subnet_name
+    } for row in rows], columns=BULK_LOOKUP_COLUMNS)
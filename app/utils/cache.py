@@ -0,0 +1,140 @@
+"""
+Caching utilities for IP Tracker application
+Process-wide data-version token and bounded LRU/TTL caches for query results
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Tuple
+
+_version_lock = threading.Lock()
+_data_version = 0
+
+def get_data_version() -> int:
+    """Return the current data-version token (changes whenever data is written)"""
+    return _data_version
+
+def bump_data_version() -> int:
+    """Invalidate every version-keyed cache entry; call after any committed write"""
+    global _data_version
+    with _version_lock:
+        _data_version += 1
+        return _data_version
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after a fixed time-to-live"""
+
+    def __init__(self, maxsize: int = 128, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """Return (hit, value) for a key, dropping it if expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if time.monotonic() - stored_at < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def set(self, key: Hashable, value: Any):
+        """Store a value, evicting the least recently used entries beyond maxsize"""
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop all entries"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+# Search result pages keyed by (normalized filters, page, data version)
+search_results_cache = TTLCache(maxsize=256, ttl=300)
+
+# Browse tab data keyed by (tab, tab parameters, data version)
+browse_cache = TTLCache(maxsize=64, ttl=300)
+
+class SnapshotCache:
+    """One computed snapshot shared by every session, refreshed stale-while-revalidate
+    
+    The first caller computes synchronously. Afterwards, when the data version
+    changes or the snapshot is older than max_age, callers keep receiving the
+    previous snapshot while a single background thread recomputes it.
+    """
+
+    def __init__(self, compute, max_age: float = 60.0, name: str = "snapshot"):
+        self.compute = compute
+        self.max_age = max_age
+        self.name = name
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._compute_lock = threading.RLock()
+        self._refreshing = False
+        self.last_error = None
+
+    def _is_stale(self, snapshot) -> bool:
+        return (snapshot['version'] != get_data_version()
+                or time.monotonic() - snapshot['computed_at'] > self.max_age)
+
+    def _recompute(self):
+        """Compute a fresh snapshot (only one computation runs at a time)"""
+        with self._compute_lock:
+            version = get_data_version()
+            value = self.compute()
+            snapshot = {'version': version, 'computed_at': time.monotonic(), 'value': value}
+            with self._lock:
+                self._snapshot = snapshot
+            return snapshot
+
+    def _refresh_in_background(self):
+        try:
+            self._recompute()
+            self.last_error = None
+        except Exception as e:
+            # Keep serving the previous snapshot; the next stale read retries
+            self.last_error = e
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def get(self):
+        """Return the current snapshot value, computing it on first use"""
+        with self._lock:
+            snapshot = self._snapshot
+
+        if snapshot is None:
+            with self._compute_lock:
+                # Another session may have finished computing while we waited
+                snapshot = self._snapshot or self._recompute()
+            return snapshot['value']
+
+        if self._is_stale(snapshot):
+            with self._lock:
+                start_refresh = not self._refreshing
+                self._refreshing = True
+            if start_refresh:
+                threading.Thread(
+                    target=self._refresh_in_background, name=f"{self.name}-refresh", daemon=True
+                ).start()
+
+        return snapshot['value']
+
+    def invalidate(self):
+        """Drop the snapshot so the next read recomputes synchronously"""
+        with self._lock:
+            self._snapshot = None
@@ -0,0 +1,30 @@
+"""
+Chart data helpers for IP Tracker application
+Keeps figure payloads bounded when there are thousands of categories
+"""
+
+from typing import List, Dict, Any
+
+def top_n_with_other(items: List[Dict[str, Any]], label_key: str, value_key: str, n: int,
+                     other_label: str = "Other") -> List[Dict[str, Any]]:
+    """Keep the n largest items and fold the rest into one "Other" item
+
+    The "Other" label includes how many categories it stands for, and is only
+    added when something was folded into it.
+    """
+    ranked = sorted(items, key=lambda item: item[value_key], reverse=True)
+    top, rest = ranked[:n], ranked[n:]
+    if rest:
+        top.append({
+            label_key: f"{other_label} ({len(rest):,})",
+            value_key: sum(item[value_key] for item in rest)
+        })
+    return top
+
+def filter_threshold(items: List[Dict[str, Any]], value_key: str, threshold: float) -> List[Dict[str, Any]]:
+    """Items at or above threshold, highest first"""
+    return sorted(
+        (item for item in items if item[value_key] >= threshold),
+        key=lambda item: item[value_key],
+        reverse=True
+    )
@@ -0,0 +1,198 @@
+"""
+Log enrichment for IP Tracker application
+Streams CSV/TSV logs and appends site, hostname, role and subnet columns for IP fields
+
+Run from the app directory; memory stays flat however large the log is:
+    python -m utils.enrich_logs flows.csv --column src_ip --column dst_ip -o flows_enriched.csv
+    zcat fw.tsv.gz | python -m utils.enrich_logs - --column 3 --no-header > fw_enriched.tsv
+"""
+
+import io
+import sys
+import csv
+import time
+import argparse
+from bisect import bisect_right
+from functools import lru_cache
+from itertools import chain
+from typing import List, Optional, Tuple
+from sqlalchemy.exc import SQLAlchemyError
+from models.database import get_db_session, Site
+from utils.prefix_trie import PrefixIndex, build_prefix_index, parse_address
+
+# Columns appended per IP column, as <column>_<field>
+ENRICHMENT_FIELDS = ['site', 'hostname', 'role', 'subnet']
+EMPTY_FIELDS = ('',) * len(ENRICHMENT_FIELDS)
+
+# Distinct addresses remembered between lines (logs repeat the same hosts a lot)
+ADDRESS_CACHE_SIZE = 65536
+
+# Several sites matching one address are joined with this separator
+SITE_SEPARATOR = ';'
+
+class LogEnricher:
+    """Resolves address strings to enrichment fields from a prefix index
+
+    Lookups bisect the index's interval tables, and the fields for each
+    distinct match are formatted once, so the per-line cost is a parse and a
+    bisection (or an LRU hit for repeated addresses).
+    """
+
+    def __init__(self, index: PrefixIndex, site_id: Optional[int] = None):
+        self.index = index
+        self.site_id = site_id
+        self.tables = {version: trie.interval_table() for version, trie in index.tries.items()}
+        self._fields = {}
+        self.resolve = lru_cache(maxsize=ADDRESS_CACHE_SIZE)(self._resolve)
+
+    def _resolve(self, address: str) -> Tuple[str, ...]:
+        try:
+            version, value = parse_address(address.strip())
+        except ValueError:
+            return EMPTY_FIELDS
+
+        starts, values = self.tables[version]
+        found = values[bisect_right(starts, value) - 1]
+        fields = self._fields.get(id(found))
+        if fields is None:
+            fields = self._fields[id(found)] = self.format_fields(found)
+        return fields
+
+    def format_fields(self, found) -> Tuple[str, ...]:
+        """Enrichment strings for one interval's matches (sites in name order)"""
+        best = self.index.best_per_site(found, self.site_id)
+        rows = sorted(
+            (self.index.match_row(None, site_id, kinds) for site_id, kinds in best.items()),
+            key=lambda row: row['site'] or ''
+        )
+        if not rows:
+            return EMPTY_FIELDS
+        return tuple(
+            SITE_SEPARATOR.join(row[key] or '' for row in rows)
+            for key in ENRICHMENT_FIELDS
+        )
+
+def resolve_column(header: Optional[List[str]], column: str) -> int:
+    """Position of a column given by header name or 0-based index"""
+    if header is not None and column in header:
+        return header.index(column)
+    if column.isdigit():
+        return int(column)
+    raise ValueError(f"Column '{column}' not found in header")
+
+def enrich_stream(source, target, enricher: LogEnricher, columns: List[str],
+                  delimiter: str = ',', has_header: bool = True) -> int:
+    """Copy delimited rows from source to target with enrichment columns appended
+
+    Rows are processed one at a time; returns the number of data rows written.
+    Raises ValueError when a column is missing from the first row (usually a
+    wrong delimiter) and warns on stderr about later rows too short to hold it.
+    """
+    reader = csv.reader(source, delimiter=delimiter)
+    writer = csv.writer(target, delimiter=delimiter, lineterminator='\n')
+
+    first = next(reader, None)
+    if first is None:
+        return 0
+    header = first if has_header else None
+    positions = [resolve_column(header, column) for column in columns]
+    for column, position in zip(columns, positions):
+        if position >= len(first):
+            raise ValueError(f"Column {column} is out of range: the first row has {len(first)} "
+                             f"field(s) split on {delimiter!r}")
+    if header is not None:
+        writer.writerow(header + [
+            f"{header[position]}_{field}" for position in positions for field in ENRICHMENT_FIELDS
+        ])
+
+    resolve = enricher.resolve
+    count = short_rows = 0
+
+    def enriched_rows():
+        nonlocal count, short_rows
+        for row in (reader if has_header else chain([first], reader)):
+            for position in positions:
+                if position < len(row):
+                    row.extend(resolve(row[position]))
+                else:
+                    row.extend(EMPTY_FIELDS)
+                    short_rows += 1
+            count += 1
+            yield row
+
+    writer.writerows(enriched_rows())
+    if short_rows:
+        print(f"Warning: {short_rows:,} IP field(s) were missing from short rows and left unenriched",
+              file=sys.stderr)
+    return count
+
+def detect_delimiter(path: str, first_line: str) -> str:
+    """Tab for .tsv files or tab-separated first lines, comma otherwise"""
+    if path.endswith('.tsv') or '\t' in first_line:
+        return '\t'
+    return ','
+
+def load_enricher(site_name: Optional[str] = None) -> LogEnricher:
+    """Build the lookup structure from the database once"""
+    session = get_db_session()
+    try:
+        site_id = None
+        if site_name:
+            site = session.query(Site).filter_by(name=site_name).first()
+            if site is None:
+                raise ValueError(f"Site '{site_name}' not found")
+            site_id = site.id
+        return LogEnricher(build_prefix_index(session), site_id)
+    finally:
+        session.close()
+
+def main(argv=None):
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description="Append IP Tracker site, hostname, role and subnet to log files")
+    parser.add_argument('input', help="CSV/TSV log file, or - for standard input")
+    parser.add_argument('--column', '-c', action='append', required=True,
+                        help="IP column name (or 0-based index); repeat for several columns")
+    parser.add_argument('--output', '-o', default='-', help="output file (default: standard output)")
+    parser.add_argument('--delimiter', '-d', help="field delimiter (default: tab for .tsv files or tab-separated first lines, else comma)")
+    parser.add_argument('--no-header', action='store_true', help="input has no header row")
+    parser.add_argument('--site', help="only match subnets and IPs at this site")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    try:
+        enricher = load_enricher(args.site)
+    except (SQLAlchemyError, ValueError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        return 1
+    print(f"Loaded {len(enricher.index):,} prefixes in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    if args.input == '-':
+        source = io.TextIOWrapper(sys.stdin.buffer, newline='', encoding='utf-8', errors='replace')
+    else:
+        source = open(args.input, newline='', encoding='utf-8', errors='replace')
+    target = sys.stdout if args.output == '-' else open(args.output, 'w', newline='', encoding='utf-8')
+    try:
+        # Peek at the first line (pipes cannot seek) and chain it back in front
+        first_line = source.readline()
+        delimiter = args.delimiter or detect_delimiter(args.input, first_line)
+        lines = chain([first_line], source)
+
+        started = time.perf_counter()
+        count = enrich_stream(lines, target, enricher, args.column, delimiter, not args.no_header)
+        elapsed = time.perf_counter() - started
+        print(f"Enriched {count:,} lines in {elapsed:.1f}s ({count / max(elapsed, 1e-9):,.0f} lines/s)",
+              file=sys.stderr)
+    except ValueError as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        return 1
+    finally:
+        if args.input == '-':
+            source.detach()  # leave sys.stdin usable
+        else:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+"""
+Free-space analysis for IP Tracker application
+Finds free ranges, the largest free block and fragmentation for every subnet at once
+"""
+
+import ipaddress
+from typing import List, Dict, Any, Optional
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from utils.cache import TTLCache, get_data_version
+
+# Free-space results keyed by (site, data version)
+free_space_cache = TTLCache(maxsize=16, ttl=600)
+
+# Assigned address intervals (IP entries and ranges) as offsets from each
+# subnet's network address. inet - inet returns bigint, so IPv6 prefixes
+# shorter than /65 fall back to computing offsets in Python from the address
+# text ("first-last" for ranges).
+ASSIGNMENT_INTERVALS_SQL = """
+    SELECT s.id AS subnet_id,
+           CASE WHEN family(s.subnet_cidr) = 4 OR masklen(s.subnet_cidr) >= 65
+                THEN network(ip.ip_cidr)::inet - network(s.subnet_cidr)::inet END AS start_offset,
+           CASE WHEN family(s.subnet_cidr) = 4 OR masklen(s.subnet_cidr) >= 65
+                THEN broadcast(ip.ip_cidr)::inet - network(s.subnet_cidr)::inet END AS end_offset,
+           CASE WHEN family(s.subnet_cidr) = 6 AND masklen(s.subnet_cidr) < 65
+                THEN ip.ip_cidr::text END AS ip_text
+      FROM subnets s
+      JOIN ip_addresses ip
+        ON ip.site_id = s.site_id AND ip.ip_cidr <<= s.subnet_cidr
+     {where}
+    UNION ALL
+    SELECT s.id,
+           CASE WHEN family(s.subnet_cidr) = 4 OR masklen(s.subnet_cidr) >= 65
+                THEN r.start_address - network(s.subnet_cidr)::inet END,
+           CASE WHEN family(s.subnet_cidr) = 4 OR masklen(s.subnet_cidr) >= 65
+                THEN r.end_address - network(s.subnet_cidr)::inet END,
+           CASE WHEN family(s.subnet_cidr) = 6 AND masklen(s.subnet_cidr) < 65
+                THEN host(r.start_address) || '-' || host(r.end_address) END
+      FROM subnets s
+      JOIN ip_ranges r
+        ON r.site_id = s.site_id
+       AND r.start_address <= host(broadcast(s.subnet_cidr))::inet
+       AND r.end_address >= host(network(s.subnet_cidr))::inet
+     {where}
+"""
+
+SUBNETS_SQL = """
+    SELECT s.id, s.site_id, st.name AS site, s.subnet_cidr::text AS subnet, s.name, s.vlan_id
+      FROM subnets s
+      LEFT JOIN sites st ON st.id = s.site_id
+     {where}
+     ORDER BY s.subnet_cidr
+"""
+
+def subnet_bounds(subnets: List[str]):
+    """Per-subnet size and first/last assignable offsets
+
+    Matches utils.utilization.subnet_capacity: IPv4 subnets shorter than /31
+    exclude their network and broadcast addresses.
+    """
+    networks = [ipaddress.ip_network(subnet, strict=False) for subnet in subnets]
+    sizes = [network.num_addresses for network in networks]
+    reserved = [network.version == 4 and network.prefixlen < 31 for network in networks]
+    dtype = np.int64 if sum(sizes) < 2 ** 62 else object
+    sizes = np.array(sizes, dtype=dtype)
+    lo = np.array([1 if flag else 0 for flag in reserved], dtype=dtype)
+    hi = sizes - 1 - lo
+    return networks, sizes, lo, hi
+
+def analyze_free_space(subnets: List[str], subnet_index: np.ndarray,
+                       start_offsets: np.ndarray, end_offsets: np.ndarray) -> Dict[str, np.ndarray]:
+    """Compute free ranges and fragmentation for many subnets in one pass
+
+    subnet_index[i] says which subnet assigned interval i (inclusive offsets
+    start_offsets[i]..end_offsets[i]) belongs to. Every subnet is laid out
+    end to end on one global axis, so sorting, merging overlapping intervals
+    (running maximum) and finding gaps are single array operations regardless
+    of how many subnets are analyzed.
+
+    Returns per-subnet arrays (capacity, used, free, free_blocks,
+    largest_free, fragmentation) plus the free ranges as (subnet, start
+    offset, size) arrays.
+    """
+    networks, sizes, lo, hi = subnet_bounds(subnets)
+    count = len(networks)
+    dtype = sizes.dtype
+    base = np.zeros(count, dtype=dtype)
+    if count > 1:
+        base[1:] = np.cumsum(sizes)[:-1]
+    first = base + lo
+    last = base + hi
+
+    subnet_index = np.asarray(subnet_index, dtype=np.int64)
+    starts = np.maximum(np.asarray(start_offsets, dtype=dtype) + base[subnet_index], first[subnet_index])
+    ends = np.minimum(np.asarray(end_offsets, dtype=dtype) + base[subnet_index], last[subnet_index])
+    keep = starts <= ends
+    subnet_index, starts, ends = subnet_index[keep], starts[keep], ends[keep]
+
+    order = np.argsort(starts, kind='stable')
+    subnet_index, starts, ends = subnet_index[order], starts[order], ends[order]
+    covered_to = np.maximum.accumulate(ends) if len(ends) else ends
+
+    # Gap before each interval: from the end of everything covered so far
+    # (or the subnet's first assignable address) up to the interval start
+    segment_start = np.ones(len(starts), dtype=bool)
+    segment_start[1:] = subnet_index[1:] != subnet_index[:-1]
+    previous_end = np.empty(len(starts), dtype=dtype)
+    previous_end[1:] = covered_to[:-1]
+    previous_end[segment_start] = first[subnet_index[segment_start]] - 1
+    gap_sizes = starts - previous_end - 1
+
+    # Gap after the last interval of each subnet, or the whole subnet when empty
+    segment_end = np.ones(len(starts), dtype=bool)
+    segment_end[:-1] = segment_start[1:]
+    tail_start = np.array(first, copy=True)
+    tail_start[subnet_index[segment_end]] = covered_to[segment_end] + 1
+    tail_sizes = last - tail_start + 1
+
+    free_subnet = np.concatenate([subnet_index, np.arange(count)])
+    free_start = np.concatenate([previous_end + 1, tail_start])
+    free_size = np.concatenate([gap_sizes, tail_sizes])
+    positive = free_size > 0
+    free_subnet, free_start, free_size = free_subnet[positive], free_start[positive], free_size[positive]
+    order = np.lexsort((free_start, free_subnet))
+    free_subnet, free_start, free_size = free_subnet[order], free_start[order], free_size[order]
+
+    capacity = np.maximum(hi - lo + 1, 0)
+    free = np.zeros(count, dtype=dtype)
+    largest = np.zeros(count, dtype=dtype)
+    np.add.at(free, free_subnet, free_size)
+    np.maximum.at(largest, free_subnet, free_size)
+    free_blocks = np.bincount(free_subnet, minlength=count)
+
+    # External fragmentation: share of free space outside the largest block
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fragmentation = np.where(
+            free > 0, 1 - largest.astype(float) / np.maximum(free, 1).astype(float), 0.0
+        )
+
+    return {
+        'capacity': capacity,
+        'used': capacity - free,
+        'free': free,
+        'free_blocks': free_blocks,
+        'largest_free': largest,
+        'fragmentation': np.round(fragmentation, 4),
+        'free_range_subnet': free_subnet,
+        'free_range_start': free_start - base[free_subnet],
+        'free_range_size': free_size
+    }
+
+def load_assignment_intervals(session: Session, site_id: Optional[int] = None):
+    """Load subnets and their assigned address intervals (two queries)"""
+    where = "WHERE s.site_id = :site_id" if site_id is not None else ""
+    params = {"site_id": site_id}
+    subnets = pd.DataFrame(session.execute(text(SUBNETS_SQL.format(where=where)), params).mappings().all(),
+                           columns=['id', 'site_id', 'site', 'subnet', 'name', 'vlan_id'])
+    rows = session.execute(text(ASSIGNMENT_INTERVALS_SQL.format(where=where)), params).all()
+
+    position = {subnet_id: index for index, subnet_id in enumerate(subnets['id'])}
+    subnet_index = np.fromiter((position[row.subnet_id] for row in rows), dtype=np.int64, count=len(rows))
+    start_offsets = [row.start_offset for row in rows]
+    end_offsets = [row.end_offset for row in rows]
+
+    # Wide IPv6 subnets: offsets computed here from the address text
+    for i, row in enumerate(rows):
+        if row.ip_text is not None:
+            network = ipaddress.ip_network(subnets['subnet'].iat[subnet_index[i]], strict=False)
+            if '-' in row.ip_text:
+                first, last = (ipaddress.ip_address(address) for address in row.ip_text.split('-'))
+            else:
+                assigned = ipaddress.ip_network(row.ip_text, strict=False)
+                first, last = assigned.network_address, assigned.broadcast_address
+            start_offsets[i] = int(first) - int(network.network_address)
+            end_offsets[i] = int(last) - int(network.network_address)
+
+    return subnets, subnet_index, start_offsets, end_offsets
+
+def compute_free_space(session: Session, site_id: Optional[int] = None) -> Dict[str, pd.DataFrame]:
+    """Free-space summary per subnet plus every free range, cached per data version"""
+    key = (site_id, get_data_version())
+    hit, result = free_space_cache.get(key)
+    if hit:
+        return result
+
+    subnets, subnet_index, start_offsets, end_offsets = load_assignment_intervals(session, site_id)
+    analysis = analyze_free_space(subnets['subnet'].tolist(), subnet_index, start_offsets, end_offsets)
+
+    summary = subnets.rename(columns={'id': 'subnet_id'})
+    for column in ['capacity', 'used', 'free', 'free_blocks', 'largest_free', 'fragmentation']:
+        summary[column] = analysis[column]
+    summary['utilization'] = np.round(
+        analysis['used'].astype(float) / np.maximum(analysis['capacity'], 1).astype(float) * 100, 1
+    )
+
+    result = {
+        'summary': summary,
+        'free_ranges': build_free_ranges(subnets, analysis)
+    }
+    free_space_cache.set(key, result)
+    return result
+
+def build_free_ranges(subnets: pd.DataFrame, analysis: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """Turn free range offsets back into first/last address strings"""
+    network_ints = [int(ipaddress.ip_network(subnet, strict=False).network_address) for subnet in subnets['subnet']]
+    versions = [ipaddress.ip_network(subnet, strict=False).version for subnet in subnets['subnet']]
+
+    records: List[Dict[str, Any]] = []
+    for subnet_position, start, size in zip(analysis['free_range_subnet'], analysis['free_range_start'],
+                                            analysis['free_range_size']):
+        first = network_ints[subnet_position] + int(start)
+        address = ipaddress.IPv4Address if versions[subnet_position] == 4 else ipaddress.IPv6Address
+        records.append({
+            'subnet_id': subnets['id'].iat[subnet_position],
+            'subnet': subnets['subnet'].iat[subnet_position],
+            'first_address': str(address(first)),
+            'last_address': str(address(first + int(size) - 1)),
+            'size': int(size)
+        })
+
+    return pd.DataFrame(records, columns=['subnet_id', 'subnet', 'first_address', 'last_address', 'size'])
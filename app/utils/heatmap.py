@@ -0,0 +1,97 @@
+"""
+Address-space heatmap for IP Tracker application
+Counts IPv4 addresses per fixed-size block in one GROUP BY and lays them out on a grid
+"""
+
+import ipaddress
+import math
+from typing import Optional, Dict, Any
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from utils.cache import TTLCache, get_data_version
+
+# Block counts keyed by (parent, prefix, site, data version)
+heatmap_cache = TTLCache(maxsize=64, ttl=600)
+
+# Drill-down levels: whole IPv4 space by /16, a /16 by /24, a /24 by address
+DRILL_PREFIXES = {0: 16, 16: 24, 24: 32}
+
+BLOCK_COUNTS_SQL = """
+    SELECT (set_masklen(ip_cidr, :prefix)::inet - CAST(:parent AS inet)) / :block_size AS block,
+           COUNT(*) AS addresses
+      FROM ip_addresses
+     WHERE ip_cidr <<= CAST(:parent AS cidr) {site_filter}
+     GROUP BY 1
+"""
+
+def load_block_counts(session: Session, parent: str, prefix: int, site_id: Optional[int] = None) -> np.ndarray:
+    """Address count for every /prefix block inside an IPv4 parent network
+
+    Returns a dense array indexed by block number within the parent, cached
+    per data version.
+    """
+    parent_network = ipaddress.IPv4Network(parent)
+    key = (str(parent_network), prefix, site_id, get_data_version())
+    hit, counts = heatmap_cache.get(key)
+    if hit:
+        return counts
+
+    block_size = 2 ** (32 - prefix)
+    rows = session.execute(
+        text(BLOCK_COUNTS_SQL.format(site_filter="AND site_id = :site_id" if site_id is not None else "")),
+        {"parent": str(parent_network), "prefix": prefix, "block_size": block_size, "site_id": site_id}
+    ).all()
+
+    counts = np.zeros(2 ** (prefix - parent_network.prefixlen), dtype=np.int64)
+    if rows:
+        blocks, addresses = np.array(rows, dtype=np.int64).T
+        counts[blocks] = addresses
+
+    heatmap_cache.set(key, counts)
+    return counts
+
+def build_heatmap_grid(parent: str, prefix: int, counts: np.ndarray, compact_rows: bool = False) -> Dict[str, Any]:
+    """Arrange block counts on a square grid with CIDR labels for hovering
+
+    With compact_rows, grid rows without any addresses are dropped so the
+    whole-space /16 map only shows populated first octets.
+    """
+    parent_network = ipaddress.IPv4Network(parent)
+    bits = prefix - parent_network.prefixlen
+    width = 2 ** math.ceil(bits / 2)
+    grid = counts.reshape(-1, width)
+    rows = np.arange(grid.shape[0])
+
+    if compact_rows:
+        populated = grid.sum(axis=1) > 0
+        grid, rows = grid[populated], rows[populated]
+
+    block_size = 2 ** (32 - prefix)
+    base = int(parent_network.network_address)
+    block_numbers = rows[:, None] * width + np.arange(width)[None, :]
+    labels = [
+        [f"{ipaddress.IPv4Address(base + int(block) * block_size)}/{prefix}" for block in row]
+        for row in block_numbers
+    ]
+
+    return {
+        'z': grid,
+        'rows': rows,
+        'columns': np.arange(width),
+        'labels': labels,
+        'block_size': block_size,
+        'width': width
+    }
+
+def populated_blocks(parent: str, prefix: int, counts: np.ndarray):
+    """(cidr, count) for every non-empty block, busiest first"""
+    parent_network = ipaddress.IPv4Network(parent)
+    block_size = 2 ** (32 - prefix)
+    base = int(parent_network.network_address)
+    blocks = np.flatnonzero(counts)
+    blocks = blocks[np.argsort(-counts[blocks], kind='stable')]
+    return [
+        (f"{ipaddress.IPv4Address(base + int(block) * block_size)}/{prefix}", int(counts[block]))
+        for block in blocks
+    ]
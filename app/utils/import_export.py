@@ -8,9 +8,16 @@ import streamlit as st
 from io import BytesIO, StringIO
 import ipaddress
 import validators
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Set, Iterable
+from sqlalchemy import tuple_
 from sqlalchemy.orm import Session
-from models.database import Site, IPAddress, Subnet, get_db_session
+from models.database import Site, IPAddress, IPRange, Subnet, get_db_session, SUBNET_OVERLAP_SCOPE
+from utils.ranges import range_size, load_site_ranges, covering_range_name
+from utils.overlaps import find_overlapping_subnets
+from utils.cache import bump_data_version
+
+# (cidr, site_id) pairs checked against the database per duplicate-lookup query
+IMPORT_LOOKUP_BATCH = 1000
 
 class ImportExportManager:
     """Manages import and export operations for IP tracking data"""
@@ -140,6 +147,7 @@ class ImportExportManager:
                     imported_count = self._import_subnets(df, session)
                 
                 session.commit()
+                bump_data_version()
                 return True, f"Successfully imported {imported_count} records", imported_count
             
             except Exception as e:
@@ -157,7 +165,11 @@ class ImportExportManager:
         imported_count = 0
         # Track IPs added in this session to avoid duplicates within the same import
         session_ips = set()
+        # Ranges per site, loaded once per site seen in the file
+        ranges_by_site = {}
         
+        # Resolve sites and addresses first so existing entries are found in batched queries
+        candidates = []
         for _, row in df.iterrows():
             # Get or create site
             site = session.query(Site).filter_by(name=row['site_name']).first()
@@ -170,17 +182,29 @@ class ImportExportManager:
             is_valid, ip_cidr = self.validate_ip_address(str(row['ip_address']))
             if not is_valid:
                 continue
-            
+            candidates.append((row, site, ip_cidr))
+        
+        existing_ips = self._existing_keys(
+            session, IPAddress.ip_cidr, IPAddress.site_id,
+            {(str(ip_cidr), site.id) for _, site, ip_cidr in candidates}
+        )
+        
+        for row, site, ip_cidr in candidates:
             # Create a unique key for this IP
             ip_key = (str(ip_cidr), site.id)
             
             # Check if IP already exists in database
-            existing_ip = session.query(IPAddress).filter_by(
-                ip_cidr=ip_cidr, site_id=site.id
-            ).first()
+            existing_ip = ip_key in existing_ips
+            
+            # Addresses inside a range are already accounted for by the range
+            if site.id not in ranges_by_site:
+                ranges_by_site[site.id] = load_site_ranges(session, site.id)
+            covering_range = covering_range_name(ranges_by_site[site.id], ip_cidr)
             
             # Check if already added in this session
-            if not existing_ip and ip_key not in session_ips:
+            if covering_range:
+                print(f"Skipping IP {ip_cidr} for site {row['site_name']} (inside range '{covering_range}')")
+            elif not existing_ip and ip_key not in session_ips:
                 ip_record = IPAddress(
                     site_id=site.id,
                     ip_cidr=ip_cidr,
@@ -201,6 +225,16 @@ class ImportExportManager:
         
         return imported_count
     
+    def _existing_keys(self, session: Session, cidr_column, site_column, keys: Iterable[Tuple[str, int]]) -> Set[Tuple[str, int]]:
+        """(cidr, site_id) pairs already stored, looked up in batches instead of one query per row"""
+        keys = list(keys)
+        existing = set()
+        for start in range(0, len(keys), IMPORT_LOOKUP_BATCH):
+            batch = keys[start:start + IMPORT_LOOKUP_BATCH]
+            rows = session.query(cidr_column, site_column).filter(tuple_(cidr_column, site_column).in_(batch)).all()
+            existing.update((str(cidr), site_id) for cidr, site_id in rows)
+        return existing
+    
     def _import_sites(self, df: pd.DataFrame, session: Session) -> int:
         """Import sites to database"""
         imported_count = 0
@@ -236,22 +270,35 @@ class ImportExportManager:
         # Track subnets added in this session to avoid duplicates within the same import
         session_subnets = set()
         
+        # Resolve sites first so existing subnets are found in batched queries
+        candidates = []
         for _, row in df.iterrows():
             # Get site
             site = session.query(Site).filter_by(name=row['site_name']).first()
-            if not site:
-                continue
-            
+            if site:
+                candidates.append((row, site, self._normalize_cidr(str(row['subnet_cidr']))))
+        
+        existing_subnets = self._existing_keys(
+            session, Subnet.subnet_cidr, Subnet.site_id,
+            {(subnet_cidr, site.id) for _, site, subnet_cidr in candidates}
+        )
+        
+        for row, site, subnet_cidr in candidates:
             # Create a unique key for this subnet
-            subnet_key = (str(row['subnet_cidr']), site.id)
+            subnet_key = (subnet_cidr, site.id)
             
             # Check if already exists in database
-            existing_subnet = session.query(Subnet).filter_by(
-                subnet_cidr=row['subnet_cidr'], site_id=site.id
-            ).first()
+            existing_subnet = subnet_key in existing_subnets
+            
+            # Overlaps with stored subnets, including rows flushed earlier in this import
+            overlapping = [] if existing_subnet or subnet_key in session_subnets else \
+                find_overlapping_subnets(session, str(row['subnet_cidr']), site.id, SUBNET_OVERLAP_SCOPE)
             
             # Check if already added in this session
-            if not existing_subnet and subnet_key not in session_subnets:
+            if overlapping:
+                print(f"Skipping subnet {row['subnet_cidr']} for site {row['site_name']} "
+                      f"(overlaps {overlapping[0].subnet_cidr})")
+            elif not existing_subnet and subnet_key not in session_subnets:
                 subnet = Subnet(
                     site_id=site.id,
                     subnet_cidr=row['subnet_cidr'],
@@ -260,6 +307,7 @@ class ImportExportManager:
                     vlan_id=row.get('vlan_id') if not pd.isna(row.get('vlan_id')) else None
                 )
                 session.add(subnet)
+                session.flush()
                 session_subnets.add(subnet_key)
                 imported_count += 1
             elif existing_subnet:
@@ -269,6 +317,13 @@ class ImportExportManager:
         
         return imported_count
     
+    def _normalize_cidr(self, cidr: str) -> str:
+        """Canonical CIDR text as PostgreSQL returns it (left unchanged if invalid)"""
+        try:
+            return str(ipaddress.ip_network(cidr.strip(), strict=False))
+        except ValueError:
+            return cidr
+    
     def export_data_to_csv(self, data_type: str, site_filter: str = None) -> bytes:
         """Export data to CSV format"""
         session = get_db_session()
@@ -280,6 +335,8 @@ class ImportExportManager:
                 return self._export_sites(session)
             elif data_type == 'subnets':
                 return self._export_subnets(session, site_filter)
+            elif data_type == 'ip_ranges':
+                return self._export_ip_ranges(session, site_filter)
         finally:
             session.close()
     
@@ -351,6 +408,34 @@ class ImportExportManager:
         df = pd.DataFrame(data)
         return df.to_csv(index=False).encode('utf-8')
     
+    def _export_ip_ranges(self, session: Session, site_filter: str = None) -> bytes:
+        """Export address ranges to CSV"""
+        query = session.query(IPRange, Site.name.label('site_name')).join(Site)
+        
+        if site_filter and site_filter != 'ALL':
+            query = query.filter(Site.name == site_filter)
+        
+        results = query.order_by(Site.name, IPRange.start_address).all()
+        
+        data = []
+        for ip_range, site_name in results:
+            data.append({
+                'site_name': site_name,
+                'start_address': str(ip_range.start_address),
+                'end_address': str(ip_range.end_address),
+                'size': range_size(ip_range.start_address, ip_range.end_address),
+                'name': ip_range.name,
+                'role': ip_range.role,
+                'system_owner': ip_range.system_owner,
+                'description': ip_range.description,
+                'status': ip_range.status,
+                'created_at': ip_range.created_at.strftime('%Y-%m-%d %H:%M:%S') if ip_range.created_at else '',
+                'updated_at': ip_range.updated_at.strftime('%Y-%m-%d %H:%M:%S') if ip_range.updated_at else ''
+            })
+        
+        df = pd.DataFrame(data)
+        return df.to_csv(index=False).encode('utf-8')
+    
     def generate_import_template(self, data_type: str) -> bytes:
         """Generate CSV template for import"""
         if data_type == 'ip_addresses':
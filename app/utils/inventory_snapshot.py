@@ -0,0 +1,380 @@
+"""
+Columnar inventory snapshot for IP Tracker application
+Keeps IP entries in NumPy arrays so search filters run as vectorized masks without SQL
+"""
+
+import os
+import time
+import threading
+from collections import namedtuple
+from itertools import islice
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from models.database import get_db_session, Site, IPAddress
+from utils.cache import get_data_version, TTLCache
+from utils.prefix_trie import ADDRESS_BITS, gc_paused, parse_prefix
+from utils.search_engine import classify_search_query, normalize_ip_query, DEFAULT_PAGE_SIZE
+
+# Seconds before the shared snapshot re-checks the database for writes made by other processes
+SNAPSHOT_MAX_AGE = float(os.getenv('INVENTORY_SNAPSHOT_MAX_AGE', '30'))
+
+# updated_at comes from transaction start, so rows committed late can carry an
+# older timestamp than the watermark; refreshes re-read this much history
+WATERMARK_OVERLAP = timedelta(seconds=60)
+
+# Transactions running longer than the overlap (a whole-file import) can still
+# commit rows behind the watermark, so the snapshot is fully reloaded this often
+FULL_RELOAD_INTERVAL = timedelta(seconds=float(os.getenv('INVENTORY_SNAPSHOT_FULL_RELOAD', '900')))
+
+# How far back ip_address_deletions reaches (the record_ip_deletions trigger prunes older ids)
+DELETION_LOG_RETENTION = timedelta(days=7)
+
+DELETED_IDS_SQL = text("SELECT ip_id FROM ip_address_deletions WHERE deleted_at >= :since")
+
+SNAPSHOT_QUERY_COLUMNS = [
+    IPAddress.id, IPAddress.site_id, IPAddress.ip_cidr, IPAddress.hostname, IPAddress.gateway,
+    IPAddress.role, IPAddress.system_owner, IPAddress.description, IPAddress.status,
+    IPAddress.created_at, IPAddress.updated_at
+]
+
+# Dictionary-encoded text columns, and the ones the free-text query matches
+DICTIONARY_COLUMNS = ['hostname', 'role', 'system_owner', 'description', 'status']
+TEXT_SEARCH_FIELDS = ['hostname', 'description', 'role', 'system_owner']
+
+# Kept as Python objects; only read when a page of rows is rendered
+OBJECT_COLUMNS = ['ip_cidr', 'gateway', 'created_at', 'updated_at']
+
+MASK_64 = (1 << 64) - 1
+
+# Up to this many matching codes are tested with == per code instead of a lookup table
+MAX_EQUALITY_SCANS = 4
+
+# Same attributes as a build_search_query row, so callers format both alike
+SnapshotRow = namedtuple('SnapshotRow', [
+    'id', 'ip_cidr', 'hostname', 'gateway', 'role', 'system_owner', 'description',
+    'status', 'created_at', 'updated_at', 'site_name'
+])
+
+class Dictionary:
+    """Distinct values of one text column; rows store int32 codes, with 0 meaning NULL"""
+
+    def __init__(self):
+        self.values = [None]
+        self.lowered = ['']
+        self.codes = {}
+
+    def encode(self, value: Optional[str]) -> int:
+        if value is None:
+            return 0
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+            self.lowered.append(value.lower())
+        return code
+
+    def matching(self, predicate) -> List[int]:
+        """Codes whose lower-cased value satisfies predicate"""
+        return [code for code, value in enumerate(islice(self.lowered, 1, len(self.lowered)), 1) if predicate(value)]
+
+def _codes_in(codes: np.ndarray, matching: List[int], size: Optional[int] = None) -> np.ndarray:
+    """Rows whose code is one of matching; a few equality scans beat a table gather
+
+    size is the number of possible codes (0..size-1) when a lookup table can be used.
+    """
+    if len(matching) <= MAX_EQUALITY_SCANS:
+        mask = np.zeros(len(codes), dtype=bool)
+        for code in matching:
+            mask |= codes == code
+        return mask
+    if size is None:
+        return np.isin(codes, matching)
+    table = np.zeros(size, dtype=bool)
+    table[matching] = True
+    return table[codes]
+
+def _at_most(a_hi, a_lo, b_hi, b_lo):
+    """a <= b for 128-bit values split into high and low 64-bit halves"""
+    return (a_hi < b_hi) | ((a_hi == b_hi) & (a_lo <= b_lo))
+
+class InventorySnapshot:
+    """IP entries as parallel NumPy arrays, sorted like the (ip_cidr, id) keyset order
+
+    Addresses are stored as 128-bit [start, end] ranges split into uint64
+    halves, sites by id, and text columns as dictionary codes, so every
+    filter is a comparison or a lookup-table gather over whole columns.
+    Refreshes build new arrays and swap them in, so searches running
+    meanwhile keep a consistent view.
+    """
+
+    def __init__(self):
+        self.dictionaries = {name: Dictionary() for name in DICTIONARY_COLUMNS}
+        self.site_names = {}
+        self.watermark = None
+        # Database time of the last refresh, the lower bound for reading the deletion log
+        self.deletions_checked_at = None
+        # Database time of the last full reload
+        self.reloaded_at = None
+        # Matching codes per (column, term, dictionary size); paging reuses them
+        self._matches = TTLCache(maxsize=64, ttl=300)
+        self._data = self._index(self._encode_rows([]))
+
+    def __len__(self):
+        return len(self._data[0]['id'])
+
+    def _encode_rows(self, rows: Iterable) -> Dict[str, np.ndarray]:
+        """Column arrays for query rows, advancing the watermark"""
+        values = {name: [] for name in ['id', 'site_id', 'version', 'start_hi', 'start_lo', 'end_hi',
+                                        'end_lo', 'prefix_length'] + DICTIONARY_COLUMNS + OBJECT_COLUMNS}
+        dictionaries = self.dictionaries
+        watermark = self.watermark
+        for row in rows:
+            version, network, length = parse_prefix(str(row.ip_cidr))
+            last = network | ((1 << (ADDRESS_BITS[version] - length)) - 1)
+            values['id'].append(row.id)
+            values['site_id'].append(row.site_id if row.site_id is not None else -1)
+            values['version'].append(version)
+            values['start_hi'].append(network >> 64)
+            values['start_lo'].append(network & MASK_64)
+            values['end_hi'].append(last >> 64)
+            values['end_lo'].append(last & MASK_64)
+            values['prefix_length'].append(length)
+            for name in DICTIONARY_COLUMNS:
+                values[name].append(dictionaries[name].encode(getattr(row, name)))
+            values['ip_cidr'].append(str(row.ip_cidr))
+            values['gateway'].append(str(row.gateway) if row.gateway else None)
+            values['created_at'].append(row.created_at)
+            values['updated_at'].append(row.updated_at)
+            if row.updated_at is not None and (watermark is None or row.updated_at > watermark):
+                watermark = row.updated_at
+        self.watermark = watermark
+
+        def objects(items):
+            array = np.empty(len(items), dtype=object)
+            array[:] = items
+            return array
+
+        columns = {
+            'id': np.array(values['id'], dtype=np.int64),
+            'site_id': np.array(values['site_id'], dtype=np.int32),
+            'version': np.array(values['version'], dtype=np.uint8),
+            'prefix_length': np.array(values['prefix_length'], dtype=np.uint8),
+        }
+        for name in ['start_hi', 'start_lo', 'end_hi', 'end_lo']:
+            columns[name] = np.array(values[name], dtype=np.uint64)
+        for name in DICTIONARY_COLUMNS:
+            columns[name] = np.array(values[name], dtype=np.int32)
+        for name in OBJECT_COLUMNS:
+            columns[name] = objects(values[name])
+        return columns
+
+    @staticmethod
+    def _index(columns: Dict[str, np.ndarray], sort: bool = True):
+        """Sort columns into keyset order and add an id -> position lookup"""
+        if sort:
+            order = np.lexsort((columns['id'], columns['prefix_length'], columns['start_lo'],
+                                columns['start_hi'], columns['version']))
+            columns = {name: array[order] for name, array in columns.items()}
+        id_order = np.argsort(columns['id'], kind='stable')
+        return columns, columns['id'][id_order], id_order
+
+    def _positions(self, ids: np.ndarray) -> np.ndarray:
+        """Current positions of ids, -1 for ids not in the snapshot"""
+        _, sorted_ids, id_order = self._data
+        if not len(sorted_ids):
+            return np.full(len(ids), -1, dtype=np.int64)
+        found = np.minimum(np.searchsorted(sorted_ids, ids), len(sorted_ids) - 1)
+        return np.where(sorted_ids[found] == ids, id_order[found], -1)
+
+    def upsert(self, rows: Iterable) -> int:
+        """Insert or replace rows by id; returns how many were applied"""
+        new = self._encode_rows(rows)
+        if not len(new['id']):
+            return 0
+
+        columns = self._data[0]
+        positions = self._positions(new['id'])
+        existing = positions >= 0
+        if existing.all() and all(
+                np.array_equal(columns[name][positions], new[name])
+                for name in ['version', 'start_hi', 'start_lo', 'prefix_length']):
+            # Only attributes changed, so the order holds: overwrite in place on copies
+            updated = {name: array.copy() for name, array in columns.items()}
+            for name, array in updated.items():
+                array[positions] = new[name]
+            self._data = self._index(updated, sort=False)
+        else:
+            keep = np.ones(len(columns['id']), dtype=bool)
+            keep[positions[existing]] = False
+            self._data = self._index({
+                name: np.concatenate([array[keep], new[name]]) for name, array in columns.items()
+            })
+        return len(new['id'])
+
+    def _keep(self, keep: np.ndarray):
+        if not keep.all():
+            columns = self._data[0]
+            self._data = self._index({name: array[keep] for name, array in columns.items()}, sort=False)
+
+    def retain(self, ids: np.ndarray):
+        """Drop rows whose id is not in ids (the full set of ids in the database)"""
+        self._keep(np.isin(self._data[0]['id'], ids))
+
+    def discard(self, ids: np.ndarray):
+        """Drop rows whose id is in ids (deleted in the database)"""
+        self._keep(~np.isin(self._data[0]['id'], ids))
+
+    def reload(self, rows: Iterable) -> int:
+        """Replace every row with rows (a full read of the table); returns how many were loaded"""
+        columns = self._encode_rows(rows)
+        self._data = self._index(columns)
+        return len(columns['id'])
+
+    def refresh(self, session: Session) -> int:
+        """Pull rows changed since the watermark (everything on first use and every
+        FULL_RELOAD_INTERVAL); returns rows applied"""
+        checked_at = session.execute(text("SELECT LOCALTIMESTAMP")).scalar()
+        self.site_names = dict(session.query(Site.id, Site.name).all())
+
+        query = session.query(*SNAPSHOT_QUERY_COLUMNS)
+        if self.reloaded_at is None or checked_at - self.reloaded_at >= FULL_RELOAD_INTERVAL:
+            with gc_paused():
+                applied = self.reload(query.yield_per(10000))
+            self.reloaded_at = self.deletions_checked_at = checked_at
+            return applied
+
+        if self.watermark is not None:
+            query = query.filter(IPAddress.updated_at >= self.watermark - WATERMARK_OVERLAP)
+        with gc_paused():
+            applied = self.upsert(query.yield_per(10000))
+
+        # Deletes leave no updated_at behind, so they come from the deletion log
+        since = self.deletions_checked_at
+        if checked_at - since < DELETION_LOG_RETENTION - WATERMARK_OVERLAP:
+            rows = session.execute(DELETED_IDS_SQL, {"since": since - WATERMARK_OVERLAP})
+            self.discard(np.fromiter((ip_id for (ip_id,) in rows), dtype=np.int64))
+        else:
+            # The log has been pruned past the last refresh; compare against every id
+            self.retain(np.fromiter((ip_id for (ip_id,) in session.query(IPAddress.id).yield_per(100000)),
+                                    dtype=np.int64))
+        self.deletions_checked_at = checked_at
+        return applied
+
+    def _containing(self, columns, name: str, term: str) -> np.ndarray:
+        term = term.lower()
+        dictionary = self.dictionaries[name]
+        size = len(dictionary.lowered)
+        hit, matching = self._matches.get((name, term, size))
+        if not hit:
+            matching = dictionary.matching(lambda value: term in value)
+            self._matches.set((name, term, size), matching)
+        return _codes_in(columns[name], matching, size)
+
+    @staticmethod
+    def _overlapping(columns, cidr: str) -> np.ndarray:
+        """Rows containing or contained in cidr (the SQL >>= / <<= branches)"""
+        version, network, length = parse_prefix(cidr)
+        last = network | ((1 << (ADDRESS_BITS[version] - length)) - 1)
+        q_start = (np.uint64(network >> 64), np.uint64(network & MASK_64))
+        q_end = (np.uint64(last >> 64), np.uint64(last & MASK_64))
+        start = (columns['start_hi'], columns['start_lo'])
+        end = (columns['end_hi'], columns['end_lo'])
+        contains_query = _at_most(*start, *q_start) & _at_most(*q_end, *end)
+        inside_query = _at_most(*q_start, *start) & _at_most(*end, *q_end)
+        return (columns['version'] == version) & (contains_query | inside_query)
+
+    def filter_mask(self, columns, search_query, site_filter, status_filter, role_filter, owner_filter) -> np.ndarray:
+        """Rows matching normalized search filters (see normalize_search_filters)"""
+        mask = np.ones(len(columns['id']), dtype=bool)
+
+        if site_filter:
+            site_ids = [site_id for site_id, name in self.site_names.items() if name == site_filter]
+            mask &= _codes_in(columns['site_id'], site_ids)
+
+        if status_filter:
+            status = status_filter.lower()
+            mask &= _codes_in(columns['status'], self.dictionaries['status'].matching(lambda value: value == status))
+
+        if role_filter:
+            mask &= self._containing(columns, 'role', role_filter)
+
+        if owner_filter:
+            mask &= self._containing(columns, 'system_owner', owner_filter)
+
+        if search_query:
+            matched = np.zeros(len(mask), dtype=bool)
+            for name in TEXT_SEARCH_FIELDS:
+                matched |= self._containing(columns, name, search_query)
+            if classify_search_query(search_query) == 'ip':
+                matched |= self._overlapping(columns, normalize_ip_query(search_query))
+            mask &= matched
+
+        return mask
+
+    def _row(self, columns, position: int) -> SnapshotRow:
+        decode = {name: self.dictionaries[name].values[columns[name][position]] for name in DICTIONARY_COLUMNS}
+        return SnapshotRow(
+            id=int(columns['id'][position]),
+            ip_cidr=columns['ip_cidr'][position],
+            gateway=columns['gateway'][position],
+            created_at=columns['created_at'][position],
+            updated_at=columns['updated_at'][position],
+            site_name=self.site_names.get(int(columns['site_id'][position])),
+            **decode
+        )
+
+    def search_page(self, filters: Tuple, page_size: int = DEFAULT_PAGE_SIZE,
+                    cursor: Optional[dict] = None) -> Tuple[Dict, int]:
+        """One page of matching rows like fetch_keyset_page, plus the exact match count"""
+        columns = self._data[0]
+        positions = np.flatnonzero(self.filter_mask(columns, *filters))
+
+        anchor = -1
+        if cursor:
+            anchor = int(self._positions(np.array([cursor['key'][1]], dtype=np.int64))[0])
+
+        if anchor >= 0 and cursor['direction'] == 'before':
+            stop = int(np.searchsorted(positions, anchor, side='left'))
+            selected = positions[max(stop - page_size, 0):stop]
+            has_prev, has_next = stop > page_size, True
+        else:
+            # A cursor row deleted since the last page restarts from the top
+            first = int(np.searchsorted(positions, anchor, side='right')) if anchor >= 0 else 0
+            selected = positions[first:first + page_size]
+            has_prev = anchor >= 0
+            has_next = first + page_size < len(positions)
+
+        rows = [self._row(columns, position) for position in selected.tolist()]
+        return {
+            'rows': rows,
+            'has_next': has_next,
+            'has_prev': has_prev,
+            'first_key': (rows[0].ip_cidr, rows[0].id) if rows else None,
+            'last_key': (rows[-1].ip_cidr, rows[-1].id) if rows else None
+        }, len(positions)
+
+# The shared snapshot and the data version it reflects
+_snapshot_lock = threading.Lock()
+_snapshot_state = {'version': None, 'refreshed_at': 0.0, 'snapshot': None}
+
+def get_inventory_snapshot() -> InventorySnapshot:
+    """The shared snapshot, loaded on first use and refreshed from its watermark when stale"""
+    with _snapshot_lock:
+        snapshot = _snapshot_state['snapshot']
+        version = get_data_version()
+        if (snapshot is not None and _snapshot_state['version'] == version
+                and time.monotonic() - _snapshot_state['refreshed_at'] < SNAPSHOT_MAX_AGE):
+            return snapshot
+
+        session = get_db_session()
+        try:
+            snapshot = snapshot or InventorySnapshot()
+            snapshot.refresh(session)
+        finally:
+            session.close()
+
+        _snapshot_state.update(version=version, refreshed_at=time.monotonic(), snapshot=snapshot)
+        return snapshot
@@ -0,0 +1,285 @@
+"""
+Binary lookup database for IP Tracker application
+Compiles sites, subnets and IP entries into memory-mapped NumPy arrays for offline lookups
+
+The database is a directory of .npy files: sorted interval starts per address
+family, the match rows for each interval, and a UTF-8 string table. Readers
+open it with mmap, so any number of processes share one copy of the pages and
+never touch PostgreSQL. Each compile writes a new PATH.build-N directory and
+atomically repoints the PATH symlink at it.
+
+Run from the app directory:
+    python -m utils.lookup_db compile /var/lib/ipdb/lookup        # build from the database
+    python -m utils.lookup_db lookup /var/lib/ipdb/lookup 10.0.1.10 # query a compiled database
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+from models.database import get_db_session
+from utils.prefix_trie import ADDRESS_BITS, PrefixIndex, build_prefix_index, parse_address
+
+# Decoded strings kept per open database
+STRING_CACHE_SIZE = 65536
+
+# Bumped whenever the on-disk layout changes; readers refuse other versions
+LOOKUP_DB_FORMAT = 1
+
+# Columns of the match table, each an index into the string table (-1 when empty)
+LOOKUP_DB_FIELDS = ['site', 'subnet', 'subnet_name', 'ip', 'hostname', 'role']
+
+METADATA_FILE = 'metadata.json'
+
+# Builds kept next to the current one; readers resolving the previous link may still be opening it
+KEEP_PREVIOUS_BUILDS = 1
+
+# Times a reader re-resolves the link when its build is removed while being opened
+OPEN_ATTEMPTS = 5
+
+def _interval_arrays(index: PrefixIndex, version: int, intern, match_rows: List[List[int]]):
+    """Sorted interval starts and their [first, stop) spans into the match rows"""
+    width = ADDRESS_BITS[version]
+    starts, values = index.tries[version].interval_table()
+    spans, prepared = [], {}
+    kept = []
+    for start, found in zip(starts, values):
+        if start >= 1 << width:
+            continue
+        span = prepared.get(id(found))
+        if span is None:
+            first = len(match_rows)
+            best = index.best_per_site(found)
+            rows = sorted(
+                (index.match_row(None, site_id, kinds) for site_id, kinds in best.items()),
+                key=lambda row: row['site'] or ''
+            )
+            for row in rows:
+                match_rows.append([
+                    intern(row['site']), intern(row['subnet']), intern(row['subnet_name']),
+                    intern(row['ip_cidr']), intern(row['hostname']), intern(row['role'])
+                ])
+            span = prepared[id(found)] = (first, len(match_rows))
+        kept.append(start.to_bytes(width // 8, 'big'))
+        spans.append(span)
+    return (np.array(kept, dtype=f'S{width // 8}'),
+            np.array(spans, dtype=np.uint32).reshape(-1, 2))
+
+def compile_lookup_db(index: PrefixIndex, path: str) -> Dict:
+    """Write the index to path as a lookup database, replacing any previous one
+
+    Files are written to a new build directory and the path symlink is
+    replaced atomically, so path always resolves to one complete build.
+    Returns the metadata written.
+    """
+    strings, string_ids = [], {}
+
+    def intern(value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        string_id = string_ids.get(value)
+        if string_id is None:
+            string_id = string_ids[value] = len(strings)
+            strings.append(value)
+        return string_id
+
+    match_rows = []
+    arrays = {}
+    for version in sorted(index.tries):
+        starts, spans = _interval_arrays(index, version, intern, match_rows)
+        arrays[f'ipv{version}_starts'] = starts
+        arrays[f'ipv{version}_spans'] = spans
+    arrays['matches'] = np.array(match_rows, dtype=np.int32).reshape(-1, len(LOOKUP_DB_FIELDS))
+
+    encoded = [value.encode('utf-8') for value in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    arrays['strings'] = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    arrays['string_offsets'] = offsets
+
+    metadata = {
+        'format': LOOKUP_DB_FORMAT,
+        'fields': LOOKUP_DB_FIELDS,
+        'built_at': datetime.now().isoformat(timespec='seconds'),
+        'prefixes': len(index),
+        'intervals': {f'ipv{version}': len(arrays[f'ipv{version}_starts']) for version in sorted(index.tries)},
+        'matches': len(match_rows),
+        'strings': len(strings)
+    }
+
+    path = os.path.abspath(path)
+    build = f"{path}.build-{time.time_ns()}"
+    os.makedirs(build)
+    for name, array in arrays.items():
+        np.save(os.path.join(build, f'{name}.npy'), array)
+    with open(os.path.join(build, METADATA_FILE), 'w') as f:
+        json.dump(metadata, f, indent=2)
+
+    if os.path.isdir(path) and not os.path.islink(path):
+        # A database from before versioned builds; becomes the oldest build
+        os.rename(path, f"{path}.build-0")
+
+    link = f"{path}.link-{os.getpid()}"
+    if os.path.lexists(link):
+        os.remove(link)
+    os.symlink(os.path.basename(build), link)
+    os.replace(link, path)
+
+    _remove_old_builds(path)
+    return metadata
+
+def _remove_old_builds(path: str):
+    """Delete builds older than the current one and the KEEP_PREVIOUS_BUILDS before it
+
+    Open memory maps keep deleted files alive until their readers reopen.
+    """
+    directory, prefix = os.path.dirname(path), f"{os.path.basename(path)}.build-"
+    builds = sorted(
+        (int(name[len(prefix):]), name) for name in os.listdir(directory)
+        if name.startswith(prefix) and name[len(prefix):].isdigit()
+    )
+    current = os.path.basename(os.path.realpath(path))[len(prefix):]
+    if not current.isdigit():
+        return
+    # Newer builds may belong to a compile still in progress
+    older = [name for number, name in builds if number < int(current)]
+    for name in older[:max(len(older) - KEEP_PREVIOUS_BUILDS, 0)]:
+        shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+def build_lookup_db(path: str) -> Dict:
+    """Compile the current database contents to path"""
+    session = get_db_session()
+    try:
+        index = build_prefix_index(session)
+    finally:
+        session.close()
+    return compile_lookup_db(index, path)
+
+class LookupDB:
+    """Read-only, memory-mapped view of a compiled lookup database
+
+    Lookups are a binary search over the interval starts of the address's
+    family; only the pages touched are read from disk.
+    """
+
+    def __init__(self, path: str):
+        for attempt in range(OPEN_ATTEMPTS):
+            # Resolve the symlink once so every file comes from the same build
+            build = os.path.realpath(path)
+            try:
+                self._open(build)
+                return
+            except FileNotFoundError:
+                # Retry only if a newer build replaced this one meanwhile
+                if attempt == OPEN_ATTEMPTS - 1 or os.path.realpath(path) == build:
+                    raise
+
+    def _open(self, path: str):
+        self.path = path
+        with open(os.path.join(path, METADATA_FILE)) as f:
+            self.metadata = json.load(f)
+        if self.metadata.get('format') != LOOKUP_DB_FORMAT:
+            raise ValueError(f"Unsupported lookup database format: {self.metadata.get('format')}")
+
+        def load(name):
+            return np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+
+        self.starts = {version: load(f'ipv{version}_starts') for version in ADDRESS_BITS}
+        self.spans = {version: load(f'ipv{version}_spans') for version in ADDRESS_BITS}
+        self.matches = load('matches')
+        self.strings = load('strings')
+        self.string_offsets = load('string_offsets')
+        self.string = lru_cache(maxsize=STRING_CACHE_SIZE)(self._string)
+
+    def _string(self, string_id: int) -> Optional[str]:
+        """Decode one entry of the string table"""
+        if string_id < 0:
+            return None
+        start, stop = self.string_offsets[string_id:string_id + 2].tolist()
+        return self.strings[start:stop].tobytes().decode('utf-8')
+
+    def _rows(self, address: str, version: int, position: int) -> List[Dict]:
+        first, stop = self.spans[version][position].tolist()
+        rows = [
+            dict(zip(LOOKUP_DB_FIELDS, map(self.string, match)), address=address)
+            for match in self.matches[first:stop].tolist()
+        ]
+        return rows or [dict(dict.fromkeys(LOOKUP_DB_FIELDS), address=address)]
+
+    def lookup(self, address: str) -> List[Dict]:
+        """Longest-prefix matches for one address, one row per matching site
+
+        Addresses nothing contains get a single row of empty fields.
+        """
+        address = address.strip()
+        version, value = parse_address(address)
+        key = value.to_bytes(ADDRESS_BITS[version] // 8, 'big')
+        position = int(np.searchsorted(self.starts[version], key, side='right')) - 1
+        return self._rows(address, version, position)
+
+    def lookup_many(self, addresses: Iterable[str]) -> List[Dict]:
+        """Matches for many addresses in input order, searched per family in one vectorized pass
+
+        Invalid addresses get a row with an error.
+        """
+        addresses = [address.strip() for address in addresses]
+        keys = {version: ([], []) for version in ADDRESS_BITS}
+        for position, address in enumerate(addresses):
+            try:
+                version, value = parse_address(address)
+            except ValueError:
+                continue
+            keys[version][0].append(position)
+            keys[version][1].append(value.to_bytes(ADDRESS_BITS[version] // 8, 'big'))
+
+        found = {}
+        for version, (positions, packed) in keys.items():
+            if positions:
+                searched = np.searchsorted(
+                    self.starts[version], np.array(packed, dtype=f'S{ADDRESS_BITS[version] // 8}'), side='right'
+                ) - 1
+                found.update((position, (version, int(interval))) for position, interval in zip(positions, searched))
+
+        rows = []
+        for position, address in enumerate(addresses):
+            if position in found:
+                rows.extend(self._rows(address, *found[position]))
+            else:
+                rows.append(dict(dict.fromkeys(LOOKUP_DB_FIELDS), address=address, error='Invalid IP address'))
+        return rows
+
+def main(argv=None):
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description="Compile or query an IP Tracker lookup database")
+    commands = parser.add_subparsers(dest='command', required=True)
+    compile_parser = commands.add_parser('compile', help="build a lookup database from PostgreSQL")
+    compile_parser.add_argument('path', help="output directory")
+    lookup_parser = commands.add_parser('lookup', help="look addresses up in a compiled database")
+    lookup_parser.add_argument('path', help="lookup database directory")
+    lookup_parser.add_argument('addresses', nargs='+', help="IPv4 or IPv6 addresses")
+    args = parser.parse_args(argv)
+
+    if args.command == 'compile':
+        started = time.perf_counter()
+        metadata = build_lookup_db(args.path)
+        print(f"Compiled {metadata['prefixes']:,} prefixes into {args.path} "
+              f"in {time.perf_counter() - started:.1f}s")
+        return 0
+
+    try:
+        db = LookupDB(args.path)
+    except (OSError, ValueError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        return 1
+    for row in db.lookup_many(args.addresses):
+        print(json.dumps(row))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+"""
+Database maintenance jobs for IP Tracker application
+Runs long maintenance tasks in background threads and records per-step progress
+"""
+
+import time
+import uuid
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Any
+from sqlalchemy import text
+from models.database import db_manager, get_db_session
+from utils.cache import bump_data_version
+from utils.statistics import rebuild_statistics
+
+MAINTAINED_TABLES = ['ip_addresses', 'subnets', 'sites']
+
+class MaintenanceJob:
+    """State of one background maintenance job"""
+
+    def __init__(self, name: str):
+        self.id = uuid.uuid4().hex[:8]
+        self.name = name
+        self.status = 'queued'
+        self.steps: List[Dict[str, Any]] = []
+        self.progress = 0.0
+        self.message = ''
+        self.error: Optional[str] = None
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self.status in ('queued', 'running')
+
+    def record_step(self, step: str, duration: float, **details):
+        """Append a completed step with its duration in seconds"""
+        self.steps.append({'step': step, 'duration_s': round(duration, 3), **details})
+
+class MaintenanceManager:
+    """Starts maintenance jobs in background threads and tracks their state"""
+
+    def __init__(self):
+        self._jobs: Dict[str, MaintenanceJob] = {}
+        self._lock = threading.Lock()
+
+    def start(self, name: str, target, **kwargs) -> MaintenanceJob:
+        """Start target(job, **kwargs) in the background, or return the running job of that name"""
+        with self._lock:
+            for job in self._jobs.values():
+                if job.name == name and job.is_running:
+                    return job
+            job = MaintenanceJob(name)
+            self._jobs[job.id] = job
+
+        threading.Thread(
+            target=self._run, args=(job, target, kwargs), name=f"maintenance-{name}", daemon=True
+        ).start()
+        return job
+
+    def _run(self, job: MaintenanceJob, target, kwargs):
+        job.status = 'running'
+        job.started_at = datetime.now()
+        try:
+            target(job, **kwargs)
+            job.status = 'completed'
+            job.progress = 1.0
+        except Exception as e:
+            job.status = 'failed'
+            job.error = str(e)
+        finally:
+            job.finished_at = datetime.now()
+
+    def get(self, job_id: str) -> Optional[MaintenanceJob]:
+        """Look up a job by id"""
+        return self._jobs.get(job_id)
+
+    def latest(self, name: str) -> Optional[MaintenanceJob]:
+        """Most recently started job with the given name"""
+        jobs = [job for job in self._jobs.values() if job.name == name]
+        return max(jobs, key=lambda job: job.started_at or datetime.min) if jobs else None
+
+def get_row_estimates(connection, tables: List[str]) -> Dict[str, int]:
+    """Planner row estimates (pg_class.reltuples) for the given tables"""
+    rows = connection.execute(
+        text("SELECT relname, reltuples::bigint FROM pg_class WHERE relname = ANY(:tables) AND relkind = 'r'"),
+        {"tables": tables}
+    ).all()
+    return {name: int(estimate) for name, estimate in rows}
+
+def rebuild_statistics_job(job: MaintenanceJob, vacuum: bool = False):
+    """Recompute counter caches, then ANALYZE (optionally VACUUM) the inventory tables"""
+    total_steps = 1 + len(MAINTAINED_TABLES)
+
+    # Step 1: derived counters from scratch
+    job.message = "Recomputing statistics counters"
+    started = time.perf_counter()
+    session = get_db_session()
+    try:
+        rebuild_statistics(session)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+    job.record_step("Recompute counters", time.perf_counter() - started)
+    job.progress = 1 / total_steps
+
+    # Steps 2..n: planner statistics; VACUUM cannot run inside a transaction block
+    command = "VACUUM (ANALYZE)" if vacuum else "ANALYZE"
+    with db_manager.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        for index, table in enumerate(MAINTAINED_TABLES, start=2):
+            job.message = f"Running {command} on {table}"
+            before = get_row_estimates(connection, [table]).get(table)
+            started = time.perf_counter()
+            connection.execute(text(f"{command} {table}"))
+            duration = time.perf_counter() - started
+            after = get_row_estimates(connection, [table]).get(table)
+            job.record_step(f"{command} {table}", duration, rows_before=before, rows_after=after)
+            job.progress = index / total_steps
+
+    # Cached searches and dashboard snapshots were built from the old counters
+    bump_data_version()
+    job.message = "Statistics rebuilt"
+
+def build_inactive_filter(older_than_days: Optional[int]) -> str:
+    """WHERE clause selecting purge candidates (binds :cutoff when aged)"""
+    clause = "status = 'inactive'"
+    if older_than_days:
+        clause += " AND updated_at < :cutoff"
+    return clause
+
+def count_inactive_ips(older_than_days: Optional[int] = None) -> int:
+    """Count IP addresses the purge job would remove"""
+    session = get_db_session()
+    try:
+        return session.execute(
+            text(f"SELECT COUNT(*) FROM ip_addresses WHERE {build_inactive_filter(older_than_days)}"),
+            {"cutoff": datetime.now() - timedelta(days=older_than_days or 0)}
+        ).scalar()
+    finally:
+        session.close()
+
+def purge_inactive_ips_job(job: MaintenanceJob, archive: bool = False, older_than_days: Optional[int] = None,
+                           batch_size: int = 1000, pause_seconds: float = 0.5, dry_run: bool = False):
+    """Delete (or archive) inactive IP addresses in small keyset-ordered batches
+    
+    Each batch is its own short transaction over at most batch_size rows taken
+    in id order after the previous batch, with a pause between batches so
+    locks, WAL volume and replication lag stay bounded.
+    """
+    started = time.perf_counter()
+    cutoff = datetime.now() - timedelta(days=older_than_days or 0)
+    total = count_inactive_ips(older_than_days)
+    job.record_step("Count candidates", time.perf_counter() - started, rows=total)
+
+    if dry_run or total == 0:
+        job.message = f"{total:,} inactive IP addresses match" + (" (dry run)" if dry_run else "")
+        return
+
+    archive_cte = """
+        , archived AS (
+            INSERT INTO ip_address_archive
+                (id, site_id, ip_cidr, hostname, gateway, role, system_owner,
+                 description, status, created_at, updated_at)
+            SELECT id, site_id, ip_cidr, hostname, gateway, role, system_owner,
+                   description, status, created_at, updated_at
+              FROM removed
+            ON CONFLICT (id) DO NOTHING
+        )
+    """ if archive else ""
+    batch_sql = text(f"""
+        WITH batch AS (
+            SELECT id FROM ip_addresses
+             WHERE {build_inactive_filter(older_than_days)} AND id > :last_id
+             ORDER BY id
+             LIMIT :batch_size
+        ), removed AS (
+            DELETE FROM ip_addresses ip USING batch
+             WHERE ip.id = batch.id AND {build_inactive_filter(older_than_days)}
+            RETURNING ip.*
+        ) {archive_cte}
+        SELECT (SELECT MAX(id) FROM batch), (SELECT COUNT(*) FROM removed)
+    """)
+
+    action = "Archived" if archive else "Deleted"
+    last_id = 0
+    processed = 0
+    started = time.perf_counter()
+    while True:
+        with db_manager.engine.begin() as connection:
+            max_id, removed = connection.execute(
+                batch_sql, {"last_id": last_id, "batch_size": batch_size, "cutoff": cutoff}
+            ).one()
+        if max_id is None:
+            break
+
+        last_id = max_id
+        processed += removed
+        bump_data_version()
+        job.progress = min(processed / total, 1.0)
+        job.message = f"{action} {processed:,} of ~{total:,} inactive IP addresses"
+        time.sleep(pause_seconds)
+
+    job.record_step(f"{action} inactive IPs", time.perf_counter() - started, rows=processed)
+    job.message = f"{action} {processed:,} inactive IP addresses"
+
+# Global instance
+maintenance_manager = MaintenanceManager()
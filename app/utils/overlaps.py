@@ -0,0 +1,83 @@
+"""
+Subnet overlap detection for IP Tracker application
+Indexed overlap checks for new subnets and a sweep-line report over all subnets
+"""
+
+import heapq
+import ipaddress
+from typing import List, Tuple, Hashable, Any
+import pandas as pd
+from sqlalchemy.orm import Session
+from models.database import Site, Subnet
+
+def find_overlapping_subnets(session: Session, subnet_cidr: str, site_id: int, scope: str = 'site') -> List[Subnet]:
+    """Existing subnets sharing addresses with subnet_cidr (GiST-indexed && lookup)
+
+    With scope 'site' only subnets at the same site count; 'global' checks
+    every site and 'off' never reports overlaps.
+    """
+    if scope == 'off':
+        return []
+
+    query = session.query(Subnet).filter(Subnet.subnet_cidr.op('&&')(subnet_cidr))
+    if scope == 'site':
+        query = query.filter(Subnet.site_id == site_id)
+    return query.order_by(Subnet.subnet_cidr).all()
+
+def sweep_overlaps(intervals: List[Tuple[Hashable, int, int, Any]]) -> List[Tuple[Any, Any]]:
+    """Every overlapping pair among (group, start, end, item) intervals
+
+    Only intervals in the same group are compared. Intervals are sorted once
+    and swept left to right with a min-heap of open intervals keyed by their
+    end, so the cost is O(n log n) plus one step per reported pair.
+    """
+    ordered = sorted(intervals, key=lambda interval: (interval[0], interval[1], -interval[2]))
+
+    pairs = []
+    open_intervals = []
+    current_group = object()
+    for sequence, (group, start, end, item) in enumerate(ordered):
+        if group != current_group:
+            current_group = group
+            open_intervals = []
+
+        # Intervals ending before this start can never overlap anything later
+        while open_intervals and open_intervals[0][0] < start:
+            heapq.heappop(open_intervals)
+
+        pairs.extend((other, item) for _, _, other in open_intervals)
+        heapq.heappush(open_intervals, (end, sequence, item))
+
+    return pairs
+
+def build_overlap_report(session: Session, scope: str = 'site') -> pd.DataFrame:
+    """All overlapping subnet pairs, within each site or across sites"""
+    subnets = session.query(
+        Subnet.id, Subnet.site_id, Subnet.subnet_cidr, Subnet.name, Site.name.label('site_name')
+    ).outerjoin(Site, Site.id == Subnet.site_id).all()
+
+    intervals = []
+    for subnet in subnets:
+        network = ipaddress.ip_network(str(subnet.subnet_cidr), strict=False)
+        group = (network.version, subnet.site_id) if scope == 'site' else (network.version,)
+        intervals.append((group, int(network.network_address), int(network.broadcast_address), (subnet, network)))
+
+    records = []
+    for (outer, outer_network), (inner, inner_network) in sweep_overlaps(intervals):
+        if outer_network == inner_network:
+            relation = "duplicate"
+        elif outer_network.supernet_of(inner_network):
+            relation = "contains"
+        else:
+            relation = "overlaps"
+        records.append({
+            'Site': outer.site_name,
+            'Subnet': str(outer_network),
+            'Name': outer.name,
+            'Relation': relation,
+            'Other Site': inner.site_name,
+            'Other Subnet': str(inner_network),
+            'Other Name': inner.name
+        })
+
+    return pd.DataFrame(records, columns=['Site', 'Subnet', 'Name', 'Relation', 'Other Site', 'Other Subnet', 'Other Name'])
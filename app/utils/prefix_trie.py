@@ -0,0 +1,417 @@
+"""
+Longest-prefix-match index for IP Tracker application
+In-process Patricia tries over subnets and IP entries, rebuilt per data version or max age and patched on writes
+"""
+
+import gc
+import os
+import time
+import socket
+import ipaddress
+import threading
+from bisect import bisect_right
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from models.database import get_db_session, Site, IPAddress, Subnet
+from utils.cache import get_data_version
+
+ADDRESS_BITS = {4: 32, 6: 128}
+
+# Seconds before the shared index is rebuilt to pick up writes from other processes
+PREFIX_INDEX_MAX_AGE = float(os.getenv('PREFIX_INDEX_MAX_AGE', '300'))
+
+@contextmanager
+def gc_paused():
+    """Suspend the cyclic GC while building many small objects that are never garbage"""
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+class TrieNode:
+    """One prefix in a PrefixTrie; entries maps item key -> record"""
+    __slots__ = ('key', 'length', 'entries', 'children')
+
+    def __init__(self, key: int, length: int):
+        self.key = key
+        self.length = length
+        self.entries = None
+        self.children = [None, None]
+
+def common_prefix_length(key_a: int, length_a: int, key_b: int, length_b: int) -> int:
+    """Number of leading bits two prefixes share"""
+    shortest = min(length_a, length_b)
+    diff = (key_a >> (length_a - shortest)) ^ (key_b >> (length_b - shortest))
+    return shortest - diff.bit_length()
+
+class PrefixTrie:
+    """Path-compressed binary (Patricia) trie for one address family
+
+    Keys are prefixes given as (network address as int, prefix length); each
+    prefix holds any number of records. Nodes only exist where a prefix is
+    stored or two branches meet, so a lookup visits at most one node per
+    distinct prefix length on the address's path. Writers build new nodes
+    completely before linking them in, so concurrent lookups always see a
+    consistent trie.
+    """
+
+    def __init__(self, width: int):
+        self.width = width
+        self.root = TrieNode(0, 0)
+        self.size = 0
+        self._table = None
+
+    def _find(self, address: int, length: int, create: bool = False) -> Optional[TrieNode]:
+        key = address >> (self.width - length)
+        node = self.root
+        while node.length < length:
+            bit = (key >> (length - node.length - 1)) & 1
+            child = node.children[bit]
+            if child is None:
+                if not create:
+                    return None
+                child = TrieNode(key, length)
+                node.children[bit] = child
+                return child
+
+            if child.length <= length and key >> (length - child.length) == child.key:
+                node = child
+                continue
+            if not create:
+                return None
+            common = common_prefix_length(child.key, child.length, key, length)
+
+            # Split the edge to child at the first differing bit
+            new = TrieNode(key, length)
+            if common == length:
+                new.children[(child.key >> (child.length - length - 1)) & 1] = child
+                node.children[bit] = new
+                return new
+            branch = TrieNode(key >> (length - common), common)
+            branch.children[(child.key >> (child.length - common - 1)) & 1] = child
+            branch.children[(key >> (length - common - 1)) & 1] = new
+            node.children[bit] = branch
+            return new
+
+        return node if node.length == length else None
+
+    def add(self, address: int, length: int, item_key, record):
+        """Store record under the prefix address/length"""
+        node = self._find(address, length, create=True)
+        entries = dict(node.entries) if node.entries else {}
+        if item_key not in entries:
+            self.size += 1
+        entries[item_key] = record
+        node.entries = entries
+        # Invalidate only once the entry is visible, so no reader caches a table without it
+        self._table = None
+
+    def remove(self, address: int, length: int, item_key) -> bool:
+        """Remove one record from a prefix, pruning nodes that are no longer needed"""
+        key = address >> (self.width - length)
+        parents = []
+        node = self.root
+        while node is not None and node.length < length:
+            bit = (key >> (length - node.length - 1)) & 1
+            parents.append((node, bit))
+            node = node.children[bit]
+            if node is not None and common_prefix_length(node.key, node.length, key, length) < node.length:
+                node = None
+        if node is None or node.length != length or not node.entries or item_key not in node.entries:
+            return False
+
+        entries = {k: v for k, v in node.entries.items() if k != item_key}
+        node.entries = entries or None
+        self._table = None
+        self.size -= 1
+
+        # Drop an empty leaf or bypass an empty single-child node; a branch
+        # left with one child by dropping a leaf is bypassed too
+        if node.entries is None and parents:
+            parent, bit = parents.pop()
+            children = [child for child in node.children if child is not None]
+            if len(children) < 2:
+                parent.children[bit] = children[0] if children else None
+                if not children and parent.entries is None and parents:
+                    remaining = [child for child in parent.children if child is not None]
+                    if len(remaining) == 1:
+                        grandparent, parent_bit = parents.pop()
+                        grandparent.children[parent_bit] = remaining[0]
+        return True
+
+    def get(self, address: int, length: int) -> Dict:
+        """Records stored under exactly address/length"""
+        node = self._find(address, length)
+        return (node.entries or {}) if node is not None else {}
+
+    def matches(self, address: int) -> List[Dict]:
+        """Record dicts of every stored prefix containing address, least specific first"""
+        width = self.width
+        found = []
+        node = self.root
+        while node is not None:
+            length = node.length
+            if address >> (width - length) != node.key:
+                break
+            if node.entries:
+                found.append(node.entries)
+            if length == width:
+                break
+            node = node.children[(address >> (width - 1 - length)) & 1]
+        return found
+
+    def interval_table(self) -> Tuple[List[int], List[Tuple[Dict, ...]]]:
+        """Split the address space into runs that share the same matches()
+
+        Returns (starts, matches) where addresses from starts[i] up to
+        starts[i + 1] have matches[i]. Built by one in-order walk and cached
+        until the trie changes, so bulk lookups are a bisection per address.
+        """
+        table = self._table
+        if table is not None:
+            return table
+
+        starts, values = [0], [()]
+
+        def mark(start, found):
+            if starts[-1] == start:
+                values[-1] = found
+            else:
+                starts.append(start)
+                values.append(found)
+
+        def visit(node, found):
+            shift = self.width - node.length
+            if node.entries:
+                found = found + (node.entries,)
+                mark(node.key << shift, found)
+            for child in node.children:
+                if child is not None:
+                    visit(child, found)
+                    # Back to this node's matches after the child's range
+                    mark((child.key + 1) << (self.width - child.length), found)
+
+        with gc_paused():
+            visit(self.root, ())
+        self._table = (starts, values)
+        return self._table
+
+    def __len__(self):
+        return self.size
+
+def parse_address(address: str) -> Tuple[int, int]:
+    """(version, integer value) of an IPv4/IPv6 address string
+
+    Uses inet_pton for speed on the common forms and falls back to the
+    ipaddress module (which raises ValueError for anything invalid).
+    """
+    try:
+        return 4, int.from_bytes(socket.inet_pton(socket.AF_INET, address), 'big')
+    except OSError:
+        pass
+    try:
+        return 6, int.from_bytes(socket.inet_pton(socket.AF_INET6, address), 'big')
+    except OSError:
+        parsed = ipaddress.ip_address(address)
+        return parsed.version, int(parsed)
+
+def parse_prefix(cidr: str) -> Tuple[int, int, int]:
+    """(version, network address as int, prefix length) of an address or CIDR string"""
+    address, _, length = cidr.partition('/')
+    version, value = parse_address(address)
+    width = ADDRESS_BITS[version]
+    length = int(length) if length else width
+    if not 0 <= length <= width:
+        raise ValueError(f"Invalid prefix length in {cidr}")
+    # Clear host bits like ip_network(strict=False)
+    return version, value >> (width - length) << (width - length), length
+
+class PrefixIndex:
+    """Longest-prefix lookups over all subnets and IP entries, per site
+
+    Subnet and IP records live in one trie per family so a single walk finds
+    both. Records are (kind, site_id, id, cidr, name, role) tuples where name
+    is the subnet name or the IP's hostname (subnets have no role).
+    """
+
+    def __init__(self):
+        self.tries = {version: PrefixTrie(width) for version, width in ADDRESS_BITS.items()}
+        self.site_names: Dict[int, str] = {}
+
+    def _add(self, kind: str, item_id: int, site_id: int, cidr: str, name: Optional[str], role: Optional[str] = None):
+        version, address, length = parse_prefix(cidr)
+        self.tries[version].add(address, length, (kind, item_id), (kind, site_id, item_id, cidr, name, role))
+
+    def _remove(self, kind: str, item_id: int, cidr: str) -> bool:
+        version, address, length = parse_prefix(cidr)
+        return self.tries[version].remove(address, length, (kind, item_id))
+
+    def add_subnet(self, subnet_id: int, site_id: int, subnet_cidr: str, name: Optional[str]):
+        self._add('subnet', subnet_id, site_id, subnet_cidr, name)
+
+    def remove_subnet(self, subnet_id: int, subnet_cidr: str) -> bool:
+        return self._remove('subnet', subnet_id, subnet_cidr)
+
+    def add_ip(self, ip_id: int, site_id: int, ip_cidr: str, hostname: Optional[str], role: Optional[str] = None):
+        self._add('ip', ip_id, site_id, ip_cidr, hostname, role)
+
+    def remove_ip(self, ip_id: int, ip_cidr: str) -> bool:
+        return self._remove('ip', ip_id, ip_cidr)
+
+    def set_site_name(self, site_id: int, name: str):
+        self.site_names[site_id] = name
+
+    def find_exact(self, kind: str, cidr: str, site_id: int) -> Optional[Tuple]:
+        """The record of a kind stored under exactly cidr at a site, if any"""
+        version, address, length = parse_prefix(cidr)
+        entries = self.tries[version].get(address, length)
+        for record in entries.values():
+            if record[0] == kind and record[1] == site_id:
+                return record
+        return None
+
+    def best_per_site(self, found: Iterable[Dict], site_id: Optional[int] = None) -> Dict[int, Dict[str, Tuple]]:
+        """Most specific subnet and IP record per site from matches() output
+
+        Returns {site_id: {'subnet': record, 'ip': record}}; a kind is missing
+        when nothing of that kind at the site contains the address.
+        """
+        best = {}
+        for entries in found:
+            for record in entries.values():
+                if site_id is None or record[1] == site_id:
+                    best.setdefault(record[1], {})[record[0]] = record
+        return best
+
+    def lookup(self, address: str, site_id: Optional[int] = None) -> List[Dict]:
+        """Longest-prefix matches for one address, one row per matching site"""
+        address = address.strip()
+        version, value = parse_address(address)
+        matches = self.best_per_site(self.tries[version].matches(value), site_id)
+        return [
+            self.match_row(address, matched_site, kinds)
+            for matched_site, kinds in sorted(matches.items(), key=lambda item: self.site_names.get(item[0]) or '')
+        ]
+
+    def classify(self, addresses: Iterable[str], site_id: Optional[int] = None) -> List[Dict]:
+        """Longest-prefix matches for many addresses, in input order
+
+        Gives one row per (address, matching site), or a single row without a
+        site when nothing contains the address; invalid addresses get a row
+        with an error. Each address is one bisection of the family's
+        interval table, and rows are prepared once per distinct match.
+        """
+        tables = {version: trie.interval_table() for version, trie in self.tries.items()}
+        prepared = {}
+        rows = []
+        for address in addresses:
+            address = address.strip()
+            try:
+                version, value = parse_address(address)
+            except ValueError:
+                rows.append(dict(self.match_row(address, None, {}), error='Invalid IP address'))
+                continue
+
+            starts, values = tables[version]
+            found = values[bisect_right(starts, value) - 1]
+            templates = prepared.get(id(found))
+            if templates is None:
+                best = self.best_per_site(found, site_id)
+                templates = prepared[id(found)] = [
+                    self.match_row(None, matched_site, kinds) for matched_site, kinds in best.items()
+                ] or [self.match_row(None, None, {})]
+            for template in templates:
+                row = dict(template)
+                row['address'] = address
+                rows.append(row)
+        return rows
+
+    def match_row(self, address: str, site_id: Optional[int], kinds: Dict[str, Tuple]) -> Dict:
+        """Flatten a per-site match into a display/export row"""
+        subnet, ip = kinds.get('subnet'), kinds.get('ip')
+        return {
+            'address': address,
+            'site_id': site_id,
+            'site': self.site_names.get(site_id),
+            'subnet_id': subnet[2] if subnet else None,
+            'subnet': subnet[3] if subnet else None,
+            'subnet_name': subnet[4] if subnet else None,
+            'ip_id': ip[2] if ip else None,
+            'ip_cidr': ip[3] if ip else None,
+            'hostname': ip[4] if ip else None,
+            'role': ip[5] if ip else None,
+            'error': None
+        }
+
+    def __len__(self):
+        return sum(len(trie) for trie in self.tries.values())
+
+def build_prefix_index(session: Session) -> PrefixIndex:
+    """Load every site, subnet and IP entry into a fresh index"""
+    index = PrefixIndex()
+    with gc_paused():
+        for site_id, name in session.query(Site.id, Site.name):
+            index.set_site_name(site_id, name)
+        for subnet_id, site_id, subnet_cidr, name in session.query(
+                Subnet.id, Subnet.site_id, Subnet.subnet_cidr, Subnet.name):
+            index.add_subnet(subnet_id, site_id, str(subnet_cidr), name)
+        for ip_id, site_id, ip_cidr, hostname, role in session.query(
+                IPAddress.id, IPAddress.site_id, IPAddress.ip_cidr, IPAddress.hostname,
+                IPAddress.role).yield_per(10000):
+            index.add_ip(ip_id, site_id, str(ip_cidr), hostname, role)
+    return index
+
+# The shared index, the data version it reflects and when it was built
+_index_lock = threading.Lock()
+_build_lock = threading.Lock()
+_index_state = {'version': None, 'index': None, 'refreshed_at': 0.0}
+
+def _index_is_current(version: int) -> bool:
+    """True when the shared index reflects version and is younger than PREFIX_INDEX_MAX_AGE"""
+    return (_index_state['version'] == version
+            and time.monotonic() - _index_state['refreshed_at'] < PREFIX_INDEX_MAX_AGE)
+
+def get_prefix_index() -> PrefixIndex:
+    """The shared index, rebuilt when data changed since it was built or patched
+
+    Writes made by other processes do not bump this process's data version,
+    so the index is also rebuilt once it is older than PREFIX_INDEX_MAX_AGE.
+    """
+    with _index_lock:
+        if _index_is_current(get_data_version()):
+            return _index_state['index']
+
+    with _build_lock:
+        # Another thread may have rebuilt it while we waited
+        version = get_data_version()
+        with _index_lock:
+            if _index_is_current(version):
+                return _index_state['index']
+
+        session = get_db_session()
+        try:
+            index = build_prefix_index(session)
+        finally:
+            session.close()
+
+        with _index_lock:
+            _index_state.update(version=version, index=index, refreshed_at=time.monotonic())
+        return index
+
+def apply_to_prefix_index(new_version: int, change: Callable[[PrefixIndex], None]):
+    """Patch the shared index for one committed write instead of rebuilding it
+
+    new_version is what bump_data_version() returned for the write. The patch
+    only applies when the index was current just before that write; otherwise
+    the next get_prefix_index() rebuilds from the database.
+    """
+    with _index_lock:
+        index = _index_state['index']
+        if index is None or _index_state['version'] != new_version - 1:
+            return
+        change(index)
+        _index_state['version'] = new_version
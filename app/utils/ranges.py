@@ -0,0 +1,175 @@
+"""
+Address ranges for IP Tracker application
+Validates range records and answers coverage, overlap and search questions about them
+"""
+
+import ipaddress
+from typing import Dict, List, Optional, Tuple, Any
+from sqlalchemy import and_, or_, text, cast, func
+from sqlalchemy.dialects.postgresql import INET
+from sqlalchemy.orm import Session
+from models.database import Site, IPAddress, IPRange
+
+# Offsets are bigint in SQL, so one range may cover at most 2^62 addresses
+MAX_RANGE_SIZE = 2 ** 62
+
+# Addresses each subnet has covered by ranges at its site (clipped to the subnet).
+# host(...)::inet gives full-length masks so comparisons are by address only.
+RANGE_COVERAGE_SQL = """
+    SELECT s.id AS subnet_id,
+           SUM(LEAST(r.end_address, host(broadcast(s.subnet_cidr))::inet)
+               - GREATEST(r.start_address, host(network(s.subnet_cidr))::inet) + 1) AS covered
+      FROM subnets s
+      JOIN ip_ranges r
+        ON r.site_id = s.site_id
+       AND r.start_address <= host(broadcast(s.subnet_cidr))::inet
+       AND r.end_address >= host(network(s.subnet_cidr))::inet
+     {where}
+     GROUP BY s.id
+"""
+
+# IP entries per subnet that overlap a range at their site; the range already
+# counts those addresses, so utilization subtracts these rows
+RANGE_COVERED_ROWS_SQL = """
+    SELECT ip.subnet_id, COUNT(*) AS covered_rows
+      FROM ip_addresses ip
+     WHERE ip.subnet_id IS NOT NULL
+       AND EXISTS (
+               SELECT 1 FROM ip_ranges r
+                WHERE r.site_id = ip.site_id
+                  AND r.start_address <= host(broadcast(ip.ip_cidr))::inet
+                  AND r.end_address >= host(network(ip.ip_cidr))::inet
+           )
+       {where}
+     GROUP BY ip.subnet_id
+"""
+
+def normalize_range(start_address: str, end_address: str) -> Tuple[str, str]:
+    """Validate a range and return its bounds as plain host addresses
+
+    Raises ValueError for malformed addresses, mixed families, reversed
+    bounds or ranges wider than MAX_RANGE_SIZE.
+    """
+    try:
+        start = ipaddress.ip_address(start_address.strip())
+        end = ipaddress.ip_address(end_address.strip())
+    except ValueError:
+        raise ValueError("Invalid range address format")
+
+    if start.version != end.version:
+        raise ValueError("Range start and end must be the same IP version")
+    if start > end:
+        raise ValueError("Range start must not be after its end")
+    if range_size(start, end) > MAX_RANGE_SIZE:
+        raise ValueError("Range is too large")
+    return str(start), str(end)
+
+def range_size(start_address, end_address) -> int:
+    """Number of addresses covered by an inclusive range"""
+    return int(ipaddress.ip_address(str(end_address))) - int(ipaddress.ip_address(str(start_address))) + 1
+
+def find_overlapping_ranges(session: Session, site_id: int, start_address: str, end_address: str) -> List[IPRange]:
+    """Ranges at a site sharing at least one address with start..end"""
+    return session.query(IPRange).filter(
+        IPRange.site_id == site_id,
+        IPRange.start_address <= end_address,
+        IPRange.end_address >= start_address
+    ).order_by(IPRange.start_address).all()
+
+def find_covering_range(session: Session, site_id: int, ip_cidr: str) -> Optional[IPRange]:
+    """The range at a site overlapping an address/CIDR, if any"""
+    network = ipaddress.ip_network(ip_cidr, strict=False)
+    ranges = find_overlapping_ranges(
+        session, site_id, str(network.network_address), str(network.broadcast_address)
+    )
+    return ranges[0] if ranges else None
+
+def find_contained_addresses(session: Session, site_id: int, start_address: str, end_address: str,
+                             limit: int = 5) -> List[IPAddress]:
+    """IP entries at a site overlapping start..end (first few, in address order)"""
+    return session.query(IPAddress).filter(
+        IPAddress.site_id == site_id,
+        cast(func.host(func.network(IPAddress.ip_cidr)), INET) <= end_address,
+        cast(func.host(func.broadcast(IPAddress.ip_cidr)), INET) >= start_address
+    ).order_by(IPAddress.ip_cidr).limit(limit).all()
+
+def load_site_ranges(session: Session, site_id: int) -> List[Tuple[int, int, int, str]]:
+    """(version, start, end, name) of every range at a site, for checks without a query per row"""
+    return [
+        (ipaddress.ip_address(str(start)).version, int(ipaddress.ip_address(str(start))),
+         int(ipaddress.ip_address(str(end))), name)
+        for start, end, name in session.query(IPRange.start_address, IPRange.end_address, IPRange.name)
+                                        .filter(IPRange.site_id == site_id)
+    ]
+
+def covering_range_name(site_ranges: List[Tuple[int, int, int, str]], ip_cidr: str) -> Optional[str]:
+    """Name of a loaded range overlapping an address/CIDR, if any"""
+    network = ipaddress.ip_network(ip_cidr, strict=False)
+    first, last = int(network.network_address), int(network.broadcast_address)
+    for version, start, end, name in site_ranges:
+        if version == network.version and start <= last and end >= first:
+            return name
+    return None
+
+def subnet_range_coverage(session: Session, site_id: Optional[int] = None) -> Dict[int, int]:
+    """Map subnet id -> addresses covered by ranges, in one grouped query"""
+    where = "WHERE s.site_id = :site_id" if site_id is not None else ""
+    rows = session.execute(text(RANGE_COVERAGE_SQL.format(where=where)), {"site_id": site_id}).all()
+    return {row.subnet_id: int(row.covered) for row in rows}
+
+def subnet_rows_in_ranges(session: Session, site_id: Optional[int] = None) -> Dict[int, int]:
+    """Map subnet id -> IP entries overlapping a range at their site, in one grouped query"""
+    where = "AND ip.site_id = :site_id" if site_id is not None else ""
+    rows = session.execute(text(RANGE_COVERED_ROWS_SQL.format(where=where)), {"site_id": site_id}).all()
+    return {row.subnet_id: int(row.covered_rows) for row in rows}
+
+def build_range_search_query(session: Session, search_query, site_filter, status_filter, role_filter, owner_filter):
+    """Ranges matching the search filters (IP queries match ranges overlapping the address/CIDR)"""
+    query = session.query(IPRange, Site.name.label('site_name')).join(Site)
+
+    filters = []
+    if site_filter:
+        filters.append(Site.name == site_filter)
+    if status_filter:
+        filters.append(IPRange.status == status_filter)
+    if role_filter:
+        filters.append(IPRange.role.ilike(f'%{role_filter}%'))
+    if owner_filter:
+        filters.append(IPRange.system_owner.ilike(f'%{owner_filter}%'))
+
+    if search_query:
+        pattern = f'%{search_query}%'
+        predicates = [
+            IPRange.name.ilike(pattern),
+            IPRange.role.ilike(pattern),
+            IPRange.system_owner.ilike(pattern),
+            IPRange.description.ilike(pattern)
+        ]
+        try:
+            network = ipaddress.ip_network(search_query.strip(), strict=False)
+            predicates.append(and_(
+                IPRange.start_address <= str(network.broadcast_address),
+                IPRange.end_address >= str(network.network_address)
+            ))
+        except ValueError:
+            pass
+        filters.append(or_(*predicates))
+
+    if filters:
+        query = query.filter(and_(*filters))
+    return query.order_by(IPRange.start_address)
+
+def range_to_dict(ip_range: IPRange, site_name: str) -> Dict[str, Any]:
+    """Display/export representation of a range row"""
+    return {
+        'ID': ip_range.id,
+        'Site': site_name,
+        'Name': ip_range.name,
+        'Start': str(ip_range.start_address),
+        'End': str(ip_range.end_address),
+        'Size': range_size(ip_range.start_address, ip_range.end_address),
+        'Role': ip_range.role or 'N/A',
+        'System Owner': ip_range.system_owner or 'N/A',
+        'Description': ip_range.description or 'N/A',
+        'Status': ip_range.status
+    }
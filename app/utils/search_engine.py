@@ -0,0 +1,178 @@
+"""
+Search engine for IP Tracker application
+Classifies search queries and plans them as index-friendly UNION branches,
+and pages through results with keyset pagination on (ip_cidr, id)
+"""
+
+import json
+import ipaddress
+from typing import Optional
+from sqlalchemy import and_, select, union, tuple_, func
+from sqlalchemy.orm import Session
+from models.database import Site, IPAddress
+
+# Text columns matched with ILIKE '%term%' (each backed by a trigram index)
+TEXT_SEARCH_COLUMNS = [
+    IPAddress.hostname,
+    IPAddress.description,
+    IPAddress.role,
+    IPAddress.system_owner,
+]
+
+PAGE_SIZE_OPTIONS = [25, 50, 100, 250, 500]
+DEFAULT_PAGE_SIZE = 50
+
+# Below this planner estimate an exact COUNT(*) is cheap enough to run
+EXACT_COUNT_THRESHOLD = 10000
+
+def normalize_ip_query(search_query: str) -> Optional[str]:
+    """Return the query as a CIDR string, or None if it is not an IP/CIDR"""
+    query = search_query.strip()
+    try:
+        if '/' not in query:
+            # Single address: full-length prefix for its family (/32 or /128)
+            address = ipaddress.ip_address(query)
+            return f"{address}/{address.max_prefixlen}"
+        return str(ipaddress.ip_network(query, strict=False))
+    except ValueError:
+        return None
+
+def classify_search_query(search_query: str) -> str:
+    """Classify a search query as 'ip', 'text' or 'empty'"""
+    if not search_query or not search_query.strip():
+        return 'empty'
+    if normalize_ip_query(search_query) is not None:
+        return 'ip'
+    return 'text'
+
+def normalize_search_filters(search_query, site_filter, status_filter, role_filter, owner_filter):
+    """Return the filters in canonical, hashable form (usable as a cache key)
+    
+    Text filters are stripped and lower-cased (they are matched with ILIKE), and
+    the 'ALL'/'All' sentinels become None.
+    """
+    def clean_text(value):
+        value = (value or '').strip()
+        return value.lower() if value else None
+
+    return (
+        clean_text(search_query),
+        site_filter if site_filter and site_filter != 'ALL' else None,
+        status_filter if status_filter and status_filter != 'All' else None,
+        clean_text(role_filter),
+        clean_text(owner_filter)
+    )
+
+def build_search_branches(search_query: str):
+    """Build one id-selecting subquery per index-friendly predicate"""
+    kind = classify_search_query(search_query)
+    if kind == 'empty':
+        return kind, []
+
+    branches = []
+
+    if kind == 'ip':
+        search_ip = normalize_ip_query(search_query)
+        # Containment both ways (equality is covered by both); served by the GiST index
+        branches.append(IPAddress.ip_cidr.op('>>=')(search_ip))
+        branches.append(IPAddress.ip_cidr.op('<<=')(search_ip))
+
+    # Hostnames, descriptions etc. may contain the literal text of any query kind,
+    # so every kind keeps one trigram-indexed branch per text column
+    pattern = f'%{search_query}%'
+    branches.extend(column.ilike(pattern) for column in TEXT_SEARCH_COLUMNS)
+
+    return kind, [select(IPAddress.id).where(predicate) for predicate in branches]
+
+def build_search_query(session: Session, search_query, site_filter, status_filter, role_filter, owner_filter):
+    """Build the (unordered) search query with the free-text part split into UNION branches"""
+    query = session.query(
+        IPAddress.id,
+        IPAddress.ip_cidr,
+        IPAddress.hostname,
+        IPAddress.gateway,
+        IPAddress.role,
+        IPAddress.system_owner,
+        IPAddress.description,
+        IPAddress.status,
+        IPAddress.created_at,
+        IPAddress.updated_at,
+        Site.name.label('site_name')
+    ).join(Site)
+
+    filters = []
+
+    # Site filter
+    if site_filter and site_filter != 'ALL':
+        filters.append(Site.name == site_filter)
+
+    # Status filter
+    if status_filter and status_filter != 'All':
+        filters.append(IPAddress.status == status_filter)
+
+    # Role filter
+    if role_filter:
+        filters.append(IPAddress.role.ilike(f'%{role_filter}%'))
+
+    # Owner filter
+    if owner_filter:
+        filters.append(IPAddress.system_owner.ilike(f'%{owner_filter}%'))
+
+    # Search query: each predicate runs as its own index scan, combined with UNION
+    if search_query:
+        _, branches = build_search_branches(search_query)
+        if branches:
+            filters.append(IPAddress.id.in_(union(*branches)))
+
+    if filters:
+        query = query.filter(and_(*filters))
+
+    return query
+
+def fetch_keyset_page(query, page_size: int = DEFAULT_PAGE_SIZE, cursor: Optional[dict] = None):
+    """Fetch one page of an IPAddress query ordered by (ip_cidr, id)
+    
+    cursor is None for the first page, or {'direction': 'after'|'before',
+    'key': (ip_cidr, id)} taken from a previous page's last_key/first_key.
+    """
+    sort_key = tuple_(IPAddress.ip_cidr, IPAddress.id)
+
+    if cursor and cursor['direction'] == 'before':
+        # Walk backwards from the first row of the current page, then restore order
+        rows = query.filter(sort_key < tuple_(*cursor['key'])) \
+            .order_by(IPAddress.ip_cidr.desc(), IPAddress.id.desc()) \
+            .limit(page_size + 1).all()
+        has_prev = len(rows) > page_size
+        rows = list(reversed(rows[:page_size]))
+        has_next = True
+    else:
+        if cursor:
+            query = query.filter(sort_key > tuple_(*cursor['key']))
+        rows = query.order_by(IPAddress.ip_cidr, IPAddress.id).limit(page_size + 1).all()
+        has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        has_prev = cursor is not None
+
+    return {
+        'rows': rows,
+        'has_next': has_next,
+        'has_prev': has_prev,
+        'first_key': (str(rows[0].ip_cidr), rows[0].id) if rows else None,
+        'last_key': (str(rows[-1].ip_cidr), rows[-1].id) if rows else None
+    }
+
+def estimate_query_count(session: Session, query) -> int:
+    """Approximate row count from the planner, exact when the result is small"""
+    statement = query.order_by(None).statement
+    compiled = statement.compile(dialect=session.bind.dialect)
+
+    plan = session.connection().exec_driver_sql(
+        f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params
+    ).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    estimate = int(plan[0]['Plan']['Plan Rows'])
+
+    if estimate < EXACT_COUNT_THRESHOLD:
+        return session.query(func.count()).select_from(statement.subquery()).scalar()
+    return estimate
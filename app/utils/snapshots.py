@@ -0,0 +1,171 @@
+"""
+Utilization snapshots for IP Tracker application
+Samples the counter-cache tables into utilization_snapshots and serves
+downsampled history for the Analytics page
+
+Run from the app directory to capture samples outside Streamlit:
+    python -m utils.snapshots            # capture one snapshot
+    python -m utils.snapshots --loop 60  # capture every 60 minutes
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from models.database import get_db_session
+
+# Minutes between background samples inside the app (0 disables the sampler)
+SNAPSHOT_INTERVAL_MINUTES = int(os.getenv('SNAPSHOT_INTERVAL_MINUTES', '60'))
+
+# Upper bound on points returned per series; longer ranges are bucketed
+MAX_HISTORY_POINTS = 500
+
+# Assignable addresses per subnet, mirroring utils.utilization.subnet_capacity
+SUBNET_CAPACITY_SQL = """
+    CASE
+        WHEN family(s.subnet_cidr) = 4 AND masklen(s.subnet_cidr) < 31
+            THEN power(2::numeric, 32 - masklen(s.subnet_cidr)) - 2
+        WHEN family(s.subnet_cidr) = 4
+            THEN power(2::numeric, 32 - masklen(s.subnet_cidr))
+        ELSE power(2::numeric, 128 - masklen(s.subnet_cidr))
+    END
+"""
+
+def capture_utilization_snapshot(session: Session, captured_at: Optional[datetime] = None) -> datetime:
+    """Append one global, per-site and per-subnet sample (caller commits)
+
+    Reads only the trigger-maintained statistics tables, never ip_addresses.
+    """
+    captured_at = captured_at or datetime.now()
+    params = {"captured_at": captured_at}
+
+    session.execute(text("""
+        INSERT INTO utilization_snapshots
+            (captured_at, scope, ip_total, ip_active, ip_inactive, ip_reserved, subnet_total)
+        SELECT :captured_at, 'global', ip_total, ip_active, ip_inactive, ip_reserved, subnet_total
+          FROM global_statistics
+         WHERE id = 1
+    """), params)
+
+    session.execute(text("""
+        INSERT INTO utilization_snapshots
+            (captured_at, scope, site_id, ip_total, ip_active, ip_inactive, ip_reserved, subnet_total)
+        SELECT :captured_at, 'site', site_id, ip_total, ip_active, ip_inactive, ip_reserved, subnet_total
+          FROM site_statistics
+    """), params)
+
+    session.execute(text(f"""
+        INSERT INTO utilization_snapshots
+            (captured_at, scope, site_id, subnet_id, used, capacity)
+        SELECT :captured_at, 'subnet', s.site_id, s.id, COALESCE(ss.used_count, 0), {SUBNET_CAPACITY_SQL}
+          FROM subnets s
+          LEFT JOIN subnet_statistics ss ON ss.subnet_id = s.id
+    """), params)
+
+    return captured_at
+
+def take_snapshot() -> datetime:
+    """Capture and commit one snapshot in its own session"""
+    session = get_db_session()
+    try:
+        captured_at = capture_utilization_snapshot(session)
+        session.commit()
+        return captured_at
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+def choose_bucket(start: datetime, end: datetime, max_points: int = MAX_HISTORY_POINTS) -> timedelta:
+    """Smallest whole-minute bucket that keeps a range within max_points"""
+    minutes = max(1, int((end - start).total_seconds() // 60 // max_points) + 1)
+    return timedelta(minutes=minutes)
+
+def load_utilization_history(session: Session, scope: str, start: datetime, end: Optional[datetime] = None,
+                             site_id: Optional[int] = None, subnet_id: Optional[int] = None,
+                             max_points: int = MAX_HISTORY_POINTS) -> pd.DataFrame:
+    """Load a downsampled time series for one scope/entity
+
+    Samples are averaged into date_bin buckets sized so the series never
+    exceeds max_points rows, whatever the time range.
+    """
+    end = end or datetime.now()
+    bucket = choose_bucket(start, end, max_points)
+
+    filters = ["scope = :scope", "captured_at BETWEEN :start AND :end"]
+    if site_id is not None:
+        filters.append("site_id = :site_id")
+    if subnet_id is not None:
+        filters.append("subnet_id = :subnet_id")
+
+    rows = session.execute(text(f"""
+        SELECT date_bin(:bucket, captured_at, :origin) AS bucket,
+               AVG(ip_total) AS ip_total,
+               AVG(ip_active) AS ip_active,
+               AVG(ip_inactive) AS ip_inactive,
+               AVG(ip_reserved) AS ip_reserved,
+               AVG(subnet_total) AS subnet_total,
+               AVG(used)::float AS used,
+               AVG(capacity)::float AS capacity
+          FROM utilization_snapshots
+         WHERE {' AND '.join(filters)}
+         GROUP BY 1
+         ORDER BY 1
+    """), {
+        "bucket": bucket, "origin": datetime(2000, 1, 1), "scope": scope,
+        "start": start, "end": end, "site_id": site_id, "subnet_id": subnet_id
+    }).mappings().all()
+
+    df = pd.DataFrame(rows)
+    if not df.empty and scope == 'subnet':
+        df['utilization'] = (df['used'] / df['capacity'] * 100).round(1)
+    return df
+
+_sampler_lock = threading.Lock()
+_sampler_thread = None
+
+def start_snapshot_sampler(interval_minutes: int = SNAPSHOT_INTERVAL_MINUTES):
+    """Start the background sampler once per process (no-op when disabled)"""
+    global _sampler_thread
+    if interval_minutes <= 0:
+        return None
+
+    with _sampler_lock:
+        if _sampler_thread is None or not _sampler_thread.is_alive():
+            _sampler_thread = threading.Thread(
+                target=run_sampler, args=(interval_minutes,), name="snapshot-sampler", daemon=True
+            )
+            _sampler_thread.start()
+    return _sampler_thread
+
+def run_sampler(interval_minutes: int):
+    """Capture a snapshot every interval_minutes until the process exits"""
+    while True:
+        try:
+            take_snapshot()
+        except Exception as e:
+            print(f"Utilization snapshot failed: {str(e)}")
+        time.sleep(interval_minutes * 60)
+
+def main(argv=None):
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description="Capture IP Tracker utilization snapshots")
+    parser.add_argument('--loop', type=int, metavar='MINUTES',
+                        help="keep capturing every MINUTES instead of once")
+    args = parser.parse_args(argv)
+
+    if args.loop:
+        run_sampler(args.loop)
+    else:
+        print(f"Captured utilization snapshot at {take_snapshot():%Y-%m-%d %H:%M:%S}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
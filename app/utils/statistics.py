@@ -0,0 +1,47 @@
+"""
+Inventory statistics for IP Tracker application
+Reads the trigger-maintained counter-cache tables instead of counting rows
+"""
+
+from typing import Dict, List, Any
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from models.database import Site, GlobalStatistics, SiteStatistics
+
+STATISTIC_FIELDS = ['site_total', 'subnet_total', 'ip_total', 'ip_active', 'ip_inactive', 'ip_reserved']
+
+def get_global_statistics(session: Session) -> Dict[str, int]:
+    """Return inventory totals from the single global statistics row"""
+    stats = session.query(GlobalStatistics).filter_by(id=1).first()
+    if stats is None:
+        return {field: 0 for field in STATISTIC_FIELDS}
+    return {field: getattr(stats, field) for field in STATISTIC_FIELDS}
+
+def get_site_statistics(session: Session) -> List[Dict[str, Any]]:
+    """Return per-site counters joined with site names, ordered by name"""
+    results = session.query(
+        Site.id,
+        Site.name,
+        SiteStatistics.subnet_total,
+        SiteStatistics.ip_total,
+        SiteStatistics.ip_active,
+        SiteStatistics.ip_inactive,
+        SiteStatistics.ip_reserved
+    ).outerjoin(SiteStatistics, SiteStatistics.site_id == Site.id).order_by(Site.name).all()
+
+    return [
+        {
+            'site_id': result.id,
+            'site': result.name,
+            'subnet_total': result.subnet_total or 0,
+            'ip_total': result.ip_total or 0,
+            'ip_active': result.ip_active or 0,
+            'ip_inactive': result.ip_inactive or 0,
+            'ip_reserved': result.ip_reserved or 0
+        }
+        for result in results
+    ]
+
+def rebuild_statistics(session: Session):
+    """Recompute every counter-cache table from scratch (caller commits)"""
+    session.execute(text("SELECT rebuild_inventory_statistics()"))
@@ -0,0 +1,96 @@
+"""
+Subnet utilization engine for IP Tracker application
+Computes used/capacity/percent for every subnet from per-subnet address counts
+"""
+
+import ipaddress
+from typing import List, Dict, Any
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from models.database import Site, IPAddress, Subnet, SubnetStatistics
+from utils.ranges import subnet_range_coverage, subnet_rows_in_ranges
+
+def subnet_capacity(subnet_cidr) -> int:
+    """Number of assignable addresses in a subnet
+
+    IPv4 excludes the network and broadcast addresses, except for /31
+    point-to-point links (RFC 3021, both usable) and /32 host routes. IPv6 has
+    no broadcast address, so every address is assignable.
+    """
+    network = ipaddress.ip_network(str(subnet_cidr), strict=False)
+    if network.version == 4 and network.prefixlen < 31:
+        return network.num_addresses - 2
+    return network.num_addresses
+
+def utilization_percent(used: int, capacity: int) -> float:
+    """Utilization as a percentage rounded to one decimal place"""
+    return round(used / capacity * 100, 1) if capacity > 0 else 0.0
+
+def combine_range_usage(row_count: int, rows_in_ranges: int, range_addresses: int, capacity: int) -> int:
+    """Used addresses when ranges cover some entries: each address counts once
+
+    Entries inside a range are counted by the range, not again by themselves;
+    the cap covers ranges that reach into nested subnets.
+    """
+    return min(row_count - rows_in_ranges + range_addresses, capacity)
+
+def compute_subnet_utilization(session: Session, site_id=None, use_counters=False) -> List[Dict[str, Any]]:
+    """Compute utilization for all subnets (optionally one site) in one query
+
+    An IP address counts towards the subnet it is assigned to (subnet_id, the
+    most specific subnet at its site containing it), counted with one indexed
+    GROUP BY. With use_counters the used counts come from the
+    trigger-maintained subnet_statistics table instead. Addresses covered by ranges at the
+    subnet's site are added from one grouped query, and entries inside those
+    ranges are subtracted from another so no address is counted twice.
+    """
+    columns = [
+        Subnet.id,
+        Subnet.site_id,
+        Subnet.subnet_cidr,
+        Subnet.name,
+        Subnet.description,
+        Subnet.vlan_id,
+        Site.name.label('site_name')
+    ]
+
+    if use_counters:
+        query = session.query(
+            *columns, func.coalesce(SubnetStatistics.used_count, 0).label('used')
+        ).outerjoin(Site, Site.id == Subnet.site_id) \
+         .outerjoin(SubnetStatistics, SubnetStatistics.subnet_id == Subnet.id)
+    else:
+        counts = session.query(
+            IPAddress.subnet_id, func.count(IPAddress.id).label('used')
+        ).filter(IPAddress.subnet_id.isnot(None)).group_by(IPAddress.subnet_id).subquery()
+        query = session.query(
+            *columns, func.coalesce(counts.c.used, 0).label('used')
+        ).outerjoin(Site, Site.id == Subnet.site_id) \
+         .outerjoin(counts, counts.c.subnet_id == Subnet.id)
+
+    if site_id is not None:
+        query = query.filter(Subnet.site_id == site_id)
+
+    results = query.order_by(Subnet.subnet_cidr).all()
+    range_coverage = subnet_range_coverage(session, site_id)
+    rows_in_ranges = subnet_rows_in_ranges(session, site_id) if range_coverage else {}
+
+    utilization = []
+    for result in results:
+        capacity = subnet_capacity(result.subnet_cidr)
+        used = combine_range_usage(result.used, rows_in_ranges.get(result.id, 0),
+                                   range_coverage.get(result.id, 0), capacity)
+        utilization.append({
+            'id': result.id,
+            'site_id': result.site_id,
+            'site': result.site_name,
+            'subnet': str(result.subnet_cidr),
+            'name': result.name,
+            'description': result.description,
+            'vlan_id': result.vlan_id,
+            'used': used,
+            'capacity': capacity,
+            'utilization': utilization_percent(used, capacity)
+        })
+
+    return utilization
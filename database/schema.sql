@@ -1,6 +1,12 @@
 -- IP Tracker Database Schema
 -- Following RFC-1918 standards with CIDR notation
 
+-- Trigram matching for substring (ILIKE '%term%') searches
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- B-tree operators in GiST, for the per-site subnet exclusion constraint
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
 -- Sites table to store different network sites/locations
 CREATE TABLE sites (
     id SERIAL PRIMARY KEY,
@@ -37,15 +43,61 @@ CREATE TABLE subnets (
     vlan_id INTEGER,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    UNIQUE(subnet_cidr, site_id)
+    UNIQUE(subnet_cidr, site_id),
+    -- No overlapping subnets within a site (see SUBNET_OVERLAP_SCOPE)
+    CONSTRAINT exclude_overlapping_subnets EXCLUDE USING gist (site_id WITH =, subnet_cidr inet_ops WITH &&)
+);
+
+-- Most specific subnet at the same site containing each address (set by triggers below)
+ALTER TABLE ip_addresses ADD COLUMN subnet_id INTEGER REFERENCES subnets(id) ON DELETE SET NULL;
+
+-- Address ranges (DHCP pools, reservations) covering start..end in one row
+CREATE TABLE ip_ranges (
+    id SERIAL PRIMARY KEY,
+    site_id INTEGER REFERENCES sites(id) ON DELETE CASCADE,
+    start_address INET NOT NULL,
+    end_address INET NOT NULL,
+    name VARCHAR(100) NOT NULL,
+    role VARCHAR(100),
+    system_owner VARCHAR(100),
+    description TEXT,
+    status VARCHAR(20) DEFAULT 'reserved' CHECK (status IN ('active', 'inactive', 'reserved')),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT check_range_bounds CHECK (family(start_address) = family(end_address) AND start_address <= end_address)
+);
+
+-- Archive of IP addresses removed by the inactive-IP purge job
+CREATE TABLE ip_address_archive (
+    id INTEGER PRIMARY KEY,
+    site_id INTEGER,
+    ip_cidr CIDR NOT NULL,
+    hostname VARCHAR(255),
+    gateway INET,
+    role VARCHAR(100),
+    system_owner VARCHAR(100),
+    description TEXT,
+    status VARCHAR(20),
+    created_at TIMESTAMP,
+    updated_at TIMESTAMP,
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
 -- Indexes for performance
 CREATE INDEX idx_ip_addresses_site_id ON ip_addresses(site_id);
-CREATE INDEX idx_ip_addresses_ip_cidr ON ip_addresses USING GIST(ip_cidr);
+CREATE INDEX idx_ip_addresses_ip_cidr ON ip_addresses USING GIST (ip_cidr inet_ops);
+CREATE INDEX idx_ip_addresses_ip_cidr_id ON ip_addresses (ip_cidr, id);
+CREATE INDEX idx_ip_addresses_inactive_id ON ip_addresses (id) WHERE status = 'inactive';
+CREATE INDEX idx_ip_addresses_updated_at ON ip_addresses (updated_at);
+CREATE INDEX idx_ip_addresses_subnet_id ON ip_addresses (subnet_id);
 CREATE INDEX idx_ip_addresses_hostname ON ip_addresses(hostname);
+CREATE INDEX idx_ip_addresses_hostname_trgm ON ip_addresses USING GIN (hostname gin_trgm_ops);
+CREATE INDEX idx_ip_addresses_description_trgm ON ip_addresses USING GIN (description gin_trgm_ops);
+CREATE INDEX idx_ip_addresses_role_trgm ON ip_addresses USING GIN (role gin_trgm_ops);
+CREATE INDEX idx_ip_addresses_system_owner_trgm ON ip_addresses USING GIN (system_owner gin_trgm_ops);
 CREATE INDEX idx_subnets_site_id ON subnets(site_id);
-CREATE INDEX idx_subnets_subnet_cidr ON subnets USING GIST(subnet_cidr);
+CREATE INDEX idx_subnets_subnet_cidr ON subnets USING GIST (subnet_cidr inet_ops);
+CREATE INDEX idx_ip_ranges_site_start ON ip_ranges (site_id, start_address);
 
 -- Function to automatically update updated_at timestamp
 CREATE OR REPLACE FUNCTION update_updated_at_column()
@@ -66,6 +118,265 @@ CREATE TRIGGER update_ip_addresses_updated_at BEFORE UPDATE ON ip_addresses
 CREATE TRIGGER update_subnets_updated_at BEFORE UPDATE ON subnets
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
+CREATE TRIGGER update_ip_ranges_updated_at BEFORE UPDATE ON ip_ranges
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+-- Counter-cache statistics (kept current by the row-level triggers below)
+CREATE TABLE global_statistics (
+    id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    site_total INTEGER NOT NULL DEFAULT 0,
+    subnet_total INTEGER NOT NULL DEFAULT 0,
+    ip_total INTEGER NOT NULL DEFAULT 0,
+    ip_active INTEGER NOT NULL DEFAULT 0,
+    ip_inactive INTEGER NOT NULL DEFAULT 0,
+    ip_reserved INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE site_statistics (
+    site_id INTEGER PRIMARY KEY,
+    subnet_total INTEGER NOT NULL DEFAULT 0,
+    ip_total INTEGER NOT NULL DEFAULT 0,
+    ip_active INTEGER NOT NULL DEFAULT 0,
+    ip_inactive INTEGER NOT NULL DEFAULT 0,
+    ip_reserved INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE subnet_statistics (
+    subnet_id INTEGER PRIMARY KEY REFERENCES subnets(id) ON DELETE CASCADE,
+    used_count INTEGER NOT NULL DEFAULT 0
+);
+
+INSERT INTO global_statistics (id) VALUES (1);
+
+CREATE OR REPLACE FUNCTION longest_prefix_subnet(p_site_id INTEGER, p_ip_cidr CIDR)
+RETURNS INTEGER AS $$
+    SELECT id FROM subnets
+     WHERE site_id = p_site_id AND p_ip_cidr <<= subnet_cidr
+     ORDER BY masklen(subnet_cidr) DESC, id
+     LIMIT 1
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION assign_ip_subnet()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.subnet_id := longest_prefix_subnet(NEW.site_id, NEW.ip_cidr);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION reassign_subnet_addresses()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- OLD is NULL on INSERT and NEW on DELETE, so each branch only matches
+    -- where it applies: addresses that were assigned to (or left
+    -- unassigned inside) the old subnet, and addresses inside the new one.
+    UPDATE ip_addresses ip
+       SET subnet_id = m.subnet_id
+      FROM (SELECT id, longest_prefix_subnet(site_id, ip_cidr) AS subnet_id
+              FROM ip_addresses
+             WHERE subnet_id = OLD.id
+                OR (subnet_id IS NULL AND site_id = OLD.site_id AND ip_cidr <<= OLD.subnet_cidr)
+                OR (site_id = NEW.site_id AND ip_cidr <<= NEW.subnet_cidr)) m
+     WHERE ip.id = m.id
+       AND ip.subnet_id IS DISTINCT FROM m.subnet_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION apply_ip_statistics_delta(p_site_id INTEGER, p_status VARCHAR, p_delta INTEGER)
+RETURNS VOID AS $$
+DECLARE
+    d_active INTEGER := CASE WHEN p_status = 'active' THEN p_delta ELSE 0 END;
+    d_inactive INTEGER := CASE WHEN p_status = 'inactive' THEN p_delta ELSE 0 END;
+    d_reserved INTEGER := CASE WHEN p_status = 'reserved' THEN p_delta ELSE 0 END;
+BEGIN
+    UPDATE global_statistics
+       SET ip_total = ip_total + p_delta,
+           ip_active = ip_active + d_active,
+           ip_inactive = ip_inactive + d_inactive,
+           ip_reserved = ip_reserved + d_reserved
+     WHERE id = 1;
+
+    IF p_site_id IS NOT NULL THEN
+        INSERT INTO site_statistics (site_id, ip_total, ip_active, ip_inactive, ip_reserved)
+        VALUES (p_site_id, p_delta, d_active, d_inactive, d_reserved)
+        ON CONFLICT (site_id) DO UPDATE
+           SET ip_total = site_statistics.ip_total + EXCLUDED.ip_total,
+               ip_active = site_statistics.ip_active + EXCLUDED.ip_active,
+               ip_inactive = site_statistics.ip_inactive + EXCLUDED.ip_inactive,
+               ip_reserved = site_statistics.ip_reserved + EXCLUDED.ip_reserved;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION maintain_ip_statistics()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'DELETE'
+       OR (TG_OP = 'UPDATE' AND (NEW.site_id IS DISTINCT FROM OLD.site_id
+                                 OR NEW.status IS DISTINCT FROM OLD.status)) THEN
+        PERFORM apply_ip_statistics_delta(OLD.site_id, OLD.status, -1);
+    END IF;
+    IF TG_OP = 'INSERT'
+       OR (TG_OP = 'UPDATE' AND (NEW.site_id IS DISTINCT FROM OLD.site_id
+                                 OR NEW.status IS DISTINCT FROM OLD.status)) THEN
+        PERFORM apply_ip_statistics_delta(NEW.site_id, NEW.status, 1);
+    END IF;
+
+    -- A subnet's statistics row may already be gone when it is being deleted
+    IF TG_OP <> 'UPDATE' OR NEW.subnet_id IS DISTINCT FROM OLD.subnet_id THEN
+        UPDATE subnet_statistics SET used_count = used_count - 1 WHERE subnet_id = OLD.subnet_id;
+        UPDATE subnet_statistics SET used_count = used_count + 1 WHERE subnet_id = NEW.subnet_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION maintain_subnet_statistics()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE global_statistics SET subnet_total = subnet_total - 1 WHERE id = 1;
+        UPDATE site_statistics SET subnet_total = subnet_total - 1 WHERE site_id = OLD.site_id;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE global_statistics SET subnet_total = subnet_total + 1 WHERE id = 1;
+        IF NEW.site_id IS NOT NULL THEN
+            INSERT INTO site_statistics (site_id, subnet_total) VALUES (NEW.site_id, 1)
+            ON CONFLICT (site_id) DO UPDATE SET subnet_total = site_statistics.subnet_total + 1;
+        END IF;
+
+        -- Counts addresses assigned so far; reassignment then applies per-row deltas
+        INSERT INTO subnet_statistics (subnet_id, used_count)
+        SELECT NEW.id, COUNT(*) FROM ip_addresses WHERE subnet_id = NEW.id
+        ON CONFLICT (subnet_id) DO UPDATE SET used_count = EXCLUDED.used_count;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION maintain_site_statistics()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE global_statistics SET site_total = site_total + 1 WHERE id = 1;
+        INSERT INTO site_statistics (site_id) VALUES (NEW.id) ON CONFLICT (site_id) DO NOTHING;
+    ELSE
+        UPDATE global_statistics SET site_total = site_total - 1 WHERE id = 1;
+        DELETE FROM site_statistics WHERE site_id = OLD.id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION rebuild_inventory_statistics()
+RETURNS VOID AS $$
+BEGIN
+    -- Block writers so the recount is consistent with the trigger-maintained deltas
+    LOCK TABLE sites, subnets, ip_addresses IN SHARE MODE;
+
+    INSERT INTO global_statistics (id) VALUES (1) ON CONFLICT (id) DO NOTHING;
+    UPDATE global_statistics g
+       SET site_total = (SELECT COUNT(*) FROM sites),
+           subnet_total = (SELECT COUNT(*) FROM subnets),
+           ip_total = ip.total,
+           ip_active = ip.active,
+           ip_inactive = ip.inactive,
+           ip_reserved = ip.reserved
+      FROM (SELECT COUNT(*) AS total,
+                   COUNT(*) FILTER (WHERE status = 'active') AS active,
+                   COUNT(*) FILTER (WHERE status = 'inactive') AS inactive,
+                   COUNT(*) FILTER (WHERE status = 'reserved') AS reserved
+              FROM ip_addresses) ip
+     WHERE g.id = 1;
+
+    DELETE FROM site_statistics;
+    INSERT INTO site_statistics (site_id, subnet_total, ip_total, ip_active, ip_inactive, ip_reserved)
+    SELECT s.id,
+           COALESCE(sn.total, 0),
+           COALESCE(ip.total, 0),
+           COALESCE(ip.active, 0),
+           COALESCE(ip.inactive, 0),
+           COALESCE(ip.reserved, 0)
+      FROM sites s
+      LEFT JOIN (SELECT site_id, COUNT(*) AS total FROM subnets GROUP BY site_id) sn
+        ON sn.site_id = s.id
+      LEFT JOIN (SELECT site_id,
+                        COUNT(*) AS total,
+                        COUNT(*) FILTER (WHERE status = 'active') AS active,
+                        COUNT(*) FILTER (WHERE status = 'inactive') AS inactive,
+                        COUNT(*) FILTER (WHERE status = 'reserved') AS reserved
+                   FROM ip_addresses GROUP BY site_id) ip
+        ON ip.site_id = s.id;
+
+    DELETE FROM subnet_statistics;
+    INSERT INTO subnet_statistics (subnet_id, used_count)
+    SELECT s.id, COALESCE(ip.used, 0)
+      FROM subnets s
+      LEFT JOIN (SELECT subnet_id, COUNT(*) AS used
+                   FROM ip_addresses GROUP BY subnet_id) ip
+        ON ip.subnet_id = s.id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Triggers keeping the statistics tables current
+CREATE TRIGGER maintain_ip_statistics AFTER INSERT OR UPDATE OR DELETE ON ip_addresses
+    FOR EACH ROW EXECUTE FUNCTION maintain_ip_statistics();
+
+CREATE TRIGGER maintain_subnet_statistics AFTER INSERT OR DELETE OR UPDATE OF site_id, subnet_cidr ON subnets
+    FOR EACH ROW EXECUTE FUNCTION maintain_subnet_statistics();
+
+CREATE TRIGGER maintain_site_statistics AFTER INSERT OR DELETE ON sites
+    FOR EACH ROW EXECUTE FUNCTION maintain_site_statistics();
+
+-- Triggers keeping ip_addresses.subnet_id on the longest-prefix subnet
+CREATE TRIGGER assign_ip_subnet BEFORE INSERT OR UPDATE OF site_id, ip_cidr ON ip_addresses
+    FOR EACH ROW EXECUTE FUNCTION assign_ip_subnet();
+
+CREATE TRIGGER reassign_subnet_addresses AFTER INSERT OR DELETE OR UPDATE OF site_id, subnet_cidr ON subnets
+    FOR EACH ROW EXECUTE FUNCTION reassign_subnet_addresses();
+
+-- Ids of deleted IP entries for incremental readers (pruned after a week)
+CREATE TABLE ip_address_deletions (
+    ip_id INTEGER NOT NULL,
+    deleted_at TIMESTAMP NOT NULL DEFAULT clock_timestamp()
+);
+
+CREATE INDEX idx_ip_address_deletions_deleted_at ON ip_address_deletions (deleted_at);
+
+CREATE OR REPLACE FUNCTION record_ip_deletions()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO ip_address_deletions (ip_id) SELECT id FROM deleted_rows;
+    DELETE FROM ip_address_deletions WHERE deleted_at < clock_timestamp() - INTERVAL '7 days';
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER record_ip_deletions AFTER DELETE ON ip_addresses
+    REFERENCING OLD TABLE AS deleted_rows FOR EACH STATEMENT EXECUTE FUNCTION record_ip_deletions();
+
+-- Periodic utilization samples powering the Analytics page
+CREATE TABLE utilization_snapshots (
+    id BIGSERIAL PRIMARY KEY,
+    captured_at TIMESTAMP NOT NULL,
+    scope VARCHAR(10) NOT NULL CHECK (scope IN ('global', 'site', 'subnet')),
+    site_id INTEGER,
+    subnet_id INTEGER,
+    ip_total INTEGER,
+    ip_active INTEGER,
+    ip_inactive INTEGER,
+    ip_reserved INTEGER,
+    subnet_total INTEGER,
+    used INTEGER,
+    capacity NUMERIC(40, 0)
+);
+
+CREATE INDEX idx_utilization_snapshots_scope_time ON utilization_snapshots (scope, captured_at);
+CREATE INDEX idx_utilization_snapshots_site_time ON utilization_snapshots (site_id, captured_at);
+CREATE INDEX idx_utilization_snapshots_subnet_time ON utilization_snapshots (subnet_id, captured_at);
+
 -- Insert default site for initial setup
 INSERT INTO sites (name, description, location) VALUES 
 ('Default', 'Default site for unassigned IP addresses', 'Unknown');
@@ -130,7 +130,7 @@ def test_database_models():
         
         # Test model attributes
         site_attrs = ['id', 'name', 'description', 'location']
-        ip_attrs = ['id', 'site_id', 'ip_cidr', 'hostname', 'gateway', 'role']
+        ip_attrs = ['id', 'site_id', 'ip_cidr', 'hostname', 'gateway', 'role', 'subnet_id']
         subnet_attrs = ['id', 'site_id', 'subnet_cidr', 'name', 'description']
         
         for attr in site_attrs:
@@ -161,6 +161,837 @@ def test_database_models():
         traceback.print_exc()
         return False
 
+def test_search_classification():
+    """Test search query classification and IP normalization"""
+    print("\n🧪 Testing search query classification...")
+    
+    try:
+        from utils.search_engine import classify_search_query, normalize_ip_query
+        
+        test_cases = [
+            ("192.168.1.10", "ip"),
+            ("10.0.0.0/8", "ip"),
+            ("2001:db8::1", "ip"),
+            ("server-01.example.com", "text"),
+            ("main web server", "text"),
+            ("", "empty")
+        ]
+        
+        for query, expected in test_cases:
+            kind = classify_search_query(query)
+            if kind == expected:
+                print(f"✅ '{query}': {kind} (Expected)")
+            else:
+                print(f"❌ '{query}': {kind} (Expected {expected})")
+                return False
+        
+        # Single addresses get a full-length prefix for their family
+        if normalize_ip_query("2001:db8::1") != "2001:db8::1/128":
+            print("❌ IPv6 address not normalized to /128")
+            return False
+        if normalize_ip_query("192.168.1.10") != "192.168.1.10/32":
+            print("❌ IPv4 address not normalized to /32")
+            return False
+        print("✅ Single addresses normalized to host prefixes")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Search classification test failed: {str(e)}")
+        traceback.print_exc()
+        return False
+
+def test_keyset_pagination():
+    """Test keyset page cursors in both directions against a mocked query"""
+    print("\n🧪 Testing keyset pagination...")
+    
+    try:
+        import ipaddress
+        import operator
+        from types import SimpleNamespace
+        from sqlalchemy.sql import operators
+        from utils.search_engine import fetch_keyset_page
+        
+        def sort_key(row):
+            return (ipaddress.ip_network(row.ip_cidr), row.id)
+        
+        class FakeQuery:
+            """Applies the (ip_cidr, id) comparisons, order and limit to in-memory rows"""
+            
+            def __init__(self, rows):
+                self.rows = rows
+            
+            def filter(self, expression):
+                ip_cidr, row_id = [clause.value for clause in expression.right.clauses]
+                key = (ipaddress.ip_network(ip_cidr), row_id)
+                compare = {operators.lt: operator.lt, operators.gt: operator.gt}[expression.operator]
+                return FakeQuery([row for row in self.rows if compare(sort_key(row), key)])
+            
+            def order_by(self, *columns):
+                descending = getattr(columns[0], 'modifier', None) is operators.desc_op
+                return FakeQuery(sorted(self.rows, key=sort_key, reverse=descending))
+            
+            def limit(self, count):
+                return FakeQuery(self.rows[:count])
+            
+            def all(self):
+                return list(self.rows)
+        
+        # Ids out of address order, and a shared address told apart by id
+        addresses = ["10.0.0.9/32", "10.0.0.1/32", "10.0.0.10/32", "10.0.0.2/32", "10.0.0.2/32"]
+        rows = [SimpleNamespace(id=row_id, ip_cidr=address) for row_id, address in enumerate(addresses, 1)]
+        query = FakeQuery(rows)
+        expected = [("10.0.0.1/32", 2), ("10.0.0.2/32", 4), ("10.0.0.2/32", 5),
+                    ("10.0.0.9/32", 1), ("10.0.0.10/32", 3)]
+        
+        def keys(page):
+            return [(row.ip_cidr, row.id) for row in page['rows']]
+        
+        first = fetch_keyset_page(query, page_size=2)
+        second = fetch_keyset_page(query, page_size=2, cursor={'direction': 'after', 'key': first['last_key']})
+        last = fetch_keyset_page(query, page_size=2, cursor={'direction': 'after', 'key': second['last_key']})
+        if (keys(first), keys(second), keys(last)) == (expected[:2], expected[2:4], expected[4:]) \
+                and (first['has_prev'], first['has_next']) == (False, True) \
+                and (second['has_prev'], second['has_next']) == (True, True) \
+                and (last['has_prev'], last['has_next']) == (True, False):
+            print("✅ Forward pages follow (ip_cidr, id) order with correct flags")
+        else:
+            print(f"❌ Unexpected forward pages: {keys(first)}, {keys(second)}, {keys(last)}")
+            return False
+        
+        back = fetch_keyset_page(query, page_size=2, cursor={'direction': 'before', 'key': last['first_key']})
+        start = fetch_keyset_page(query, page_size=2, cursor={'direction': 'before', 'key': back['first_key']})
+        if keys(back) == expected[2:4] and (back['has_prev'], back['has_next']) == (True, True) \
+                and keys(start) == expected[:2] and (start['has_prev'], start['has_next']) == (False, True):
+            print("✅ Backward pages are restored to ascending order and stop at the first page")
+        else:
+            print(f"❌ Unexpected backward pages: {keys(back)}, {keys(start)}")
+            return False
+        
+        exact = fetch_keyset_page(query, page_size=5)
+        empty = fetch_keyset_page(query, page_size=5, cursor={'direction': 'after', 'key': exact['last_key']})
+        if not exact['has_next'] and empty['rows'] == [] and empty['first_key'] is None and not empty['has_next']:
+            print("✅ A full final page reports no next page")
+        else:
+            print(f"❌ Unexpected page boundary: {exact}, {empty}")
+            return False
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Keyset pagination test failed: {str(e)}")
+        traceback.print_exc()
+        return False
+
+def test_result_cache():
+    """Test LRU/TTL cache eviction and data-version invalidation"""
+    print("\n🧪 Testing result cache...")
+    
+    try:
+        from utils.cache import TTLCache, get_data_version, bump_data_version
+        
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)  # Evicts 'b', the least recently used
+        
+        if cache.get('b')[0] or not cache.get('a')[0] or not cache.get('c')[0]:
+            print("❌ LRU eviction did not drop the least recently used entry")
+            return False
+        print("✅ LRU eviction works")
+        
+        expiring = TTLCache(maxsize=2, ttl=0)
+        expiring.set('a', 1)
+        if expiring.get('a')[0]:
+            print("❌ Expired entry was returned")
+            return False
+        print("✅ TTL expiry works")
+        
+        version = get_data_version()
+        if bump_data_version() != version + 1:
+            print("❌ Data version was not bumped")
+            return False
+        print("✅ Data version bump works")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Result cache test failed: {str(e)}")
+        traceback.print_exc()
+        return False
+
+def test_snapshot_cache():
+    """Test stale-while-revalidate snapshot refresh"""
+    print("\n🧪 Testing snapshot cache...")
+    
+    try:
+        import time
+        from utils.cache import SnapshotCache, bump_data_version
+        
+        calls = []
+        def compute():
+            calls.append(1)
+            return len(calls)
+        
+        snapshot = SnapshotCache(compute, max_age=60)
+        if snapshot.get() != 1 or snapshot.get() != 1:
+            print("❌ Snapshot was recomputed without a data change")
+            return False
+        print("✅ Snapshot computed once and reused")
+        
+        bump_data_version()
+        if snapshot.get() != 1:
+            print("❌ Stale snapshot was not served during refresh")
+            return False
+        
+        for _ in range(50):
+            if snapshot.get() == 2:
+                break
+            time.sleep(0.01)
+        else:
+            print("❌ Background refresh did not complete")
+            return False
+        print("✅ Stale snapshot served while refreshing in background")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Snapshot cache test failed: {str(e)}")
+        traceback.print_exc()
+        return False
+
+def test_subnet_capacity():
+    """Test subnet capacity math for edge-case prefix lengths"""
+    print("\n🧪 Testing subnet capacity...")
+    
+    try:
+        from utils.utilization import subnet_capacity, utilization_percent
+        
+        test_cases = [
+            ("192.168.1.0/24", 254),
+            ("10.0.0.0/30", 2),
+            ("10.0.0.0/31", 2),
+            ("10.0.0.1/32", 1),
+            ("2001:db8::/120", 256),
+            ("2001:db8::1/128", 1)
+        ]
+        
+        for cidr, expected in test_cases:
+            capacity = subnet_capacity(cidr)
+            if capacity == expected:
+                print(f"✅ {cidr}: {capacity} (Expected)")
+            else:
+                print(f"❌ {cidr}: {capacity} (Expected {expected})")
+                return False
+        
+        if utilization_percent(127, 254) != 50.0 or utilization_percent(0, 0) != 0.0:
+            print("❌ Utilization percentage is wrong")
+            return False
+        print("✅ Utilization percentage works")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Subnet capacity test failed: {str(e)}")
+        traceback.print_exc()
+        return False
+
+def test_free_space_analysis():
+    """Test vectorized free range and fragmentation analysis"""
+    print("\n🧪 Testing free space analysis...")
+    
+    try:
+        from utils.free_space import analyze_free_space
+        
+        # 10.0.0.0/24 uses .1-.10 (with an overlapping .5) and .20; /30 is empty
+        analysis = analyze_free_space(
+            ["10.0.0.0/24", "10.0.1.0/30"],
+            [0, 0, 0],
+            [1, 5, 20],
+            [10, 5, 20]
+        )
+        
+        checks = [
+            ("used", [11, 0]),
+            ("free", [243, 2]),
+            ("free_blocks", [2, 1]),
+            ("largest_free", [234, 2]),
+            ("free_range_start", [11, 21, 1]),
+            ("free_range_size", [9, 234, 2])
+        ]
+        
+        for field, expected in checks:
+            actual = [int(value) for value in analysis[field]]
+            if actual == expected:
+                print(f"✅ {field}: {actual} (Expected)")
+            else:
+                print(f"❌ {field}: {actual} (Expected {expected})")
+                return False
+        
+        if abs(analysis['fragmentation'][0] - round(1 - 234 / 243, 4)) > 1e-9:
+            print(f"❌ Fragmentation is wrong: {analysis['fragmentation'][0]}")
+            return False
+        print("✅ Fragmentation score works")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Free space analysis test failed: {str(e)}")
+        traceback.print_exc()
+        return False
+
+def test_heatmap_grid():
+    """Test heatmap block layout and labels"""
+    print("\n🧪 Testing address heatmap grid...")
+    
+    try:
+        import numpy as np
+        from utils.heatmap import build_heatmap_grid, populated_blocks
+        
+        counts = np.zeros(65536, dtype=np.int64)
+        counts[10 * 256 + 1] = 5
+        counts[192 * 256 + 168] = 300
+        
+        grid = build_heatmap_grid("0.0.0.0/0", 16, counts, compact_rows=True)
+        if grid['z'].shape != (2, 256) or list(grid['rows']) != [10, 192]:
+            print(f"❌ Compact /16 grid is wrong: {grid['z'].shape}, rows {list(grid['rows'])}")
+            return False
+        if grid['labels'][1][168] != "192.168.0.0/16" or grid['z'][1][168] != 300:
+            print(f"❌ Grid label is wrong: {grid['labels'][1][168]}")
+            return False
+        print("✅ /16 grid keeps only populated first octets")
+        
+        grid = build_heatmap_grid("10.1.0.0/16", 24, np.arange(256))
+        if grid['z'].shape != (16, 16) or grid['labels'][0][3] != "10.1.3.0/24":
+            print("❌ /24 grid is wrong")
+            return False
+        print("✅ /24 grid is 16x16 with block labels")
+        
+        if populated_blocks("0.0.0.0/0", 16, counts) != [("192.168.0.0/16", 300), ("10.1.0.0/16", 5)]:
+            print("❌ Populated blocks are not ordered busiest first")
+            return False
+        print("✅ Populated blocks ordered busiest first")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Heatmap grid test failed: {str(e)}")
+        traceback.print_exc()
+        return False
+
+def test_chart_aggregation():
+    """Test top-N plus "Other" aggregation and threshold filtering"""
+    print("\n🧪 Testing chart aggregation...")
+    
+    try:
+        from utils.charts import top_n_with_other, filter_threshold
+        
+        sites = [{'site': f"Site {i}", 'count': i} for i in range(1, 21)]
+        top = top_n_with_other(sites, 'site', 'count', 3, other_label="Other sites")
+        expected = [('Site 20', 20), ('Site 19', 19), ('Site 18', 18), ('Other sites (17)', 153)]
+        if [(item['site'], item['count']) for item in top] != expected:
+            print(f"❌ Top-N aggregation is wrong: {top}")
+            return False
+        print("✅ Top-N keeps the largest sites and folds the rest")
+        
+        if len(top_n_with_other(sites[:2], 'site', 'count', 3)) != 2:
+            print("❌ Other slice added when nothing was folded")
+            return False
+        print("✅ No Other slice when everything fits")
+        
+        subnets = [{'utilization': value} for value in (10.0, 95.5, 80.0, 79.9)]
+        if [item['utilization'] for item in filter_threshold(subnets, 'utilization', 80)] != [95.5, 80.0]:
+            print("❌ Threshold filter is wrong")
+            return False
+        print("✅ Threshold filter keeps subnets at or above the threshold")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Chart aggregation test failed: {str(e)}")
+        traceback.print_exc()
+        return False
+
+def test_allocator_intervals():
+    """Test free-address interval arithmetic used by the allocator"""
+    print("\n🧪 Testing allocator intervals...")
+    
+    try:
+        import ipaddress
+        from utils.allocator import expand_gaps, assignable_offsets
+        
+        offsets = expand_gaps([(1, 3), (7, 7), (9, 100)], 6)
+        if offsets != [1, 2, 3, 7, 9, 10]:
+            print(f"❌ Gap expansion is wrong: {offsets}")
+            return False
+        print("✅ Gap expansion takes the lowest free offsets")
+        
+        test_cases = [
+            ("192.168.1.0/24", (1, 254)),
+            ("10.0.0.0/31", (0, 1)),
+            ("10.0.0.1/32", (0, 0))
+        ]
+        
+        for cidr, expected in test_cases:
+            bounds = assignable_offsets(ipaddress.ip_network(cidr))
+            if bounds == expected:
+                print(f"✅ {cidr}: {bounds} (Expected)")
+            else:
+                print(f"❌ {cidr}: {bounds} (Expected {expected})")
+                return False
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Allocator interval test failed: {str(e)}")
+        traceback.print_exc()
+        return False
+
+def test_range_validation():
+    """Test address range validation and sizing"""
+    print("\n🧪 Testing address range validation...")
+    
+    try:
+        from utils.ranges import normalize_range, range_size
+        
+        if normalize_range(" 192.168.1.100 ", "192.168.1.199") != ("192.168.1.100", "192.168.1.199"):
+            print("❌ Valid range was not normalized")
+            return False
+        if range_size("192.168.1.100", "192.168.1.199") != 100:
+            print("❌ Range size is wrong")
+            return False
+        print("✅ Valid range normalized with 100 addresses")
+        
+        invalid_ranges = [
+            ("192.168.1.199", "192.168.1.100"),
+            ("192.168.1.1", "2001:db8::1"),
+            ("192.168.1.1", "not-an-ip")
+        ]
+        
+        for start, end in invalid_ranges:
+            try:
+                normalize_range(start, end)
+                print(f"❌ {start} - {end}: Accepted (Expected rejection)")
+                return False
+            except ValueError:
+                print(f"✅ {start} - {end}: Rejected (Expected)")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Range validation test failed: {str(e)}")
+        traceback.print_exc()
+        return False
+
+def test_range_usage():
+    """Test that entries inside a range are counted once and caught on import"""
+    print("\n🧪 Testing range usage accounting...")
+    
+    try:
+        from utils.ranges import covering_range_name
+        from utils.utilization import combine_range_usage
+        
+        # 100-address DHCP pool in a /24 with 10 /32 entries inside it and 5 outside
+        used = combine_range_usage(row_count=15, rows_in_ranges=10, range_addresses=100, capacity=254)
+        if used == 105:
+            print("✅ Entries inside a range are counted once (105 used, not 115)")
+        else:
+            print(f"❌ Expected 105 used addresses, got {used}")
+            return False
+        
+        site_ranges = [(4, 3232235876, 3232235975, "DHCP Pool")]  # 192.168.1.100 - 192.168.1.199
+        if (covering_range_name(site_ranges, "192.168.1.150/32") == "DHCP Pool"
+                and covering_range_name(site_ranges, "192.168.1.96/28") == "DHCP Pool"
+                and covering_range_name(site_ranges, "192.168.1.200/32") is None
+                and covering_range_name(site_ranges, "2001:db8::1/128") is None):
+            print("✅ Imported entries overlapping a range are detected")
+        else:
+            print("❌ Range coverage check returned unexpected results")
+            return False
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Range usage test failed: {str(e)}")
+        traceback.print_exc()
+        return False
+
+def test_overlap_sweep():
+    """Test sweep-line detection of overlapping intervals"""
+    print("\n🧪 Testing overlap sweep...")
+    
+    try:
+        import ipaddress
+        from utils.overlaps import sweep_overlaps
+        
+        def interval(group, cidr):
+            network = ipaddress.ip_network(cidr)
+            return (group, int(network.network_address), int(network.broadcast_address), cidr)
+        
+        intervals = [
+            interval(1, "10.0.1.0/24"),
+            interval(1, "10.0.0.0/16"),
+            interval(1, "10.0.1.128/25"),
+            interval(1, "10.1.0.0/16"),
+            interval(2, "10.0.1.0/24")
+        ]
+        
+        pairs = sorted(sweep_overlaps(intervals))
+        expected = sorted([
+            ("10.0.0.0/16", "10.0.1.0/24"),
+            ("10.0.0.0/16", "10.0.1.128/25"),
+            ("10.0.1.0/24", "10.0.1.128/25")
+        ])
+        
+        if pairs == expected:
+            print(f"✅ Found {len(pairs)} nested overlaps within the group (Expected)")
+        else:
+            print(f"❌ Overlaps are wrong: {pairs}")
+            return False
+        
+        if sweep_overlaps([interval(1, "10.0.0.0/24"), interval(2, "10.0.0.0/24")]):
+            print("❌ Intervals in different groups reported as overlapping")
+            return False
+        print("✅ Different groups are never compared")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Overlap sweep test failed: {str(e)}")
+        traceback.print_exc()
+        return False
+
+def test_prefix_index():
+    """Test longest-prefix matching in the in-memory prefix index"""
+    print("\n🧪 Testing prefix index...")
+    
+    try:
+        from utils.prefix_trie import PrefixIndex
+        
+        index = PrefixIndex()
+        index.set_site_name(1, "HQ")
+        index.set_site_name(2, "Branch")
+        index.add_subnet(10, 1, "10.0.0.0/16", "Campus")
+        index.add_subnet(11, 1, "10.0.1.0/24", "Servers")
+        index.add_subnet(20, 2, "10.0.0.0/8", "Branch WAN")
+        index.add_subnet(30, 1, "2001:db8::/48", "IPv6 Campus")
+        index.add_ip(100, 1, "10.0.1.5/32", "web-01")
+        
+        matches = {row['site']: row for row in index.lookup("10.0.1.5")}
+        if matches['HQ']['subnet_id'] == 11 and matches['HQ']['hostname'] == "web-01" \
+                and matches['Branch']['subnet_id'] == 20:
+            print("✅ 10.0.1.5 matches the most specific subnet at each site")
+        else:
+            print(f"❌ Wrong longest-prefix matches: {matches}")
+            return False
+        
+        index.remove_subnet(11, "10.0.1.0/24")
+        if index.lookup("10.0.1.5", site_id=1)[0]['subnet_id'] != 10:
+            print("❌ Removing a subnet did not fall back to its parent")
+            return False
+        print("✅ Removing a subnet falls back to the enclosing subnet")
+        
+        rows = index.classify(["10.0.2.1", "2001:db8::1", "192.168.1.1", "not-an-ip"], site_id=1)
+        summary = [(row['address'], row['subnet_id'], row['error']) for row in rows]
+        expected = [
+            ("10.0.2.1", 10, None),
+            ("2001:db8::1", 30, None),
+            ("192.168.1.1", None, None),
+            ("not-an-ip", None, "Invalid IP address")
+        ]
+        if summary == expected:
+            print("✅ Bulk classification handles IPv4, IPv6, misses and invalid input")
+        else:
+            print(f"❌ Bulk classification is wrong: {summary}")
+            return False
+        
+        if index.find_exact('ip', "10.0.1.5/32", 1) and not index.find_exact('ip', "10.0.1.5/32", 2):
+            print("✅ Exact lookups are per site")
+        else:
+            print("❌ Exact lookup ignored the site")
+            return False
+        
+        # The shared index also expires with age, for writes made by other processes
+        from unittest import mock
+        from utils import prefix_trie
+        with mock.patch.object(prefix_trie, 'get_db_session'), \
+                mock.patch.object(prefix_trie, 'get_data_version', return_value=7), \
+                mock.patch.object(prefix_trie, 'build_prefix_index', side_effect=lambda session: PrefixIndex()), \
+                mock.patch.dict(prefix_trie._index_state):
+            first = prefix_trie.get_prefix_index()
+            cached = prefix_trie.get_prefix_index()
+            prefix_trie._index_state['refreshed_at'] -= prefix_trie.PREFIX_INDEX_MAX_AGE
+            rebuilt = prefix_trie.get_prefix_index()
+        if first is cached and rebuilt is not first:
+            print("✅ The shared index is rebuilt once older than its max age")
+        else:
+            print("❌ The shared index did not expire with age")
+            return False
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Prefix index test failed: {str(e)}")
+        traceback.print_exc()
+        return False
+
+def test_bulk_address_parsing():
+    """Test splitting pasted address lists for bulk lookup"""
+    print("\n🧪 Testing bulk address parsing...")
+    
+    try:
+        from utils.bulk_lookup import parse_address_list
+        
+        addresses, invalid = parse_address_list("10.0.0.1, 10.0.0.1;2001:DB8::1\nfirewall 10.0.0.300\t192.168.1.1")
+        
+        if addresses == ["10.0.0.1", "2001:db8::1", "192.168.1.1"]:
+            print("✅ Addresses are normalized and de-duplicated in input order")
+        else:
+            print(f"❌ Unexpected addresses: {addresses}")
+            return False
+        
+        if invalid == ["firewall", "10.0.0.300"]:
+            print("✅ Non-address tokens are reported separately")
+        else:
+            print(f"❌ Unexpected invalid tokens: {invalid}")
+            return False
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Bulk address parsing test failed: {str(e)}")
+        traceback.print_exc()
+        return False
+
+def test_log_enrichment():
+    """Test streaming log enrichment against a prefix index"""
+    print("\n🧪 Testing log enrichment...")
+    
+    try:
+        import io
+        from unittest import mock
+        from utils.prefix_trie import PrefixIndex
+        from utils.enrich_logs import LogEnricher, enrich_stream
+        
+        index = PrefixIndex()
+        index.set_site_name(1, "HQ")
+        index.add_subnet(1, 1, "10.0.0.0/16", "HQ-LAN")
+        index.add_subnet(2, 1, "10.0.1.0/24", "HQ-Servers")
+        index.add_ip(1, 1, "10.0.1.10/32", "db-01", "Server")
+        
+        source = io.StringIO("time\tsrc\tbytes\n1\t10.0.1.10\t60\n2\t10.0.9.9\t80\n3\tbogus\t0\n")
+        target = io.StringIO()
+        count = enrich_stream(source, target, LogEnricher(index), ["src"], delimiter="\t")
+        lines = target.getvalue().splitlines()
+        
+        expected = [
+            "time\tsrc\tbytes\tsrc_site\tsrc_hostname\tsrc_role\tsrc_subnet",
+            "1\t10.0.1.10\t60\tHQ\tdb-01\tServer\t10.0.1.0/24",
+            "2\t10.0.9.9\t80\tHQ\t\t\t10.0.0.0/16",
+            "3\tbogus\t0\t\t\t\t"
+        ]
+        if count == 3 and lines == expected:
+            print("✅ Rows gain site, hostname, role and most specific subnet columns")
+        else:
+            print(f"❌ Unexpected enriched output: {lines}")
+            return False
+        
+        # Headerless stdin: the delimiter comes from the peeked first line
+        from utils.enrich_logs import main
+        stdin, stdout = sys.stdin, sys.stdout
+        sys.stdin = io.TextIOWrapper(io.BytesIO(b"1\t10.0.1.10\t60\n2\t10.0.9.9\n"))
+        sys.stdout = io.StringIO()
+        try:
+            with mock.patch('utils.enrich_logs.load_enricher', return_value=LogEnricher(index)):
+                status = main(["-", "--column", "1", "--no-header"])
+            piped = sys.stdout.getvalue().splitlines()
+        finally:
+            sys.stdin, sys.stdout = stdin, stdout
+        if status == 0 and piped[0] == "1\t10.0.1.10\t60\tHQ\tdb-01\tServer\t10.0.1.0/24":
+            print("✅ Tab-separated standard input is detected from its first line")
+        else:
+            print(f"❌ Standard input was not split on tabs: {piped}")
+            return False
+        
+        try:
+            enrich_stream(io.StringIO("1 10.0.1.10 60\n"), io.StringIO(), LogEnricher(index), ["1"],
+                          has_header=False)
+            print("❌ Out-of-range column was accepted")
+            return False
+        except ValueError:
+            print("✅ Out-of-range column is reported instead of writing blanks")
+        
+        stderr = sys.stderr
+        sys.stderr = io.StringIO()
+        try:
+            with mock.patch('utils.enrich_logs.load_enricher', side_effect=ValueError("Site 'Nowhere' not found")):
+                status = main(["-", "--column", "1", "--site", "Nowhere"])
+            reported = sys.stderr.getvalue()
+        finally:
+            sys.stderr = stderr
+        if status == 1 and reported.startswith("Error: Site 'Nowhere' not found"):
+            print("✅ An unknown --site exits with an error message")
+        else:
+            print(f"❌ Unknown site was not reported: {status}, {reported!r}")
+            return False
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Log enrichment test failed: {str(e)}")
+        traceback.print_exc()
+        return False
+
+def test_lookup_database():
+    """Test compiling and memory-mapping the binary lookup database"""
+    print("\n🧪 Testing lookup database...")
+    
+    try:
+        import os
+        import tempfile
+        import threading
+        from utils.prefix_trie import PrefixIndex
+        from utils.lookup_db import compile_lookup_db, LookupDB
+        
+        index = PrefixIndex()
+        index.set_site_name(1, "HQ")
+        index.set_site_name(2, "DR")
+        index.add_subnet(1, 1, "10.0.0.0/16", "HQ-LAN")
+        index.add_subnet(2, 2, "10.0.1.0/24", "DR-Servers")
+        index.add_subnet(3, 1, "2001:db8::/32", "HQ-V6")
+        index.add_ip(1, 1, "10.0.1.10/32", "db-01", "Server")
+        
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "lookup")
+            compile_lookup_db(index, path)
+            compile_lookup_db(index, path)
+            db = LookupDB(path)
+            
+            rows = db.lookup("10.0.1.10")
+            summary = [(row["site"], row["subnet"], row["hostname"], row["role"]) for row in rows]
+            if summary == [("DR", "10.0.1.0/24", None, None), ("HQ", "10.0.0.0/16", "db-01", "Server")]:
+                print("✅ Lookups return the longest-prefix match per site from the mapped arrays")
+            else:
+                print(f"❌ Unexpected lookup rows: {summary}")
+                return False
+            
+            rows = db.lookup_many(["2001:db8::1", "192.168.1.1", "bogus"])
+            summary = [(row["address"], row["subnet"], row.get("error")) for row in rows]
+            if summary == [("2001:db8::1", "2001:db8::/32", None), ("192.168.1.1", None, None),
+                           ("bogus", None, "Invalid IP address")]:
+                print("✅ Batch lookups cover IPv6, unknown and invalid addresses in order")
+            else:
+                print(f"❌ Unexpected batch rows: {summary}")
+                return False
+            
+            del db, rows
+            
+            # Readers opening while the database is recompiled see one complete build
+            other = PrefixIndex()
+            other.set_site_name(3, "Lab")
+            other.add_subnet(9, 3, "10.0.0.0/8", "LAB")
+            stop = threading.Event()
+            
+            def recompile():
+                while not stop.is_set():
+                    compile_lookup_db(other, path)
+                    compile_lookup_db(index, path)
+            
+            writer = threading.Thread(target=recompile)
+            writer.start()
+            try:
+                for _ in range(200):
+                    db = LookupDB(path)
+                    site = db.lookup("10.0.1.10")[-1]["site"]
+                    expected = "HQ" if db.metadata["prefixes"] == len(index) else "Lab"
+                    if site != expected:
+                        print(f"❌ Reader mixed builds: {site} with metadata for {expected}")
+                        return False
+            finally:
+                stop.set()
+                writer.join()
+            
+            builds = [name for name in os.listdir(directory) if name.startswith("lookup.build-")]
+            if os.path.islink(path) and len(builds) <= 2:
+                print("✅ Reopening during recompiles always reads one consistent build")
+            else:
+                print(f"❌ Unexpected lookup database layout: {sorted(os.listdir(directory))}")
+                return False
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Lookup database test failed: {str(e)}")
+        traceback.print_exc()
+        return False
+
+def test_inventory_snapshot():
+    """Test vectorized filtering and incremental refresh of the columnar snapshot"""
+    print("\n🧪 Testing inventory snapshot...")
+    
+    try:
+        from collections import namedtuple
+        from datetime import datetime
+        from utils.inventory_snapshot import InventorySnapshot
+        from utils.search_engine import normalize_search_filters
+        
+        Row = namedtuple("Row", "id site_id ip_cidr hostname gateway role system_owner description "
+                                "status created_at updated_at")
+        stamp = datetime(2024, 1, 1)
+        rows = [
+            Row(1, 1, "10.0.1.20/32", "web-01", None, "Server", "IT Team", None, "active", stamp, stamp),
+            Row(2, 1, "10.0.1.5/32", "printer-01", None, "Printer", "Facilities", None, "active", stamp, stamp),
+            Row(3, 2, "10.0.2.0/24", None, None, "Server", "IT Team", None, "reserved", stamp, stamp),
+            Row(4, 1, "2001:db8::10/128", "web-02", None, "Server", None, None, "inactive", stamp, stamp)
+        ]
+        snapshot = InventorySnapshot()
+        snapshot.site_names = {1: "HQ", 2: "DR"}
+        snapshot.upsert(rows)
+        
+        def ids(*filters, **page):
+            found, total = snapshot.search_page(normalize_search_filters(*filters), **page)
+            return [row.id for row in found["rows"]], total
+        
+        if (ids("", "HQ", "active", "", "") == ([2, 1], 2)
+                and ids("", "ALL", "All", "serv", "it team") == ([1, 3], 2)
+                and ids("10.0.2.7", "ALL", "All", "", "") == ([3], 1)
+                and ids("web", "ALL", "All", "", "") == ([1, 4], 2)):
+            print("✅ Site, status, role, owner and search filters match in keyset order")
+        else:
+            print("❌ Unexpected snapshot filter results")
+            return False
+        
+        # One delete and one insert leave the row count unchanged
+        snapshot.upsert([rows[1]._replace(ip_cidr="10.0.1.30/32", updated_at=datetime(2024, 1, 2)),
+                         rows[0]._replace(id=5, ip_cidr="10.0.9.9/32", hostname="db-01")])
+        snapshot.discard([4])
+        if (ids("", "HQ", "All", "", "") == ([1, 2, 5], 3) and ids("web", "ALL", "All", "", "") == ([1], 1)
+                and len(snapshot) == 4 and snapshot.watermark == datetime(2024, 1, 2)
+                and ids("", "ALL", "All", "", "", page_size=1,
+                        cursor={"direction": "after", "key": ("10.0.1.20/32", 1)}) == ([2], 4)):
+            print("✅ Upserts re-sort, logged deletes drop rows and the watermark advances")
+        else:
+            print("❌ Snapshot refresh did not apply as expected")
+            return False
+        
+        # A full reload picks up rows committed behind the watermark and drops missing ones
+        late = rows[2]._replace(id=6, ip_cidr="10.0.3.0/24", updated_at=stamp)
+        loaded = snapshot.reload([rows[0], late])
+        if loaded == 2 and ids("", "ALL", "All", "", "") == ([1, 6], 2) \
+                and snapshot.watermark == datetime(2024, 1, 2):
+            print("✅ Full reloads reconcile rows the incremental watermark missed")
+        else:
+            print("❌ Full reload did not replace the snapshot rows")
+            return False
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Inventory snapshot test failed: {str(e)}")
+        traceback.print_exc()
+        return False
+
 def main():
     """Run all tests"""
     print("🚀 Starting IP Address Tracker Application Tests")
@@ -170,7 +1001,24 @@ def main():
         test_imports,
         test_ip_validation,
         test_css_generation,
-        test_database_models
+        test_database_models,
+        test_search_classification,
+        test_keyset_pagination,
+        test_result_cache,
+        test_snapshot_cache,
+        test_subnet_capacity,
+        test_free_space_analysis,
+        test_heatmap_grid,
+        test_chart_aggregation,
+        test_allocator_intervals,
+        test_range_validation,
+        test_range_usage,
+        test_overlap_sweep,
+        test_prefix_index,
+        test_bulk_address_parsing,
+        test_log_enrichment,
+        test_lookup_database,
+        test_inventory_snapshot
     ]
     
     passed = 0